@@ -0,0 +1,304 @@
+"""
+Batch analysis: evaluate a stream of positions across worker processes and report the engine's best move,
+score, depth and node count for each one as JSON lines.
+
+Each input line is either a JSON object
+
+    {"id": "game42-ply17", "board": ["........", ...], "player": "b", "depth": 8, "time_ms": 500, "frontier": 4}
+
+where board is 8 strings (or 8 lists) of 'b', 'B', 'r', 'R' and '.', and everything but board is optional,
+or a plain line holding the 64 board characters, optionally split into rows by '/', optionally followed
+by the side to move. Blank lines are skipped.
+
+With a frontier of N plies, the result also scores every legal move by full-width minimax N plies deep
+(see score_frontier), not just the best one.
+
+Usage: python analysis.py [positions.jsonl] [--depth N] [--time-ms T] [--frontier N] [--workers W] > results.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+import evaluation
+import search
+import transposition
+
+PIECES = frozenset('bBrR.')
+
+# Set in each worker process by _init_worker
+_table = None  # The worker's own transposition table
+
+
+def _init_worker(table_entries: int, table_path: str):
+    global _table
+    _table = transposition.TranspositionTable(table_entries, path=table_path)
+
+
+class PositionError(ValueError):
+    # Raised for an input line that does not describe a position
+    pass
+
+
+def parse_position(line: str, index: int) -> dict:
+    """
+    Parse one input line.
+
+    :param line: The line, without its newline
+    :param index: Line number, used as the id when the line does not give one
+    :return: dict with id, rows, player and the optional depth and time_ms
+    :raises PositionError: if the line is malformed
+    """
+    line = line.strip()
+    if line.startswith('{'):
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            raise PositionError(f"Invalid JSON: {e}")
+        rows = data.get("board")
+    else:
+        data = {}
+        fields = line.split()
+        rows = fields[0] if fields else ''
+        if len(fields) > 1:
+            data["player"] = fields[1]
+        rows = rows.split('/') if '/' in rows else [rows[i:i + 8] for i in range(0, len(rows), 8)]
+
+    if not isinstance(rows, list) or len(rows) != 8 or \
+            any(not isinstance(row, (str, list)) or len(row) != 8 for row in rows):
+        raise PositionError("board must be 8 rows of 8 squares")
+    for row, squares in enumerate(rows):
+        for col, piece in enumerate(squares):
+            if not isinstance(piece, str) or piece not in PIECES:
+                raise PositionError(f"Unknown piece {piece!r} at ({row}, {col})")
+            if piece != '.' and bitboard.coords_to_square(row, col) < 0:
+                raise PositionError(f"Piece on a light square at ({row}, {col})")
+
+    player = data.get("player", 'b')
+    if player not in ('b', 'r'):
+        raise PositionError("player must be 'b' or 'r'")
+    depth = data.get("depth")
+    time_ms = data.get("time_ms")
+    frontier = data.get("frontier")
+    # bool is a subclass of int, but "depth": true is a mistake, not depth 1
+    if depth is not None and (not isinstance(depth, int) or isinstance(depth, bool) or depth < 1):
+        raise PositionError("depth must be a positive integer")
+    if frontier is not None and (not isinstance(frontier, int) or isinstance(frontier, bool) or frontier < 1):
+        raise PositionError("frontier must be a positive integer")
+    if time_ms is not None and (not isinstance(time_ms, (int, float)) or isinstance(time_ms, bool) or time_ms <= 0):
+        raise PositionError("time_ms must be a positive number")
+    return {"id": data.get("id", index), "rows": [list(row) for row in rows], "player": player,
+            "depth": depth, "time_ms": time_ms, "frontier": frontier}
+
+
+def analyze_position(board: bitboard.Board, player: str, depth: int = None, time_ms: float = None,
+                     table: transposition.TranspositionTable = None) -> dict:
+    """
+    Search one position.
+
+    With only a depth, this is a fixed-depth search; with a time limit it is iterative deepening,
+    going no deeper than depth if that is given too.
+
+    :param board: The position
+    :param player: The side to move
+    :param depth: Depth limit, or None
+    :param time_ms: Time limit in milliseconds, or None
+    :param table: Transposition table to use (a fresh one if None)
+    :return: dict with best_move ([[row, col], [row, col]] or None), captures, score (from black's point
+             of view), depth and nodes
+    """
+    if table is None:
+        table = transposition.TranspositionTable(1 << 18)
+    if time_ms is None:
+        table.new_search()
+        searcher = search.Search(table, depth or search.MAX_DEPTH)
+        move, value = searcher.alphabeta(board.copy(), player, 0, -float('inf'), float('inf'),
+                                         transposition.zobrist_hash(board, player))
+        result = search.SearchResult(move, value, searcher.max_depth, searcher.nodes)
+    else:
+        result = search.iterative_deepening(board, player, time_ms, table, depth or search.MAX_PLY)
+
+    move = result.move
+    return {"best_move": None if move is None else [list(bitboard.square_to_coords(move[bitboard.SRC])),
+                                                    list(bitboard.square_to_coords(move[bitboard.DST]))],
+            "captures": 0 if move is None else move[bitboard.CAPTURED].bit_count(),
+            "score": result.value if abs(result.value) != float('inf') else None,
+            "depth": result.depth, "nodes": result.nodes}
+
+
+def _back_up(scores, counts: list, maximize: bool):
+    # Minimax one ply up: the best of each consecutive group of counts[i] scores
+    if evaluation.numpy is not None:
+        starts = evaluation.numpy.cumsum([0] + counts[:-1])
+        return (evaluation.numpy.maximum if maximize else evaluation.numpy.minimum).reduceat(scores, starts)
+    backed_up = []
+    start = 0
+    for count in counts:
+        backed_up.append((max if maximize else min)(scores[start:start + count]))
+        start += count
+    return backed_up
+
+
+def score_frontier(board: bitboard.Board, player: str, plies: int,
+                   evaluator: evaluation.Evaluator = evaluation.DEFAULT) -> list[tuple]:
+    """
+    Score every legal move by full-width minimax, plies deep.
+
+    The tree is expanded level by level without pruning, the frontier is scored with one batch evaluation
+    (evaluation.Evaluator.evaluate_batch), and the scores are backed up a level at a time. A position whose
+    side to move has no move left before the frontier scores as a loss at that ply.
+
+    :param board: The position
+    :param player: The side to move
+    :param plies: Depth of the frontier (at least 1)
+    :param evaluator: Evaluation of the frontier
+    :return: [(move, score from black's point of view)] in move generation order
+    """
+    positions = [(board.black, board.red, board.kings)]
+    ended = {}  # index in positions -> score, for games that ended above the frontier
+    levels = []  # (number of children of each position, side to move there), from the root down
+    side = player
+    for ply in range(plies):
+        children = []
+        counts = []
+        next_ended = {}
+        for i, (black, red, kings) in enumerate(positions):
+            parent = bitboard.Board(black, red, kings)
+            moves = bitboard.generate_moves(parent, side) if i not in ended and black and red else []
+            if moves:
+                children += [(child.black, child.red, child.kings)
+                             for child in (bitboard.apply_move(parent, side, move) for move in moves)]
+                counts.append(len(moves))
+            else:
+                # Carried down to the frontier unchanged, as a loss for the side that could not move
+                loss = -(1000000 - ply) if side == 'b' else 1000000 - ply
+                next_ended[len(children)] = ended.get(i, loss)
+                children.append((black, red, kings))
+                counts.append(1)
+        levels.append((counts, side))
+        positions, ended = children, next_ended
+        side = 'r' if side == 'b' else 'b'
+
+    scores = evaluator.evaluate_batch(positions)
+    for i, (black, red, _) in enumerate(positions):
+        if i in ended:
+            scores[i] = ended[i]
+        elif not black or not red:
+            scores[i] = search.utility(bitboard.Board(black, red, 0), plies)
+    for counts, side in reversed(levels[1:]):
+        scores = _back_up(scores, counts, side == 'b')
+    return list(zip(bitboard.generate_moves(board, player), (int(score) for score in scores)))
+
+
+def _analyze(position: dict) -> dict:
+    # Worker task
+    start = time.perf_counter()
+    board = bitboard.from_rows(position["rows"])
+    report = analyze_position(board, position["player"], position["depth"], position["time_ms"], _table)
+    if position.get("frontier"):
+        report["frontier"] = [{"move": [list(bitboard.square_to_coords(move[bitboard.SRC])),
+                                        list(bitboard.square_to_coords(move[bitboard.DST]))], "score": score}
+                              for move, score in score_frontier(board, position["player"], position["frontier"])]
+    report["seconds"] = round(time.perf_counter() - start, 4)
+    return report
+
+
+class Analyzer:
+    # This class owns a process pool for batch analysis. The pool (and each worker's transposition table)
+    # is kept between batches; call close() when done.
+
+    def __init__(self, workers: int = None, table_entries: int = 1 << 18, table_path: str = None):
+        """
+        :param workers: Number of worker processes (defaults to the number of CPUs)
+        :param table_entries: Size of each worker's transposition table
+        :param table_path: Transposition table file for the workers to share instead (see transposition.py)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(table_entries, table_path))
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def analyze(self, lines, depth: int = None, time_ms: float = None, max_depth: int = None,
+                max_time_ms: float = None, frontier: int = None, max_frontier: int = None):
+        """
+        Analyze a stream of input lines, yielding one result dict per position in input order.
+
+        Only a few positions per worker are in flight at once, so arbitrarily long inputs are streamed
+        rather than read up front. Malformed lines yield {"id": ..., "error": ...} instead of a result.
+
+        :param lines: Iterable of input lines (see the module docstring)
+        :param depth: Depth for positions that do not give their own
+        :param time_ms: Time limit for positions that do not give their own
+        :param max_depth: Cap on any position's depth (the default for positions with no limit at all)
+        :param max_time_ms: Cap on any position's time limit
+        :param frontier: Frontier depth for positions that do not give their own (None for no frontier)
+        :param max_frontier: Cap on any position's frontier depth
+        """
+        in_flight = deque()
+        for index, line in enumerate(lines):
+            if isinstance(line, bytes):
+                line = line.decode()
+            if not line.strip():
+                continue
+            try:
+                position = parse_position(line, index)
+            except PositionError as e:
+                in_flight.append(({"id": index}, str(e)))
+            else:
+                if position["depth"] is None:
+                    position["depth"] = depth
+                if position["time_ms"] is None:
+                    position["time_ms"] = time_ms
+                if max_depth is not None:
+                    position["depth"] = min(position["depth"] or max_depth, max_depth)
+                if max_time_ms is not None and position["time_ms"] is not None:
+                    position["time_ms"] = min(position["time_ms"], max_time_ms)
+                if position["frontier"] is None:
+                    position["frontier"] = frontier
+                if max_frontier is not None and position["frontier"] is not None:
+                    position["frontier"] = min(position["frontier"], max_frontier)
+                in_flight.append(({"id": position["id"]}, self._executor.submit(_analyze, position)))
+
+            while len(in_flight) > 4 * self.workers:
+                yield self._collect(*in_flight.popleft())
+        while in_flight:
+            yield self._collect(*in_flight.popleft())
+
+    @staticmethod
+    def _collect(report: dict, outcome) -> dict:
+        if isinstance(outcome, str):
+            report["error"] = outcome
+        else:
+            try:
+                report.update(outcome.result())
+            except Exception as e:
+                report["error"] = f"{type(e).__name__}: {e}"
+        return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Analyze many positions, writing one JSON result per line.")
+    parser.add_argument("input", nargs="?", type=argparse.FileType('r'), default=sys.stdin,
+                        help="positions, one per line (default: stdin)")
+    parser.add_argument("--depth", type=int, help="search depth for positions that do not give one")
+    parser.add_argument("--time-ms", type=float, help="time limit for positions that do not give one")
+    parser.add_argument("--frontier", type=int, help="also score every move by full-width minimax this deep")
+    parser.add_argument("--workers", type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--table", help="transposition table file shared by the workers and kept between runs")
+    args = parser.parse_args()
+
+    with Analyzer(args.workers, table_path=args.table) as analyzer:
+        for report in analyzer.analyze(args.input, args.depth, args.time_ms, frontier=args.frontier):
+            print(json.dumps(report), flush=True)
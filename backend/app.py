@@ -1,47 +1,218 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+import json
+import os
+import threading
+import time
+import analysis
+import book
 import checkers_ai  # Import AI logic
+import jobs
+import parallel
+import ponder
+import search
+import sessions
+import transposition
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Initialize board and game state
-initial_board = [
-    ['.', 'b', '.', 'b', '.', 'b', '.', 'b'],
-    ['b', '.', 'b', '.', 'b', '.', 'b', '.'],
-    ['.', 'b', '.', 'b', '.', 'b', '.', 'b'],
-    ['.', '.', '.', '.', '.', '.', '.', '.'],
-    ['.', '.', '.', '.', '.', '.', '.', '.'],
-    ['r', '.', 'r', '.', 'r', '.', 'r', '.'],
-    ['.', 'r', '.', 'r', '.', 'r', '.', 'r'],
-    ['r', '.', 'r', '.', 'r', '.', 'r', '.']
-]
+# Games in progress, keyed by game id. Set GAME_STORE_PATH to keep them in a SQLite file as well, so games
+# evicted from memory (or held by another worker process) can be reloaded.
+app.config['GAME_STORE_MAX_GAMES'] = 1000
+app.config['GAME_STORE_TTL_SECONDS'] = 3600
+app.config['GAME_STORE_PATH'] = None
+app.config['GAME_STORE_EXPIRE_SECONDS'] = 60  # Idle games are swept out at most this often
+app.config['AI_TIME_BUDGET_MS'] = 1000  # Wall-clock budget for each AI move
+app.config['AI_WORKERS'] = 1  # Processes to split the AI's search across; 1 searches in the request thread
+app.config['search_pool'] = None
+# Opening book (see book.py); the AI plays from it with no search while the game is still in book.
+# None, or a path with no file, turns it off.
+app.config['OPENING_BOOK_PATH'] = book.DEFAULT_PATH
+app.config['opening_book'] = None
+# Background AI move jobs (POST /ai_move with "async": true)
+app.config['AI_JOB_WORKERS'] = None  # Defaults to the number of CPUs
+app.config['AI_JOB_QUEUE_DEPTH'] = 64  # Jobs queued or running before POST /ai_move answers 503
+app.config['AI_JOB_MAX_WAIT_SECONDS'] = 30  # Longest a GET /ai_move/<job_id>?wait=... request is held
+app.config['job_manager'] = None
+# Pondering: search the AI's answers to the user's likely moves while the user is thinking (from /user_move).
+# The worker processes are the CPU cap for all games together; 0 turns pondering off.
+app.config['PONDER_WORKERS'] = 0
+app.config['PONDER_MAX_REPLIES'] = 8  # User moves pondered per position, likeliest first
+app.config['ponderer'] = None
+# Batch analysis (POST /analyze). Limits are per position and also apply to positions that set their own.
+app.config['ANALYZE_WORKERS'] = None  # Defaults to the number of CPUs
+app.config['ANALYZE_MAX_DEPTH'] = 12
+app.config['ANALYZE_MAX_TIME_MS'] = 5000
+app.config['ANALYZE_MAX_FRONTIER'] = 6  # Full-width, so each extra ply multiplies the work by about 7
+app.config['analyzer'] = None
+# Transposition table shared by every search process (the request thread's and the worker pools'), kept in this
+# file so that it survives restarts and deploys. None gives each process a table of its own in memory.
+app.config['TT_PATH'] = None
+app.config['TT_ENTRIES'] = 1 << 20  # Slots (24 bytes each) when the file is created; an existing file keeps its size
+app.config['TT_FLUSH_SECONDS'] = 30  # How often the file is written out in the background
+# Search statistics of every AI move, exported by GET /metrics
+app.config['SEARCH_STATS'] = True
+app.config['search_stats'] = search.SearchStats()
+search_stats_lock = threading.Lock()
+
+
+def get_search_pool():
+    """Return the process pool for AI searches, or None when searching on a single core."""
+    workers = app.config['AI_WORKERS']
+    pool = app.config['search_pool']
+    if workers <= 1:
+        return None
+    if pool is None or pool.workers != workers:
+        if pool is not None:
+            pool.close()
+        pool = app.config['search_pool'] = parallel.ParallelSearch(workers, table_path=app.config['TT_PATH'])
+    return pool
+
+
+def get_opening_book():
+    """Return the opening book, opening it on first use, or None when there is none."""
+    path = app.config['OPENING_BOOK_PATH']
+    opening_book = app.config['opening_book']
+    if opening_book is not None and opening_book.path != path:
+        opening_book.close()
+        opening_book = app.config['opening_book'] = None
+    if opening_book is None and path and os.path.exists(path):
+        try:
+            opening_book = app.config['opening_book'] = book.OpeningBook(path)
+        except book.BookError as e:
+            print(f"Opening book not used: {e}")
+            app.config['OPENING_BOOK_PATH'] = None
+    return opening_book
+
+
+def get_job_manager():
+    """Return the background job manager, starting it on first use."""
+    if app.config['job_manager'] is None:
+        app.config['job_manager'] = jobs.JobManager(app.config['AI_JOB_WORKERS'], app.config['AI_JOB_QUEUE_DEPTH'],
+                                                    table_path=app.config['TT_PATH'])
+    return app.config['job_manager']
+
+
+def get_ponderer():
+    """Return the ponderer, starting it on first use, or None when pondering is off."""
+    if app.config['PONDER_WORKERS'] <= 0:
+        return None
+    if app.config['ponderer'] is None:
+        app.config['ponderer'] = ponder.Ponderer(app.config['PONDER_WORKERS'], app.config['PONDER_MAX_REPLIES'],
+                                                 app.config['AI_TIME_BUDGET_MS'], table_path=app.config['TT_PATH'])
+    return app.config['ponderer']
+
+
+def get_analyzer():
+    """Return the batch analysis pool, starting it on first use."""
+    if app.config['analyzer'] is None:
+        app.config['analyzer'] = analysis.Analyzer(app.config['ANALYZE_WORKERS'], table_path=app.config['TT_PATH'])
+    return app.config['analyzer']
+
+
+def configure_game_store():
+    """(Re)create the game store from the GAME_STORE_* settings."""
+    path = app.config['GAME_STORE_PATH']
+    backend = sessions.SQLiteBackend(path) if path else None
+    app.config['games'] = sessions.GameStore(app.config['GAME_STORE_MAX_GAMES'],
+                                             app.config['GAME_STORE_TTL_SECONDS'], backend,
+                                             app.config['GAME_STORE_EXPIRE_SECONDS'])
+
+
+configure_game_store()
+
+
+def flush_transposition_table():
+    """Background thread: write the shared transposition table out to its file every TT_FLUSH_SECONDS."""
+    while True:
+        time.sleep(app.config['TT_FLUSH_SECONDS'])
+        checkers_ai.get_cache().flush()
+
+
+def configure_transposition_table():
+    """
+    (Re)create the request thread's transposition table from the TT_* settings. Worker pools started afterwards
+    open the same file.
+    """
+    path = app.config['TT_PATH']
+    if path:
+        try:
+            checkers_ai.cache = transposition.TranspositionTable(app.config['TT_ENTRIES'], path=path)
+        except (OSError, ValueError) as e:
+            print(f"Transposition table file not used: {e}")
+            app.config['TT_PATH'] = path = None
+    if not path:
+        if checkers_ai.cache is not None and checkers_ai.cache.path is not None:
+            checkers_ai.cache = None  # An in-memory table is created when first needed
+    elif app.config['tt_flusher'] is None:
+        app.config['tt_flusher'] = threading.Thread(target=flush_transposition_table, daemon=True)
+        app.config['tt_flusher'].start()
+
+
+app.config['tt_flusher'] = None
+configure_transposition_table()
+
+
+def load_game():
+    """
+    Look up the game named by the request's game_id (in the JSON body or the query string).
+
+    :return: (game_id, state, None), or (game_id, None, error response) if it is missing or unknown
+    """
+    data = request.get_json(silent=True) or {}
+    game_id = data.get('game_id') or request.args.get('game_id')
+    if not game_id:
+        return None, None, (jsonify({"error": "Missing game_id"}), 400)
+    curr_state = app.config['games'].get(game_id)
+    if curr_state is None:
+        return game_id, None, (jsonify({"error": "Unknown or expired game_id"}), 404)
+    return game_id, curr_state, None
+
+
+@app.route('/games', methods=['POST'])
+def new_game():
+    """Endpoint to start a new game."""
+    state = checkers_ai.State([row[:] for row in checkers_ai.INITIAL_BOARD], 12, 12, 0, 0)
+    game_id = app.config['games'].create(state)
+    return jsonify({"game_id": game_id, "board_state": state.board, "num_red": 12, "num_black": 12}), 201
 
-app.config['curr_state'] = checkers_ai.State(initial_board, 12, 12, 0, 0)
 
 @app.route('/user_move', methods=['POST'])
 def user_moves():
     """Endpoint to get all possible moves for the user."""
 
-    # Get current game-state from app configuration
-    curr_state = app.config['curr_state']
+    # Get current game-state from the game store
+    game_id, curr_state, error = load_game()
+    if error:
+        return error
+
+    # A drawn game has no moves left to play
+    if checkers_ai.is_draw(curr_state, 'r'):
+        return jsonify({"user_moves": {}, "draw": True}), 200
 
-    # Generate all possible successor states for the user (red pieces)
-    successors = checkers_ai.generate_successors(curr_state, 'r')
-    user_moves_dict = checkers_ai.get_user_moves_dict(successors)
+    # The user's (red's) legal moves, from the index kept on the position
+    user_moves_dict = checkers_ai.get_user_moves_dict(checkers_ai.legal_move_index(curr_state, 'r').values())
 
     print(user_moves_dict)
 
+    # Think about the AI's answers while the user picks a move
+    ponderer = get_ponderer()
+    if ponderer is not None and curr_state.move_num % 2 == 0:
+        ponderer.start(game_id, curr_state.position(), 'r', curr_state.history, curr_state.quiet_plies)
+
     # Send user moves to frontend
-    return jsonify({"user_moves": user_moves_dict}), 200
+    return jsonify({"user_moves": user_moves_dict, "draw": False}), 200
 
 
 @app.route('/apply_user_move', methods=['POST'])
 def apply_user_move():
     """Endpoint to apply user's move"""
 
-    # Get current game-state from app configuration
-    curr_state = app.config['curr_state']
+    # Get current game-state from the game store
+    game_id, curr_state, error = load_game()
+    if error:
+        return error
 
     if curr_state.move_num % 2 != 0:  # Request made when not user's turn
         return jsonify({"error": "Request made when not user's turn"}), 700
@@ -51,71 +222,260 @@ def apply_user_move():
         data = request.json
         old_coords = data.get('old_coords')
         new_coords = data.get('new_coords')
-        piece = data.get('piece')
 
         curr_state.display_with_coords()
-        print(old_coords, new_coords, piece)
+        print(old_coords, new_coords)
 
-        if not all([old_coords, new_coords, piece]):
+        if not all([old_coords, new_coords]):
             return jsonify({"error": "Missing required parameters"}), 800
 
-        directions = [(-1, -1), (-1, 1)] if piece == 'r' else [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        
-        moves = checkers_ai.get_possible_moves(curr_state, old_coords[0], old_coords[1], piece, 'b', directions)
-        print("Got possible moves!", len(moves))
-
-        res_state = None
-        for new_state in moves:
-            print("Inside loop")
-            if list(new_state.initial_coords) == old_coords and list(new_state.new_move_coords) == new_coords:
-                print("Found matching state")
-                app.config['curr_state'] = new_state
-                res_state = new_state
-                break
-        
+        if checkers_ai.is_draw(curr_state, 'r'):
+            return jsonify({"error": "The game is drawn"}), 400
+
+        # Only moves in the position's legal-move index are accepted, so a jump elsewhere on the board is forced
+        res_state = checkers_ai.legal_move_index(curr_state, 'r').get((tuple(old_coords), tuple(new_coords)))
+        if res_state is None:
+            return jsonify({"error": "Illegal move"}), 400
+
+        checkers_ai.record_move(curr_state, res_state, 'r')
+        app.config['games'].put(game_id, res_state)
         num_red = res_state.num_r + res_state.num_r_kings
         num_black = res_state.num_b + res_state.num_b_kings
 
-        print("About to return new board")
-        # res_state.display_with_coords()
-
-        return jsonify({"board_state": res_state.board, "num_red": num_red, "num_black": num_black})
+        return jsonify({"board_state": res_state.board, "num_red": num_red, "num_black": num_black,
+                        "draw": checkers_ai.is_draw(res_state, 'b')})
 
     except Exception as e:
         # Handle unexpected errors
         return jsonify({"error": str(e)}), 500
     
 
-@app.route('/ai_move', methods=['POST'])
-def ai_move():
-    """Endpoint to get AI's next move."""
+def record_search(result):
+    """Add an AI search's statistics to the totals reported by /metrics."""
+    if result.stats is None or not app.config['SEARCH_STATS']:
+        return
+    with search_stats_lock:
+        app.config['search_stats'].merge(result.stats)
 
-    # Get current game-state from app configuration
-    curr_state = app.config['curr_state']
 
-    if curr_state.move_num % 2 == 0:  # Request made when not user's turn
-        return jsonify({"error": "Request made when not user's turn"}), 700
+class GameChanged(Exception):
+    # Raised by apply_ai_move when the game has moved on since the AI's search started
+    pass
 
-    # Set up parameters for alpha-beta pruning
-    alpha = -1000000  # -float('inf')
-    beta = 1000000  # float('inf')
 
-    # Compute AI's move
-    ai_move = checkers_ai.limited_minimax_alphabeta(curr_state, 'b', 0, alpha, beta)[0]
+def apply_ai_move(game_id, searched_state, result):
+    """
+    Play the AI's move from a search of searched_state in the game, unless the game has moved on since.
+
+    :param game_id: The game
+    :param searched_state: The state the search started from
+    :param result: SearchResult whose move is the successor State (or None)
+    :return: Response body describing the AI's move
+    :raises GameChanged: if the game is no longer in searched_state
+    """
+    record_search(result)
+    ai_move = result.move
 
     if ai_move is None:
-        return jsonify({"ai_move": [], "board_state": [], "num_red": None, "num_black": None}), 200
+        return {"ai_move": [], "board_state": [], "num_red": None, "num_black": None}
+
+    curr_state = app.config['games'].get(game_id)
+    if curr_state is None or curr_state.move_num != searched_state.move_num or curr_state != searched_state:
+        raise GameChanged("Game changed while the AI was searching")
 
     # Extract move coordinates for the AI's move
     ai_move_coords = [ai_move.initial_coords, ai_move.new_move_coords]
 
-    # Update curr_state to reflect AI's move
-    app.config['curr_state'] = ai_move
+    # Update the game to reflect AI's move
+    checkers_ai.record_move(curr_state, ai_move, 'b')
+    app.config['games'].put(game_id, ai_move)
     num_red = ai_move.num_r + ai_move.num_r_kings
     num_black = ai_move.num_b + ai_move.num_b_kings
 
+    return {"ai_move": ai_move_coords, "board_state": ai_move.board, "num_red": num_red, "num_black": num_black,
+            "depth": result.depth, "nodes": result.nodes,
+            "draw": checkers_ai.is_draw(ai_move, 'r')}
+
+
+def job_response(job, code=200):
+    """Describe a background AI move job, including the move once it is done."""
+    body = {"job_id": job.job_id, "game_id": job.key, "status": job.status}
+    if job.status == "done":
+        body.update(job.payload)
+    elif job.status == "failed":
+        body["error"] = job.error
+    return jsonify(body), code
+
+
+@app.route('/ai_move', methods=['POST'])
+def ai_move():
+    """Endpoint to get AI's next move. With "async": true, queue the search and return a job id instead."""
+
+    # Get current game-state from the game store
+    game_id, curr_state, error = load_game()
+    if error:
+        return error
+
+    if curr_state.move_num % 2 == 0:  # Request made when not user's turn
+        return jsonify({"error": "Request made when not user's turn"}), 700
+
+    if checkers_ai.is_draw(curr_state, 'b'):
+        return jsonify({"ai_move": [], "board_state": curr_state.board, "num_red": None, "num_black": None,
+                        "draw": True}), 200
+
+    data = request.get_json(silent=True) or {}
+    ponderer = get_ponderer()
+    budget = app.config['AI_TIME_BUDGET_MS']
+    board = curr_state.position()
+
+    # Play from the opening book if the position is in it: no search, asynchronous or not
+    opening_book = get_opening_book()
+    result = opening_book.probe(board, 'b') if opening_book is not None else None
+    in_book = result is not None
+    if in_book and ponderer is not None:
+        ponderer.stop(game_id)
+
+    if data.get('async'):
+        if ponderer is not None:
+            ponderer.stop(game_id)  # Free the CPU for the job
+        manager = get_job_manager()
+        if in_book:
+            job = manager.add_done(game_id, result, on_done=lambda result: dict(
+                apply_ai_move(game_id, curr_state, checkers_ai.play_search_result(curr_state, 'b', result)),
+                book=True))
+            return job_response(job)
+        try:
+            job = manager.submit(
+                game_id, board, 'b', budget,
+                on_done=lambda result: dict(
+                    apply_ai_move(game_id, curr_state, checkers_ai.play_search_result(curr_state, 'b', result)),
+                    book=False),
+                history=curr_state.history, quiet_plies=curr_state.quiet_plies)
+        except jobs.QueueFull:
+            return jsonify({"error": "Too many AI moves in progress, try again later"}), 503, {"Retry-After": "1"}
+        return job_response(job, 202)
+
+    # Otherwise use the search made while the user was thinking, if there is one
+    if not in_book and ponderer is not None:
+        result = ponderer.take(game_id, board, budget / 1000)
+    pondered = result is not None and not in_book
+    if result is not None:
+        result = checkers_ai.play_search_result(curr_state, 'b', result)
+    else:
+        # Compute AI's move, searching as deep as the time budget allows
+        stats = search.SearchStats() if app.config['SEARCH_STATS'] else None
+        result = checkers_ai.iterative_deepening(curr_state, 'b', budget, pool=get_search_pool(), stats=stats)
+
     # Send AI's move to frontend
-    return jsonify({"ai_move": ai_move_coords, "board_state": ai_move.board, "num_red": num_red, "num_black": num_black}), 200
+    try:
+        body = apply_ai_move(game_id, curr_state, result)
+    except GameChanged as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(dict(body, pondered=pondered, book=in_book)), 200
+
+
+@app.route('/ai_move/<job_id>', methods=['GET'])
+def ai_move_job(job_id):
+    """Endpoint to poll a background AI move job; ?wait=N holds the request up to N seconds for it to finish."""
+    manager = get_job_manager()
+    job = manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job_id"}), 404
+
+    wait = min(request.args.get('wait', 0, type=float), app.config['AI_JOB_MAX_WAIT_SECONDS'])
+    if wait > 0:
+        manager.wait(job, wait)
+    return job_response(job)
+
+
+@app.route('/ai_move/<job_id>', methods=['DELETE'])
+def cancel_ai_move_job(job_id):
+    """Endpoint to cancel a background AI move job."""
+    manager = get_job_manager()
+    job = manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job_id"}), 404
+    return job_response(manager.cancel(job))
+
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    """
+    Endpoint to analyze many positions in one call. The body holds one position per line (see analysis.py);
+    results are streamed back as JSON lines, in the same order. ?depth=, ?time_ms= and ?frontier= set the
+    limits for positions that do not give their own.
+    """
+    depth = request.args.get('depth', type=int)
+    time_ms = request.args.get('time_ms', type=float)
+    frontier = request.args.get('frontier', type=int)
+    analyzer = get_analyzer()
+    reports = analyzer.analyze(request.stream, depth, time_ms, app.config['ANALYZE_MAX_DEPTH'],
+                               app.config['ANALYZE_MAX_TIME_MS'], frontier, app.config['ANALYZE_MAX_FRONTIER'])
+    return Response(stream_with_context(json.dumps(report) + '\n' for report in reports),
+                    mimetype='application/x-ndjson')
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Endpoint exporting search statistics and server state in the Prometheus text format."""
+    with search_stats_lock:
+        stats = app.config['search_stats']
+        lines = []
+        for name, help_text in [("searches", "AI searches"), ("nodes", "Positions visited"),
+                                ("qnodes", "Positions visited by the quiescence search"),
+                                ("leaves", "Positions evaluated"), ("cutoffs", "Beta cutoffs"),
+                                ("first_move_cutoffs", "Beta cutoffs caused by the first move tried"),
+                                ("researches", "Null-window searches repeated with a full window"),
+                                ("fail_highs", "Aspiration windows failed high"),
+                                ("fail_lows", "Aspiration windows failed low"),
+                                ("tt_probes", "Transposition table probes"), ("tt_hits", "Transposition table hits"),
+                                ("tt_stores", "Transposition table stores"),
+                                ("tt_cutoffs", "Positions answered by the transposition table"),
+                                ("tb_hits", "Positions answered by the endgame tablebase"),
+                                ("draws", "Positions scored as drawn by repetition or the no-progress rule")]:
+            lines += [f"# HELP checkers_search_{name}_total {help_text}.",
+                      f"# TYPE checkers_search_{name}_total counter",
+                      f"checkers_search_{name}_total {getattr(stats, name)}"]
+        lines += ["# HELP checkers_search_depth_seconds_total Time spent on each iterative-deepening depth.",
+                  "# TYPE checkers_search_depth_seconds_total counter"]
+        lines += [f'checkers_search_depth_seconds_total{{depth="{depth}"}} {seconds:.6f}'
+                  for depth, seconds in sorted(stats.depth_seconds.items())]
+        lines += ["# HELP checkers_search_depth_nodes_total Nodes searched at each iterative-deepening depth.",
+                  "# TYPE checkers_search_depth_nodes_total counter"]
+        lines += [f'checkers_search_depth_nodes_total{{depth="{depth}"}} {nodes}'
+                  for depth, nodes in sorted(stats.depth_nodes.items())]
+        for name, help_text, value in [
+                ("max_ply", "Deepest position visited by any search", stats.max_ply),
+                ("branching_factor", "Average children searched per expanded node", stats.branching_factor),
+                ("first_move_cutoff_rate", "Share of cutoffs caused by the first move", stats.first_move_cutoff_rate),
+                ("tt_hit_rate", "Share of transposition table probes that hit", stats.tt_hit_rate)]:
+            lines += [f"# HELP checkers_search_{name} {help_text}.", f"# TYPE checkers_search_{name} gauge",
+                      f"checkers_search_{name} {value:.6g}"]
+
+    manager = app.config['job_manager']
+    ponderer = app.config['ponderer']
+    opening_book = app.config['opening_book']
+    if opening_book is not None:
+        lines += ["# HELP checkers_book_hits_total AI moves played from the opening book.",
+                  "# TYPE checkers_book_hits_total counter", f"checkers_book_hits_total {opening_book.hits}",
+                  "# HELP checkers_book_misses_total AI moves looked up in the opening book but not found.",
+                  "# TYPE checkers_book_misses_total counter", f"checkers_book_misses_total {opening_book.misses}",
+                  "# HELP checkers_book_positions Positions in the opening book.",
+                  "# TYPE checkers_book_positions gauge", f"checkers_book_positions {len(opening_book)}"]
+    if ponderer is not None:
+        lines += ["# HELP checkers_ponder_hits_total AI moves answered from a pondered search.",
+                  "# TYPE checkers_ponder_hits_total counter", f"checkers_ponder_hits_total {ponderer.hits}",
+                  "# HELP checkers_ponder_misses_total AI moves pondered on but searched afresh.",
+                  "# TYPE checkers_ponder_misses_total counter", f"checkers_ponder_misses_total {ponderer.misses}",
+                  "# HELP checkers_ponder_jobs_pending Pondering searches queued or running.",
+                  "# TYPE checkers_ponder_jobs_pending gauge", f"checkers_ponder_jobs_pending {ponderer.pending()}"]
+    lines += ["# HELP checkers_games_in_memory Games held in memory.", "# TYPE checkers_games_in_memory gauge",
+              f"checkers_games_in_memory {len(app.config['games'])}",
+              "# HELP checkers_ai_jobs_pending Background AI moves queued or running.",
+              "# TYPE checkers_ai_jobs_pending gauge",
+              f"checkers_ai_jobs_pending {manager.pending() if manager is not None else 0}"]
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
 
 if __name__ == '__main__':
     app.run(debug=True)
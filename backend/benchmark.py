@@ -0,0 +1,220 @@
+"""
+Reproducible benchmarks for move generation and search over a fixed set of positions.
+
+    python benchmark.py run --out results.json        # measure
+    python benchmark.py compare old.json new.json     # flag regressions between two runs (exit status 1)
+
+Move generation is measured perft-style: every line is expanded to a fixed depth and the leaves counted, with
+both the State-based generate_successors and the bitboard generator. Search is measured as the time and nodes
+of limited_minimax_alphabeta to each depth, starting from an empty transposition table every time.
+Each timing is the best of --repeat runs.
+"""
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import bitboard
+import checkers_ai
+import perft
+import search
+
+# name -> (board, side to move, perft depth, deepest search depth)
+POSITIONS = {
+    "opening": (checkers_ai.INITIAL_BOARD, 'r', 6, 11),
+    "middlegame": ([
+        ".b.b.b.b",
+        "......b.",
+        "...b.b.r",
+        "b...b...",
+        "........",
+        "b.....r.",
+        ".r.r...r",
+        "r.r.r.r.",
+    ], 'r', 6, 10),
+    "endgame": ([
+        "........",
+        "..B.....",
+        "........",
+        "..R.b...",
+        "........",
+        "r...B...",
+        "........",
+        "R.......",
+    ], 'r', 6, 11),
+    "multi_jump": ([
+        "........",
+        "..r.r...",
+        ".r.r.r..",
+        "....B...",
+        ".r.r.r..",
+        "........",
+        "...r.r..",
+        "........",
+    ], 'b', 6, 11),
+}
+
+# Timings that grow by more than this fraction count as regressions in compare mode...
+DEFAULT_THRESHOLD = 0.10
+# ...as long as they also grow by more than this many seconds, so that noise in tiny timings is ignored
+NOISE_FLOOR = 0.002
+
+
+def make_state(rows: list[str]) -> checkers_ai.State:
+    board = [list(row) for row in rows]
+    r, b, rk, bk = bitboard.from_rows(board).counts()
+    return checkers_ai.State(board, r, b, rk, bk)
+
+
+def best_time(function, repeat: int, setup=None):
+    """
+    Call function repeat times, with the garbage collector off as timeit does.
+
+    :param setup: Called (untimed) before each call
+    :return: (shortest time in seconds, return value of the last call)
+    """
+    best = float('inf')
+    value = None
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            value = function()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best, value
+
+
+def bench_movegen(rows: list[str], player: str, depth: int, repeat: int) -> dict:
+    state = make_state(rows)
+    board = state.position()
+    results = {}
+    for name, function in [("states", lambda: perft.perft(state, player, depth)),
+                           ("bitboard", lambda: perft.perft_bitboard(board, player, depth))]:
+        seconds, leaves = best_time(function, repeat)
+        results[name] = {"depth": depth, "leaves": leaves, "seconds": seconds, "leaves_per_second": leaves / seconds}
+    return results
+
+
+def bench_search(rows: list[str], player: str, max_depth: int, repeat: int) -> dict:
+    state = make_state(rows)
+
+    def run(depth):
+        stats = search.SearchStats()
+        checkers_ai.limited_minimax_alphabeta(state, player, 0, -float('inf'), float('inf'), depth, stats)
+        return stats.nodes
+
+    depths = {}
+    for depth in range(1, max_depth + 1):
+        seconds, nodes = best_time(lambda: run(depth), repeat, lambda: checkers_ai.get_cache().clear())
+        depths[str(depth)] = {"seconds": seconds, "nodes": nodes}
+    deepest = depths[str(max_depth)]
+    return {"depths": depths, "nodes_per_second": deepest["nodes"] / deepest["seconds"]}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names: list[str] = None, repeat: int = 5, quick: bool = False) -> dict:
+    """
+    Run the benchmarks.
+
+    :param names: Positions to run (default: all of POSITIONS)
+    :param repeat: Runs per timing
+    :param quick: Use two plies less for perft and search, for a fast smoke run
+    :return: JSON-serializable results
+    """
+    results = {"meta": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                        "machine": platform.machine(), "revision": git_revision(),
+                        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "repeat": repeat, "quick": quick},
+               "movegen": {}, "search": {}}
+    for name in names or POSITIONS:
+        rows, player, perft_depth, search_depth = POSITIONS[name]
+        if quick:
+            perft_depth, search_depth = max(perft_depth - 2, 1), max(search_depth - 2, 1)
+        results["movegen"][name] = bench_movegen(rows, player, perft_depth, repeat)
+        results["search"][name] = bench_search(rows, player, search_depth, repeat)
+    return results
+
+
+def compare(old: dict, new: dict, threshold: float = DEFAULT_THRESHOLD) -> tuple[list[dict], bool]:
+    """
+    Compare two runs measurement by measurement.
+
+    A timing that grew by more than threshold (and NOISE_FLOOR) is a regression. So is a perft leaf count that
+    differs, since move generation must not change; a different search node count is reported but is not a
+    regression.
+
+    :return: (one row per measurement present in both runs, whether anything regressed)
+    """
+    rows = []
+    for name, generators in new["movegen"].items():
+        for generator, measurement in generators.items():
+            before = old["movegen"].get(name, {}).get(generator)
+            if before is None or before["depth"] != measurement["depth"]:
+                continue
+            rows.append(_compare_row(f"movegen/{name}/{generator}", before["seconds"], measurement["seconds"],
+                                     before["leaves"], measurement["leaves"], threshold, count_must_match=True))
+    for name, result in new["search"].items():
+        for depth, measurement in result["depths"].items():
+            before = old["search"].get(name, {}).get("depths", {}).get(depth)
+            if before is None:
+                continue
+            rows.append(_compare_row(f"search/{name}/depth {depth}", before["seconds"], measurement["seconds"],
+                                     before["nodes"], measurement["nodes"], threshold, count_must_match=False))
+    return rows, any(row["regression"] for row in rows)
+
+
+def _compare_row(label, old_seconds, new_seconds, old_count, new_count, threshold, count_must_match):
+    ratio = new_seconds / old_seconds if old_seconds else float('inf')
+    count_changed = old_count != new_count
+    return {"measurement": label, "old_seconds": old_seconds, "new_seconds": new_seconds, "ratio": ratio,
+            "old_count": old_count, "new_count": new_count, "count_changed": count_changed,
+            "regression": new_seconds - old_seconds > max(threshold * old_seconds, NOISE_FLOOR)
+                          or (count_must_match and count_changed)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark move generation and search.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks and write JSON results")
+    run_parser.add_argument("--out", help="file to write the results to (default: stdout)")
+    run_parser.add_argument("--repeat", type=int, default=5, help="runs per timing (the best is kept)")
+    run_parser.add_argument("--positions", nargs="+", choices=sorted(POSITIONS), help="positions to run")
+    run_parser.add_argument("--quick", action="store_true", help="shallower depths, for a fast smoke run")
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("old", type=argparse.FileType('r'))
+    compare_parser.add_argument("new", type=argparse.FileType('r'))
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="fractional slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        output = json.dumps(run(args.positions, args.repeat, args.quick), indent=2)
+        if args.out:
+            with open(args.out, 'w') as f:
+                f.write(output + '\n')
+        else:
+            print(output)
+    else:
+        rows, regressed = compare(json.load(args.old), json.load(args.new), args.threshold)
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ("count changed" if row["count_changed"] else "")
+            counts = f"{row['old_count']} -> {row['new_count']}" if row["count_changed"] else f"{row['new_count']}"
+            print(f"{row['measurement']:<32} {row['old_seconds']:9.4f}s -> {row['new_seconds']:9.4f}s "
+                  f"x{row['ratio']:.2f}  {counts:>18}  {flag}")
+        print(f"{sum(row['regression'] for row in rows)} regressions in {len(rows)} measurements")
+        sys.exit(1 if regressed else 0)
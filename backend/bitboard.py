@@ -0,0 +1,321 @@
+"""
+Compact bitboard representation of a checkers position and its move generator.
+
+The 32 playable (dark) squares are numbered 0..31 in row-major order, four per row,
+so square s lives on row s // 4. A position is three 32-bit masks: black pieces,
+red pieces and kings (of either colour).
+"""
+FULL = 0xFFFFFFFF
+
+# Squares on even rows sit in columns 1, 3, 5, 7; on odd rows in columns 0, 2, 4, 6
+EVEN_ROWS = 0x0F0F0F0F
+ODD_ROWS = 0xF0F0F0F0
+LEFT_EDGE = 0x10101010   # column 0
+RIGHT_EDGE = 0x08080808  # column 7
+TOP_ROW = 0x0000000F     # row 0, where red men are crowned
+BOTTOM_ROW = 0xF0000000  # row 7, where black men are crowned
+
+# Direction indices, in the same order as the king directions used by checkers_ai
+UL, UR, DL, DR = 0, 1, 2, 3
+MAN_DIRECTIONS = {'b': (DL, DR), 'r': (UL, UR)}
+KING_DIRECTIONS = (UL, UR, DL, DR)
+DIRECTION_OFFSETS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+# A move is a plain tuple (src, dst, captured, promote): origin and destination squares, the mask of
+# captured squares and whether the moving man is crowned. Tuples are several times cheaper to build
+# than a namedtuple, and the generator builds one per legal move at every node.
+Move = tuple
+SRC, DST, CAPTURED, PROMOTE = 0, 1, 2, 3
+
+
+def _step_ul(mask: int) -> int:
+    return ((mask & EVEN_ROWS) >> 4) | ((mask & ODD_ROWS & ~LEFT_EDGE) >> 5)
+
+
+def _step_ur(mask: int) -> int:
+    return ((mask & EVEN_ROWS & ~RIGHT_EDGE) >> 3) | ((mask & ODD_ROWS) >> 4)
+
+
+def _step_dl(mask: int) -> int:
+    return (((mask & EVEN_ROWS) << 4) | ((mask & ODD_ROWS & ~LEFT_EDGE) << 3)) & FULL
+
+
+def _step_dr(mask: int) -> int:
+    return (((mask & EVEN_ROWS & ~RIGHT_EDGE) << 5) | ((mask & ODD_ROWS) << 4)) & FULL
+
+
+# STEP[d] shifts every bit of a mask one square in direction d; BACK[d] is the opposite shift
+STEP = (_step_ul, _step_ur, _step_dl, _step_dr)
+BACK = (_step_dr, _step_dl, _step_ur, _step_ul)
+
+
+def _origins(back) -> tuple:
+    # For each square, the square one step away in the opposite direction (or -1 off the board)
+    return tuple(back(1 << square).bit_length() - 1 for square in range(32))
+
+
+# ORIGIN[d][dst] is the square a piece moving in direction d to dst came from
+ORIGIN = tuple(_origins(back) for back in BACK)
+
+
+class Board:
+    # This class is used to represent a position as bitboards.
+    # black, red : masks of each side's pieces
+    # kings : mask of crowned pieces of either side
+    __slots__ = ('black', 'red', 'kings')
+
+    def __init__(self, black: int, red: int, kings: int):
+        self.black = black
+        self.red = red
+        self.kings = kings
+
+    def copy(self):
+        return Board(self.black, self.red, self.kings)
+
+    def pieces(self, player: str) -> int:
+        return self.black if player == 'b' else self.red
+
+    def counts(self) -> tuple[int, int, int, int]:
+        """
+        Piece counts in the same order as checkers_ai.count_pieces.
+
+        :return: (red men, black men, red kings, black kings)
+        """
+        red_kings = (self.red & self.kings).bit_count()
+        black_kings = (self.black & self.kings).bit_count()
+        return self.red.bit_count() - red_kings, self.black.bit_count() - black_kings, red_kings, black_kings
+
+    def __eq__(self, other):
+        return isinstance(other, Board) and \
+            self.black == other.black and self.red == other.red and self.kings == other.kings
+
+    def __hash__(self):
+        return hash((self.black, self.red, self.kings))
+
+    def __repr__(self):
+        return f"Board(black={self.black:#010x}, red={self.red:#010x}, kings={self.kings:#010x})"
+
+
+def square_to_coords(square: int) -> tuple[int, int]:
+    row = square >> 2
+    return row, ((square & 3) << 1) + (1 if row % 2 == 0 else 0)
+
+
+def coords_to_square(row: int, col: int) -> int:
+    """
+    Return the square index of (row, col), or -1 if it is not a playable square.
+    """
+    if not (0 <= row < 8 and 0 <= col < 8) or (row + col) % 2 == 0:
+        return -1
+    return (row << 2) | (col >> 1)
+
+
+def from_rows(rows: list[list[str]]) -> Board:
+    """
+    Build a Board from an 8x8 list-of-lists board like checkers_ai.State.board.
+
+    :param rows: 8 rows of 'b', 'B', 'r', 'R' or '.'
+    :return: Equivalent Board
+    """
+    black = red = kings = 0
+    for square in range(32):
+        row, col = square_to_coords(square)
+        piece = rows[row][col]
+        if piece == '.':
+            continue
+        bit = 1 << square
+        if piece in 'bB':
+            black |= bit
+        else:
+            red |= bit
+        if piece in 'BR':
+            kings |= bit
+    return Board(black, red, kings)
+
+
+def to_rows(board: Board) -> list[list[str]]:
+    """
+    Convert a Board back into an 8x8 list-of-lists board.
+
+    :param board: Board to convert
+    :return: 8 rows of 'b', 'B', 'r', 'R' or '.'
+    """
+    rows = [['.'] * 8 for _ in range(8)]
+    for square in range(32):
+        bit = 1 << square
+        if (board.black | board.red) & bit:
+            row, col = square_to_coords(square)
+            piece = 'b' if board.black & bit else 'r'
+            rows[row][col] = piece.upper() if board.kings & bit else piece
+    return rows
+
+
+def _chain_jumps(src: int, bit: int, directions: tuple, opp: int, empty: int, captured: int,
+                 crown_row: int, out: list):
+    """
+    Recursively extend a jump sequence from bit, appending each maximal sequence to out.
+    crown_row is 0 for kings, which are never crowned and keep jumping.
+    """
+    for d in directions:
+        step = STEP[d]
+        mid = step(bit)
+        if mid & opp:
+            land = step(mid)
+            if land & empty:
+                if land & crown_row:
+                    out.append((src, land.bit_length() - 1, captured | mid, True))
+                    continue
+                before = len(out)
+                _chain_jumps(src, land, directions, opp & ~mid, (empty | bit | mid) & ~land,
+                             captured | mid, crown_row, out)
+                if len(out) == before:
+                    out.append((src, land.bit_length() - 1, captured | mid, False))
+
+
+def generate_moves(board: Board, player: str) -> list[Move]:
+    """
+    Generate all legal moves for player. Jumps are forced and chained, and a man reaching
+    the far row is crowned, matching checkers_ai.generate_successors (including its order).
+
+    :param board: The current position
+    :param player: 'b' or 'r'
+    :return: List of moves
+    """
+    black, red = board.black, board.red
+    if player == 'b':
+        own, opp, crown_row, man_dirs = black, red, BOTTOM_ROW, (DL, DR)
+    else:
+        own, opp, crown_row, man_dirs = red, black, TOP_ROW, (UL, UR)
+    empty = ~(black | red) & FULL
+    kings = own & board.kings
+    men = own ^ kings
+    directions = KING_DIRECTIONS if kings else man_dirs
+
+    # Pieces that have at least one single jump available
+    jumpers = 0
+    for d in directions:
+        back = BACK[d]
+        single = back(back(empty) & opp)
+        jumpers |= single & own if d in man_dirs else single & kings
+
+    moves = []
+    if jumpers:
+        while jumpers:
+            bit = jumpers & -jumpers
+            jumpers ^= bit
+            if bit & kings:
+                _chain_jumps(bit.bit_length() - 1, bit, KING_DIRECTIONS, opp, empty | bit, 0, 0, moves)
+            else:
+                _chain_jumps(bit.bit_length() - 1, bit, man_dirs, opp, empty | bit, 0, crown_row, moves)
+        return moves
+
+    # Simple moves: shift every piece that may move in direction d onto the empty squares, then
+    # recover each origin from its destination. Sorting by (src, dst) restores the row-major,
+    # direction-by-direction order of checkers_ai.generate_successors.
+    for d in directions:
+        targets = STEP[d](men) & empty if d in man_dirs else 0
+        origin = ORIGIN[d]
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            dst = bit.bit_length() - 1
+            moves.append((origin[dst], dst, 0, bit & crown_row != 0))
+        targets = STEP[d](kings) & empty
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            dst = bit.bit_length() - 1
+            moves.append((origin[dst], dst, 0, False))
+    moves.sort()
+    return moves
+
+
+def can_jump(board: Board, player: str) -> bool:
+    """
+    Whether player has a jump available (and so must capture), without generating any moves.
+    """
+    black, red = board.black, board.red
+    if player == 'b':
+        own, opp, man_dirs = black, red, (DL, DR)
+    else:
+        own, opp, man_dirs = red, black, (UL, UR)
+    empty = ~(black | red) & FULL
+    kings = own & board.kings
+    for d in (KING_DIRECTIONS if kings else man_dirs):
+        back = BACK[d]
+        if back(back(empty) & opp) & (own if d in man_dirs else kings):
+            return True
+    return False
+
+
+def apply_move(board: Board, player: str, move: Move) -> Board:
+    """
+    Return the Board reached by playing move; board itself is left untouched.
+    """
+    src, dst, captured, promote = move
+    src_bit = 1 << src
+    dst_bit = 1 << dst
+    black, red, kings = board.black, board.red, board.kings
+    if player == 'b':
+        black = (black ^ src_bit) | dst_bit
+        red &= ~captured
+    else:
+        red = (red ^ src_bit) | dst_bit
+        black &= ~captured
+    if kings & src_bit:
+        kings = (kings ^ src_bit) | dst_bit
+    kings &= ~captured
+    if promote:
+        kings |= dst_bit
+    return Board(black, red, kings)
+
+
+def make_move(board: Board, player: str, move: Move) -> tuple[int, int, int]:
+    """
+    Play move on board in place.
+
+    :param board: The position, which is modified
+    :param player: The side making the move
+    :param move: The move to play
+    :return: Undo record to pass to unmake_move
+    """
+    undo = (board.black, board.red, board.kings)
+    src, dst, captured, promote = move
+    src_bit = 1 << src
+    dst_bit = 1 << dst
+    if player == 'b':
+        board.black = (board.black ^ src_bit) | dst_bit
+        board.red &= ~captured
+    else:
+        board.red = (board.red ^ src_bit) | dst_bit
+        board.black &= ~captured
+    kings = board.kings
+    if kings & src_bit:
+        # A king's jump sequence can end on the square it started from, so clear before setting
+        kings = (kings ^ src_bit) | dst_bit
+    kings &= ~captured
+    if promote:
+        kings |= dst_bit
+    board.kings = kings
+    return undo
+
+
+def unmake_move(board: Board, undo: tuple[int, int, int]):
+    """
+    Take back a move played with make_move.
+
+    :param board: The position after the move, which is restored in place
+    :param undo: The record returned by make_move
+    """
+    board.black, board.red, board.kings = undo
+
+
+def generate_successors(board: Board, player: str) -> list[Board]:
+    """
+    Bitboard counterpart of checkers_ai.generate_successors.
+
+    :param board: The current position
+    :param player: 'b' or 'r'
+    :return: List of successor Boards, in the same order as the moves from generate_moves
+    """
+    return [apply_move(board, player, move) for move in generate_moves(board, player)]
@@ -0,0 +1,230 @@
+"""
+Opening book: the engine's moves for the first few plies of the game, searched deeply once, offline, and
+looked up at play time instead of searching.
+
+    python book.py build --plies 8 --depth 12          # writes opening_book.bin next to this file
+    python book.py probe --board board.txt --player b  # look a position up
+
+The builder walks the game tree from the opening. On the book side's turns it searches the position to a
+fixed depth and follows only the move found, since that is the move the engine will play; on the other
+side's turns it follows every legal move. Each searched position becomes one record.
+
+The file is a header followed by fixed-size records sorted by Zobrist key (transposition.zobrist_hash of the
+position and side to move), so at play time it is memory-mapped and binary-searched without being read in:
+
+    header: magic b'CKBK', version (u16), search depth (u16), record count (u32)
+    record: key (u64), move (u64, transposition.pack_move), score (i32, black's point of view), depth (u32)
+"""
+import argparse
+import mmap
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+import checkers_ai
+import search
+import transposition
+
+MAGIC = b'CKBK'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+RECORD = struct.Struct('<QQiI')
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+
+# Set in each builder worker process by _init_worker
+_table = None  # The worker's own transposition table
+
+
+def _init_worker(table_entries: int):
+    global _table
+    _table = transposition.TranspositionTable(table_entries)
+
+
+class BookError(ValueError):
+    # Raised for a file that is not an opening book this version can read
+    pass
+
+
+class OpeningBook:
+    # This class answers lookups from a book file, memory-mapped read-only.
+    # hits, misses : lookups answered and not answered from the book
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        """
+        :param path: Book file written by build()
+        :raises BookError: if the file is not a valid book
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise BookError(f"{path} is too short to be an opening book")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.depth, self.entries = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise BookError(f"{path} is not a version {VERSION} opening book")
+        if size != HEADER.size + self.entries * RECORD.size:
+            self._map.close()
+            raise BookError(f"{path} is truncated")
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.entries
+
+    def probe(self, board: bitboard.Board, player: str):
+        """
+        Look up the book move for a position.
+
+        :param board: The position
+        :param player: The side to move
+        :return: search.SearchResult with a bitboard.Move and no nodes searched, or None if the position is
+                 not in the book
+        """
+        record = self._find(transposition.zobrist_hash(board, player))
+        result = None
+        if record is not None:
+            move = transposition.unpack_move(record[1])
+            # A key collision, or a book built by a different move generator, must not play an illegal move
+            if move in bitboard.generate_moves(board, player):
+                result = search.SearchResult(move, record[2], record[3], 0)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def _find(self, key: int):
+        low, high = 0, self.entries
+        while low < high:
+            middle = (low + high) // 2
+            record = RECORD.unpack_from(self._map, HEADER.size + middle * RECORD.size)
+            if record[0] < key:
+                low = middle + 1
+            elif record[0] > key:
+                high = middle
+            else:
+                return record
+        return None
+
+
+def _search_position(position: tuple, player: str, depth: int) -> tuple:
+    # Worker task: fixed-depth search of one position, given as (black, red, kings)
+    board = bitboard.Board(*position)
+    _table.new_search()
+    searcher = search.Search(_table, depth)
+    move, value = searcher.alphabeta(board, player, 0, -float('inf'), float('inf'),
+                                     transposition.zobrist_hash(board, player))
+    return move, value
+
+
+def build(path: str = DEFAULT_PATH, plies: int = 8, depth: int = 12, side: str = 'b', root: bitboard.Board = None,
+          player: str = 'r', workers: int = None, table_entries: int = 1 << 20, progress=None) -> int:
+    """
+    Search the early positions of the game and write them to a book file.
+
+    :param path: File to write
+    :param plies: How many plies from root to cover
+    :param depth: Search depth of each position
+    :param side: The side the book plays
+    :param root: Starting position (default: the opening)
+    :param player: The side to move at root
+    :param workers: Worker processes (defaults to the number of CPUs; 1 searches in this process)
+    :param table_entries: Size of each worker's transposition table
+    :param progress: Optional callable(ply, positions searched so far), called after each ply
+    :return: Number of positions written
+    """
+    if root is None:
+        root = bitboard.from_rows(checkers_ai.INITIAL_BOARD)
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(table_entries,)) \
+        if workers > 1 else None
+    if executor is None:
+        _init_worker(table_entries)
+
+    records = {}
+    frontier = {(root.black, root.red, root.kings)}
+    try:
+        for ply in range(plies):
+            following = set()
+            if player == side:
+                positions = sorted(frontier)
+                answers = (executor.map if executor else map)(_search_position, positions,
+                                                              [player] * len(positions), [depth] * len(positions))
+                for position, (move, value) in zip(positions, answers):
+                    if move is None:
+                        continue  # Game over
+                    board = bitboard.Board(*position)
+                    records[transposition.zobrist_hash(board, player)] = (transposition.pack_move(move), int(value))
+                    child = bitboard.apply_move(board, player, move)
+                    following.add((child.black, child.red, child.kings))
+            else:
+                for position in frontier:
+                    board = bitboard.Board(*position)
+                    for move in bitboard.generate_moves(board, player):
+                        child = bitboard.apply_move(board, player, move)
+                        following.add((child.black, child.red, child.kings))
+            frontier = following
+            player = 'r' if player == 'b' else 'b'
+            if progress is not None:
+                progress(ply + 1, len(records))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Write to a temporary file first, so a server reading the old book never sees a partial one
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, depth, len(records)))
+        for key in sorted(records):
+            move, value = records[key]
+            f.write(RECORD.pack(key, move, value, depth))
+    os.replace(temporary, path)
+    return len(records)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or query the opening book.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="search the early positions and write the book")
+    build_parser.add_argument("--out", default=DEFAULT_PATH, help="book file to write")
+    build_parser.add_argument("--plies", type=int, default=8, help="plies from the opening to cover")
+    build_parser.add_argument("--depth", type=int, default=12, help="search depth of each position")
+    build_parser.add_argument("--side", choices=('r', 'b'), default='b', help="side the book plays")
+    build_parser.add_argument("--workers", type=int, help="worker processes (default: number of CPUs)")
+    probe_parser = commands.add_parser("probe", help="look a position up")
+    probe_parser.add_argument("--book", default=DEFAULT_PATH, help="book file to read")
+    probe_parser.add_argument("--board", help="file holding the position, 8 lines of 8 squares (default: opening)")
+    probe_parser.add_argument("--player", choices=('r', 'b'), default='b', help="side to move")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build(args.out, args.plies, args.depth, args.side, workers=args.workers,
+                      progress=lambda ply, searched: print(f"ply {ply}: {searched} positions", flush=True))
+        print(f"wrote {count} positions to {args.out} in {time.perf_counter() - start:.1f}s")
+    else:
+        rows = checkers_ai.read_from_file(args.board) if args.board else checkers_ai.INITIAL_BOARD
+        with OpeningBook(args.book) as book:
+            result = book.probe(bitboard.from_rows(rows), args.player)
+        if result is None:
+            print("not in book")
+        else:
+            print(f"{bitboard.square_to_coords(result.move[bitboard.SRC])} -> "
+                  f"{bitboard.square_to_coords(result.move[bitboard.DST])}  score {result.value}  depth {result.depth}")
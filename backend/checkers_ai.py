@@ -3,18 +3,100 @@ import copy
 import sys
 import time
 
-cache = {}  # you can use this to implement state caching
+import bitboard
+import evaluation
+import search
+import transposition
+
+# Transposition table shared by all searches in this process. It has a fixed size, so it can live as
+# long as the process does. It is created by get_cache the first time a search needs it (so that importing
+# this module costs nothing), unless the caller has set one first.
+cache = None
+
+DIAGONALS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+# The starting position. Copy the rows before building a board to change from it.
+INITIAL_BOARD = [
+    ['.', 'b', '.', 'b', '.', 'b', '.', 'b'],
+    ['b', '.', 'b', '.', 'b', '.', 'b', '.'],
+    ['.', 'b', '.', 'b', '.', 'b', '.', 'b'],
+    ['.', '.', '.', '.', '.', '.', '.', '.'],
+    ['.', '.', '.', '.', '.', '.', '.', '.'],
+    ['r', '.', 'r', '.', 'r', '.', 'r', '.'],
+    ['.', 'r', '.', 'r', '.', 'r', '.', 'r'],
+    ['r', '.', 'r', '.', 'r', '.', 'r', '.']
+]
+
+
+def get_cache() -> transposition.TranspositionTable:
+    global cache
+    if cache is None:
+        cache = transposition.TranspositionTable()
+    return cache
+
+
+def _build_targets() -> list[dict]:
+    targets = []
+    for row in range(8):
+        for col in range(8):
+            square = {}
+            for d_row, d_col in DIAGONALS:
+                step_row, step_col = row + d_row, col + d_col
+                if 0 <= step_row < 8 and 0 <= step_col < 8:
+                    jump_row, jump_col = step_row + d_row, step_col + d_col
+                    jump = (jump_row, jump_col) if 0 <= jump_row < 8 and 0 <= jump_col < 8 else None
+                    square[(d_row, d_col)] = (step_row, step_col, jump)
+            targets.append(square)
+    return targets
+
+
+# TARGETS[row * 8 + col][direction] is (row, col, jump): the square one step from (row, col) in direction,
+# and the square two steps away (None if that is off the board). Directions leading off the board are absent.
+TARGETS = _build_targets()
+
+# The 32 dark squares pieces play on, in row-major order
+PLAYABLE_SQUARES = tuple((row, col) for row in range(8) for col in range(8) if (row + col) % 2 == 1)
+
+
+class FrozenList(list):
+    # This class is a list that cannot be changed, used for State.board and its rows. It compares equal to (and
+    # serializes like) an ordinary list; copy it (e.g. [row[:] for row in state.board]) to get one to change.
+    __slots__ = ()
+
+    def _read_only(self, *args):
+        raise TypeError("State boards cannot be changed; build a new State from a copy of the rows")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
 
 
 class State:
     # This class is used to represent a state.
-    # board : a list of lists that represents the 8*8 board
+    # board : a read-only list of lists that represents the 8*8 board (see FrozenList), made from _rows when read
+    # legal_moves : per player, the index of legal moves built by legal_move_index (the board cannot change, so
+    #               it stays valid)
+    # history : Zobrist keys of the game's positions since the last capture or man move, oldest first, not
+    #           counting this one (set by record_move)
+    # quiet_plies : plies since the last capture or man move
+    # _rows : the board itself, as a tuple of row tuples. States made from one another share the rows they have
+    #         in common. Move generation reads it directly, as tuples index faster than board's lists.
+    # _packed, _hash : the board as bitboard masks and its hash, computed the first time they are needed
+    __slots__ = ('_rows', 'num_r', 'num_b', 'num_r_kings', 'num_b_kings', 'initial_coords', 'new_move_coords',
+                 'move_num', 'legal_moves', 'history', 'quiet_plies', '_packed', '_hash')
+
+    width = 8
+    height = 8
+
     def __init__(self, board, red, black, red_kings, black_kings):
 
-        self.board = board
+        if type(board) is tuple and all(type(row) is tuple for row in board):
+            self._rows = board
+        else:
+            self._rows = tuple(map(tuple, board))
 
-        self.width = 8
-        self.height = 8
         self.num_r = red
         self.num_b = black
         self.num_r_kings = red_kings
@@ -22,9 +104,18 @@ class State:
         self.initial_coords = (None, None)
         self.new_move_coords = (None, None)
         self.move_num = 0
+        self.legal_moves = {}
+        self.history = ()
+        self.quiet_plies = 0
+        self._packed = None
+        self._hash = None
+
+    @property
+    def board(self) -> FrozenList:
+        return FrozenList(map(FrozenList, self._rows))
 
     def display(self):
-        for i in self.board:
+        for i in self._rows:
             for j in i:
                 print(j, end="")
             print("")
@@ -46,37 +137,64 @@ class State:
         for row in range(8):
             print(f"{row} |", end=" ")  # Left coordinate
             for col in range(8):
-                print(self.board[row][col], end=" ")
+                print(self._rows[row][col], end=" ")
             print("")  # Newline after each row
         print("")
 
     def copy(self):
-        new_board = [row[:] for row in self.board]
-        return State(new_board, self.num_r, self.num_b, self.num_r_kings, self.num_b_kings)
+        return State(self._rows, self.num_r, self.num_b, self.num_r_kings, self.num_b_kings)
+
+    def with_pieces(self, *changes: tuple[int, int, str]) -> 'State':
+        """
+        Copy of this state with some squares changed, sharing the rows that do not change.
+
+        :param changes: (row, col, piece) for each square to change
+        :return: The new state (with the same piece counts; see update_counts)
+        """
+        rows = list(self._rows)
+        for row, col, piece in changes:
+            line = list(rows[row])
+            line[col] = piece
+            rows[row] = tuple(line)
+        return State(tuple(rows), self.num_r, self.num_b, self.num_r_kings, self.num_b_kings)
 
     def __str__(self):
         """
         Convert the board into a string format
         """
         string = ""
-        for i, line in enumerate(self.board):
+        for i, line in enumerate(self._rows):
             for ch in line:
                 string += ch
             string += "\n"
         return string
 
-    def __hash__(self):
-        # Create a hash based on the string representation
-        board_str = ''.join([''.join(row) for row in self.board])  # Flatten the board to a string
+    @property
+    def packed(self) -> tuple[int, int, int]:
+        """
+        The board as (black, red, kings) bitboard masks, as in bitboard.Board
+        """
+        if self._packed is None:
+            board = bitboard.from_rows(self._rows)
+            self._packed = (board.black, board.red, board.kings)
+        return self._packed
 
-        return hash(f"{board_str}|{self.num_r + self.num_r_kings}|{self.num_b + self.num_b_kings}")
+    def position(self) -> bitboard.Board:
+        """
+        The board as a new bitboard.Board
+        """
+        return bitboard.Board(*self.packed)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self.packed)
+        return self._hash
 
     def __eq__(self, other):
-        # Equality check based on the string representation
-        return isinstance(other, State) and self.__str__() == other.__str__()
+        return isinstance(other, State) and self.packed == other.packed
 
     def get_key(self, player: str, depth: int) -> str:
-        board_str = ''.join([''.join(row) for row in self.board])  # Flatten the board to a string
+        board_str = ''.join([''.join(row) for row in self._rows])  # Flatten the board to a string
 
         return f"{board_str}|{player}|{depth}"
 
@@ -95,20 +213,21 @@ def generate_successors(state: State, player: str) -> list[State]:
     """
     successors = []
     normal_directions = get_directions(player)
-    king_directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]  # King moves in all directions
+    king_directions = DIAGONALS  # King moves in all directions
     opponent = get_opp_char(player)
-
-    for i in range(state.height):
-        for j in range(state.width):
-            piece = state.board[i][j]
-            if piece == player.lower():  # Normal piece
-                # Check all possible moves and jumps for a normal piece
-                normal_moves = get_possible_moves(state, i, j, piece, opponent, normal_directions)
-                successors.extend(normal_moves)
-            elif piece == player.upper():  # King piece
-                # Check all possible moves and jumps for a king piece
-                king_moves = get_possible_moves(state, i, j, piece, opponent, king_directions)
-                successors.extend(king_moves)
+    man, king = player.lower(), player.upper()
+    board = state._rows
+
+    for i, j in PLAYABLE_SQUARES:
+        piece = board[i][j]
+        if piece == '.':
+            continue
+        if piece == man:  # Normal piece
+            # Check all possible moves and jumps for a normal piece
+            successors.extend(get_possible_moves(state, i, j, piece, opponent, normal_directions))
+        elif piece == king:  # King piece
+            # Check all possible moves and jumps for a king piece
+            successors.extend(get_possible_moves(state, i, j, piece, opponent, king_directions))
 
     # Filter all new states to only include jumps, if any
     filtered_successors = filter_jumps(state, successors, opponent)
@@ -116,6 +235,25 @@ def generate_successors(state: State, player: str) -> list[State]:
     return filtered_successors
 
 
+def legal_move_index(state: State, player: str) -> dict[tuple, State]:
+    """
+    Index of a player's legal moves, generated the first time it is asked for and kept on the state, so that
+    listing the moves and checking one are lookups rather than move generation.
+
+    :param state: The current state of the checkers game.
+    :param player: The player to move ('b' or 'r').
+    :return: Dict of ((from row, from col), (to row, to col)) -> successor state, in generate_successors order.
+             Forced jumps apply: if any jump exists, only jumps are in it.
+    """
+    index = state.legal_moves.get(player)
+    if index is None:
+        index = {}
+        for new_state in generate_successors(state, player):
+            index.setdefault((tuple(new_state.initial_coords), tuple(new_state.new_move_coords)), new_state)
+        state.legal_moves[player] = index
+    return index
+
+
 def filter_jumps(curr_state: State, successors: list[State], opponent: str):
     """
     Return a list of successor states corresponding to only jump moves, if any. Otherwise, return successors
@@ -166,46 +304,45 @@ def get_possible_moves(state: State, row: int, col: int, player: str, opponent:
     """
     simple = []
     jumps = []
+    board = state._rows
+    targets = TARGETS[row * 8 + col]
 
     for direction in directions:
-        new_row = row + direction[0]
-        new_col = col + direction[1]
-
-        if is_within_bounds(state, new_row + direction[0], new_col + direction[1]) and \
-                state.board[new_row][new_col].lower() == opponent and \
-                state.board[new_row + direction[0]][new_col + direction[1]] == '.':  # Jump over opponent's piece
-            new_state = state.copy()
-            new_state.board[row][col] = '.'
-            new_state.board[new_row][new_col] = '.'
-            new_state.board[new_row + direction[0]][new_col + direction[1]] = player
-            update_counts(new_state, state.board[new_row][new_col], "jump")
-            new_state.update_coords((row, col), (new_row + direction[0], new_col + direction[1]))
+        target = targets.get(direction)
+        if target is None:  # Off the board
+            continue
+        new_row, new_col, jump = target
+
+        if jump is not None and board[new_row][new_col].lower() == opponent and \
+                board[jump[0]][jump[1]] == '.':  # Jump over opponent's piece
+            jump_row, jump_col = jump
+            crowned = can_become_king(player, jump_row)
+            new_state = state.with_pieces((row, col, '.'), (new_row, new_col, '.'),
+                                          (jump_row, jump_col, player.upper() if crowned else player))
+            update_counts(new_state, board[new_row][new_col], "jump")
+            new_state.update_coords((row, col), jump)
             new_state.move_num = state.move_num + 1
 
-            if can_become_king(player, new_row + direction[0]):
-                new_state.board[new_row + direction[0]][new_col + direction[1]] = player.upper()
+            if crowned:
                 update_counts(new_state, player.upper(), "to-king")
                 jumps.append(new_state)
 
             else:
                 # After a jump, check for additional chained jumps
-                chain_moves = get_chain_jumps(new_state, new_row + direction[0], new_col + direction[1],
-                                              player, opponent, directions)
+                chain_moves = get_chain_jumps(new_state, jump_row, jump_col, player, opponent, directions)
                 if chain_moves:
                     jumps.extend(chain_moves)
                 else:
                     jumps.append(new_state)
 
-        elif is_within_bounds(state, new_row, new_col) and state.board[new_row][new_col] == '.':
+        elif board[new_row][new_col] == '.':
             # Regular move
-            new_state = state.copy()
-            new_state.board[row][col] = '.'
-            new_state.board[new_row][new_col] = player
+            crowned = can_become_king(player, new_row)
+            new_state = state.with_pieces((row, col, '.'), (new_row, new_col, player.upper() if crowned else player))
             new_state.update_coords((row, col), (new_row, new_col))
             new_state.move_num = state.move_num + 1
 
-            if can_become_king(player, new_row):
-                new_state.board[new_row][new_col] = player.upper()
+            if crowned:
                 update_counts(new_state, player.upper(), "to-king")
 
             simple.append(new_state)
@@ -238,31 +375,28 @@ def get_chain_jumps(state: State, row: int, col: int, player: str, opponent: str
     :return: A list of states if additional jumps are possible; otherwise, an empty list
     """
     chain_moves = []
+    board = state._rows
+    targets = TARGETS[row * 8 + col]
 
     for direction in directions:
-        new_row = row + direction[0]
-        new_col = col + direction[1]
-
-        if is_within_bounds(state, new_row + direction[0], new_col + direction[1]):
-            if state.board[new_row][new_col].lower() == opponent \
-                    and state.board[new_row + direction[0]][new_col + direction[1]] == '.':
+        target = targets.get(direction)
+        if target is not None and target[2] is not None:
+            new_row, new_col, (jump_row, jump_col) = target
+            if board[new_row][new_col].lower() == opponent and board[jump_row][jump_col] == '.':
                 # Create new state
-                new_state = state.copy()
-                new_state.board[row][col] = '.'
-                new_state.board[new_row][new_col] = '.'
-                new_state.board[new_row + direction[0]][new_col + direction[1]] = player
-                update_counts(new_state, state.board[new_row][new_col], "jump")
-                new_state.update_coords((row, col), (new_row + direction[0], new_col + direction[1]))
+                crowned = can_become_king(player, jump_row)
+                new_state = state.with_pieces((row, col, '.'), (new_row, new_col, '.'),
+                                              (jump_row, jump_col, player.upper() if crowned else player))
+                update_counts(new_state, board[new_row][new_col], "jump")
+                new_state.update_coords((row, col), (jump_row, jump_col))
                 new_state.move_num = state.move_num
 
-                if can_become_king(player, new_row + direction[0]):
-                    new_state.board[new_row + direction[0]][new_col + direction[1]] = player.upper()
+                if crowned:
                     update_counts(new_state, player.upper(), "to-king")
                     chain_moves.append(new_state)
 
                 else:
-                    additional_jumps = get_chain_jumps(new_state, new_row + direction[0], new_col + direction[1],
-                                                       player, opponent, directions)
+                    additional_jumps = get_chain_jumps(new_state, jump_row, jump_col, player, opponent, directions)
                     if additional_jumps:
                         chain_moves.extend(additional_jumps)
                     else:
@@ -321,6 +455,42 @@ def game_over(state: State) -> bool:
     return state.num_r + state.num_r_kings == 0 or state.num_b + state.num_b_kings == 0
 
 
+def record_move(parent: State, child: State, player: str) -> State:
+    """
+    Carry the game's history over from parent to child, the state after player's move, for draw detection.
+
+    :param parent: The state the move was played from
+    :param child: The state after the move
+    :param player: The player who moved ('b' or 'r')
+    :return: child
+    """
+    row, col = child.initial_coords
+    captured = child.num_r + child.num_r_kings + child.num_b + child.num_b_kings != \
+        parent.num_r + parent.num_r_kings + parent.num_b + parent.num_b_kings
+    if captured or parent.board[row][col].islower():
+        child.history = ()
+        child.quiet_plies = 0
+    else:
+        child.history = parent.history + (transposition.zobrist_hash(parent.position(), player),)
+        child.quiet_plies = parent.quiet_plies + 1
+    return child
+
+
+def is_draw(state: State, player: str, draw_plies: int = search.DRAW_PLIES) -> bool:
+    """
+    Check if the game is drawn: by draw_plies plies without a capture or a man moving, or by the same position,
+    with the same player to move, occurring for the third time.
+
+    :param state: The current state of the checkers game (with its history, see record_move)
+    :param player: The player whose turn it is ('b' or 'r')
+    :param draw_plies: Plies without progress after which the game is drawn
+    :return: True if the game is drawn
+    """
+    if state.quiet_plies >= draw_plies:
+        return True
+    return state.history.count(transposition.zobrist_hash(state.position(), player)) >= 2
+
+
 def is_winner(state: State, player: str):
     """
 
@@ -374,76 +544,107 @@ def utility(state: State, depth: int):
 
 def evaluate(state: State):
     """
+    Score a state from black's point of view, with the same evaluation as the search (see evaluation.py).
 
     :param state:
     :return:
     """
-    red_score = state.num_r + state.num_r_kings * 2
-    black_score = state.num_b + state.num_b_kings * 2
-    return black_score - red_score
+    return evaluation.DEFAULT.evaluate(state.position())
 
 
-def limited_minimax_alphabeta(state: State, player: str, depth: int, alpha: float, beta: float) -> tuple:
+def limited_minimax_alphabeta(state: State, player: str, depth: int, alpha: float, beta: float,
+                              max_depth: int = search.MAX_DEPTH, stats: search.SearchStats = None,
+                              quiescence: bool = True) -> tuple:
     """
     Performs depth-limited minimax with alpha-beta pruning, caching, and node ordering.
+    The search itself runs on bitboards (see search.py); only the chosen move is turned back into a State.
 
     :param state: The current state of the checkers game.
     :param player: The player whose turn it is ('r' or 'b').
     :param depth: The current depth in the search tree.
     :param alpha: The best value that the maximizer can guarantee.
     :param beta: The best value that the minimizer can guarantee.
+    :param max_depth: The depth at which the search stops and evaluates.
+    :param stats: Optional search.SearchStats to fill in.
+    :param quiescence: Whether to play out pending captures past max_depth before evaluating.
     :return: The best move and its associated utility value.
     """
-    if game_over(state) or depth == 10:
-        # Return the utility value of the state if it's a terminal state or depth limit reached
-        return state, utility(state, depth)
-
-    # Check if the state has already been evaluated
-    state_key = state.get_key(player, depth)
-    if state_key in cache and depth > 0:
-        return cache[state_key]
-
-    best_move = None
-    if player == 'b':
-        value = -float('inf')  # Maximizer's goal
-        successors = generate_successors(state, player)
-
-        # Sort successors based on heuristic or value (for node ordering)
-        successors.sort(key=lambda x: utility(x, depth), reverse=True)
-
-        for move in successors:
-            next_value = limited_minimax_alphabeta(move, get_opp_char(player), depth + 1, alpha, beta)[1]
-            if next_value > value:
-                value = next_value
-                best_move = move
-            alpha = max(alpha, value)
-            if alpha >= beta:
-                break  # Prune!
+    board = state.position()
+    cache = get_cache()
+    cache.new_search()
+    searcher = search.Search(cache, max_depth, stats=stats, quiescence=quiescence, history=state.history,
+                             quiet_plies=state.quiet_plies)
+    if stats is not None:
+        stats.begin(cache)
+    best_move, value = searcher.alphabeta(board, player, depth, alpha, beta, transposition.zobrist_hash(board, player))
+    if stats is not None:
+        stats.end(cache, searcher)
+    if best_move is None:
+        # Terminal state (or no legal moves, in which case value is +/-inf)
+        return (state if game_over(state) or depth >= max_depth else None), value
+    return board_to_state(bitboard.apply_move(board, player, best_move), state, best_move), value
+
+
+def iterative_deepening(state: State, player: str, time_budget_ms: float,
+                        max_depth: int = search.MAX_PLY, pool=None,
+                        stats: search.SearchStats = None) -> search.SearchResult:
+    """
+    Search depth 1, 2, 3, ... within a wall-clock budget (see search.iterative_deepening). Lines that repeat a
+    position of the game so far (state.history, see record_move) are scored as draws.
+
+    :param state: The current state of the checkers game.
+    :param player: The player whose turn it is ('r' or 'b').
+    :param time_budget_ms: Time budget in milliseconds.
+    :param max_depth: The deepest iteration to attempt.
+    :param pool: A parallel.ParallelSearch to split the root moves across, or None to search on this core.
+    :param stats: Optional search.SearchStats to fill in (only nodes and searches are counted with a pool).
+    :return: SearchResult whose move is the successor State (None if there is no legal move),
+             with the value, the depth reached and the number of nodes searched.
+    """
+    board = state.position()
+    if pool is not None:
+        result = pool.iterative_deepening(board, player, time_budget_ms, max_depth, state.history, state.quiet_plies)
+        if stats is not None:
+            stats.searches += 1
+            stats.nodes += result.nodes
+            result = result._replace(stats=stats)
     else:
-        value = float('inf')  # Minimizer's goal
-        successors = generate_successors(state, player)
+        result = search.iterative_deepening(board, player, time_budget_ms, get_cache(), max_depth, stats=stats,
+                                            history=state.history, quiet_plies=state.quiet_plies)
+    return play_search_result(state, player, result)
+
 
-        # Sort successors based on heuristic or value (for node ordering)
-        successors.sort(key=lambda x: utility(x, depth))
+def play_search_result(state: State, player: str, result: search.SearchResult) -> search.SearchResult:
+    """
+    Replace the bitboard.Move in a search result for state with the successor State it leads to.
 
-        for move in successors:
-            next_value = limited_minimax_alphabeta(move, get_opp_char(player), depth + 1, alpha, beta)[1]
-            if next_value < value:
-                value = next_value
-                best_move = move
-            beta = min(beta, value)
-            if alpha >= beta:
-                break  # Prune!
+    :param state: The state that was searched.
+    :param player: The player who was to move.
+    :param result: SearchResult from a bitboard search of state.
+    :return: The same result, with move being a State (or None if there was no legal move).
+    """
+    if result.move is None:
+        return result
+    board = state.position()
+    return result._replace(move=board_to_state(bitboard.apply_move(board, player, result.move), state, result.move))
 
-    # Handle edge case of only one possible move
-    if successors and not best_move:
-        best_move = successors.pop()
 
-    # Cache the evaluated state and its utility value
-    if depth > 0:
-        cache[state_key] = (best_move, value)
+def board_to_state(board: bitboard.Board, parent: State = None, move: bitboard.Move = None) -> State:
+    """
+    Convert a bitboard.Board into a State, optionally recording the move that led to it from parent.
 
-    return best_move, value
+    :param board: Board to convert
+    :param parent: State the move was played from, if any
+    :param move: bitboard.Move played from parent, if any
+    :return: Equivalent State
+    """
+    num_r, num_b, num_r_kings, num_b_kings = board.counts()
+    new_state = State(bitboard.to_rows(board), num_r, num_b, num_r_kings, num_b_kings)
+    if move is not None:
+        new_state.update_coords(bitboard.square_to_coords(move[0]), bitboard.square_to_coords(move[1]))
+    if parent is not None:
+        new_state.move_num = parent.move_num + 1
+    return new_state
 
 
 def count_pieces(board) -> tuple[int, int, int, int]:
@@ -489,17 +690,7 @@ def get_user_moves_dict(successors: list[State]) -> dict[str, list[tuple]]:
 if __name__ == '__main__':
 
     # Initialize board and game state
-    initial_board = [
-        ['.', 'b', '.', 'b', '.', 'b', '.', 'b'],
-        ['b', '.', 'b', '.', 'b', '.', 'b', '.'],
-        ['.', 'b', '.', 'b', '.', 'b', '.', 'b'],
-        ['.', '.', '.', '.', '.', '.', '.', '.'],
-        ['.', '.', '.', '.', '.', '.', '.', '.'],
-        ['r', '.', 'r', '.', 'r', '.', 'r', '.'],
-        ['.', 'r', '.', 'r', '.', 'r', '.', 'r'],
-        ['r', '.', 'r', '.', 'r', '.', 'r', '.']
-    ]  # Set up the initial board configuration
-    state = State(initial_board, red=12, black=12, red_kings=0, black_kings=0)
+    state = State([row[:] for row in INITIAL_BOARD], red=12, black=12, red_kings=0, black_kings=0)
     winner = ""
     curr_player = 'r'
 
@@ -519,7 +710,7 @@ if __name__ == '__main__':
                     print(f"Move {i+1}: {user_moves[i].initial_coords} to  {user_moves[i].new_move_coords}")
 
                 move = int(input("\nEnter your move number: "))
-                state = user_moves[move-1]
+                state = record_move(state, user_moves[move-1], 'r')
 
             print("\nYour move:", state.move_num)
             state.display_with_coords()
@@ -537,7 +728,7 @@ if __name__ == '__main__':
             beta = 1000000  # float('inf')
 
             ai_move = limited_minimax_alphabeta(state, 'b', 0, alpha, beta)[0]
-            state = ai_move
+            state = record_move(state, ai_move, 'b')
             state.display_with_coords()
 
             # Check for game over after AI's move
@@ -547,5 +738,8 @@ if __name__ == '__main__':
                 break
 
         curr_player = get_next_turn(curr_player)
+        if is_draw(state, curr_player):
+            print("Game over! It's a draw.")
+            break
 
     print(f"WINNER: {winner}")
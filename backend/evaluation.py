@@ -0,0 +1,137 @@
+"""
+Static evaluation of bitboard positions, from black's point of view.
+
+Every term is a piece-square table: the value of a piece depends only on its kind (man or king), its side
+and its square. A position's score is the sum over its pieces, so a move changes it by the table entries of
+the squares it touches, and the search keeps the score up to date move by move (see Search.alphabeta)
+instead of rescanning the board at every leaf.
+
+Scores are in hundredths of a man with the default weights. Weights is a plain namedtuple, so other
+weightings can be tried by passing Evaluator(Weights(...)) to the search; MATERIAL reproduces the old
+material-only evaluation exactly.
+
+Evaluator.evaluate_batch scores thousands of positions in one vectorized NumPy pass, for offline jobs that
+score whole frontiers (see analysis.score_frontier). Without NumPy it scores them one at a time.
+"""
+from collections import namedtuple
+
+import bitboard
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# man, king : material
+# advancement : per row a man has advanced from its own back row
+# back_rank : per man still on its own back row, guarding it against enemy crowning
+# center : per piece on one of the four central squares
+# mobility : per square a piece could step to from its square on an empty board (its forward squares for a man)
+# king_center : taken off per ring a king stands away from the center
+Weights = namedtuple('Weights', ['man', 'king', 'advancement', 'back_rank', 'center', 'mobility', 'king_center'],
+                     defaults=(100, 160, 4, 12, 8, 3, 6))
+
+MATERIAL = Weights(man=1, king=2, advancement=0, back_rank=0, center=0, mobility=0, king_center=0)
+
+CENTER = frozenset(bitboard.coords_to_square(row, col) for row, col in ((3, 2), (3, 4), (4, 3), (4, 5)))
+
+
+def _steps(square: int, directions) -> int:
+    # Number of squares one step from square in the given directions that are on the board
+    return sum(1 for d in directions if bitboard.STEP[d](1 << square))
+
+
+def _table(weights: Weights, player: str, king: bool) -> tuple:
+    # Value of one piece of player's on each square, from that player's point of view
+    values = []
+    for square in range(32):
+        row, col = bitboard.square_to_coords(square)
+        value = weights.center if square in CENTER else 0
+        if king:
+            ring = max(abs(2 * row - 7), abs(2 * col - 7)) // 2  # 0 on the four middle squares, 3 on the edge
+            value += weights.king - weights.king_center * ring
+            value += weights.mobility * _steps(square, bitboard.KING_DIRECTIONS)
+        else:
+            advanced = row if player == 'b' else 7 - row
+            value += weights.man + weights.advancement * advanced
+            value += weights.back_rank if advanced == 0 else 0
+            value += weights.mobility * _steps(square, bitboard.MAN_DIRECTIONS[player])
+        values.append(value)
+    return tuple(values)
+
+
+class Evaluator:
+    # This class scores positions with one set of weights.
+    # tables : (black men, black kings, red men, red kings) piece-square tables, signed from black's point
+    #          of view, so that a position's score is the sum of its pieces' entries
+
+    def __init__(self, weights: Weights = Weights()):
+        self.weights = weights
+        self.tables = (_table(weights, 'b', False), _table(weights, 'b', True),
+                       tuple(-value for value in _table(weights, 'r', False)),
+                       tuple(-value for value in _table(weights, 'r', True)))
+        black_man, black_king, red_man, red_king = self.tables
+        self._sides = {'b': (black_man, black_king, red_man, red_king),
+                       'r': (red_man, red_king, black_man, black_king)}
+        self._table_array = numpy.array(self.tables, dtype=numpy.int64) if numpy is not None else None
+
+    def evaluate(self, board: bitboard.Board) -> int:
+        """
+        Score a position from scratch.
+
+        :param board: The position (with pieces of both sides)
+        :return: Score from black's point of view
+        """
+        score = 0
+        kings = board.kings
+        for mask, table in zip((board.black & ~kings, board.black & kings, board.red & ~kings, board.red & kings),
+                               self.tables):
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                score += table[bit.bit_length() - 1]
+        return score
+
+    def move_delta(self, board: bitboard.Board, player: str, move: bitboard.Move) -> int:
+        """
+        Change in score from playing move, computed before it is played.
+
+        :param board: The position the move is played from
+        :param player: The side making the move
+        :param move: The move
+        :return: evaluate(position after the move) - evaluate(board)
+        """
+        src, dst, captured, promote = move
+        man, king, opp_man, opp_king = self._sides[player]
+        kings = board.kings
+        if kings >> src & 1:
+            delta = king[dst] - king[src]
+        elif promote:
+            delta = king[dst] - man[src]
+        else:
+            delta = man[dst] - man[src]
+        while captured:
+            bit = captured & -captured
+            captured ^= bit
+            delta -= opp_king[bit.bit_length() - 1] if kings & bit else opp_man[bit.bit_length() - 1]
+        return delta
+
+    def evaluate_batch(self, positions):
+        """
+        Score many positions at once.
+
+        :param positions: N positions as (black, red, kings) bitboard words: an (N, 3) array, or a sequence
+                          of triples
+        :return: Scores from black's point of view, as an int64 array of length N (a list without NumPy)
+        """
+        if numpy is None:
+            return [self.evaluate(bitboard.Board(*position)) for position in positions]
+        words = numpy.asarray(positions, dtype=numpy.uint32).reshape(-1, 3)
+        black, red, kings = words[:, 0], words[:, 1], words[:, 2]
+        # One row of 32 squares per kind of piece, in the order of tables
+        masks = numpy.stack((black & ~kings, black & kings, red & ~kings, red & kings), axis=1)
+        occupied = (masks[:, :, None] >> numpy.arange(32, dtype=numpy.uint32)) & 1
+        return numpy.einsum('nks,ks->n', occupied.astype(numpy.int64), self._table_array)
+
+
+DEFAULT = Evaluator()
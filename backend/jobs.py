@@ -0,0 +1,212 @@
+"""
+Background AI move jobs: searches run on a bounded process pool while clients poll (or long-poll) for
+the result, so a request worker is never tied up for the length of a search.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+import search
+import transposition
+
+# Set in each worker process by _init_worker
+_cancel_flags = None  # One flag per job slot, set by the parent to cancel the job running in that slot
+_table = None         # The worker's own transposition table
+
+
+def _init_worker(cancel_flags, table_entries: int, table_path: str):
+    global _cancel_flags, _table
+    _cancel_flags = cancel_flags
+    _table = transposition.TranspositionTable(table_entries, path=table_path)
+
+
+def _run_search(slot: int, black: int, red: int, kings: int, player: str, time_budget_ms: float,
+                history: tuple = (), quiet_plies: int = 0):
+    """
+    Worker task: iterative-deepening search of one position.
+
+    :return: search.SearchResult, or None if the job was cancelled
+    """
+    board = bitboard.Board(black, red, kings)
+    result = search.iterative_deepening(board, player, time_budget_ms, _table, stop=lambda: _cancel_flags[slot],
+                                        stats=search.SearchStats(), history=history, quiet_plies=quiet_plies)
+    if _cancel_flags[slot]:
+        return None
+    return result
+
+
+class QueueFull(Exception):
+    # Raised by JobManager.submit when every job slot is in use
+    pass
+
+
+class Job:
+    # This class tracks one background search.
+    # key : caller's identifier for what the job is about (e.g. a game id); one live job per key
+    # payload : whatever the on_done callback returned, once the job has finished
+    # error : description of the failure, if the search raised
+
+    def __init__(self, job_id: str, key, slot: int, future):
+        self.job_id = job_id
+        self.key = key
+        self.slot = slot
+        self.future = future
+        self.cancelled = False
+        self.payload = None
+        self.error = None
+        self.finished_at = None
+        self.finished = threading.Event()
+
+    @property
+    def status(self) -> str:
+        if self.finished.is_set():
+            if self.cancelled:
+                return "cancelled"
+            return "failed" if self.error is not None else "done"
+        if self.cancelled:
+            return "cancelling"
+        return "running" if self.future.running() else "queued"
+
+
+class JobManager:
+    # This class runs searches on a process pool with at most max_queue jobs queued or running at once.
+    # Finished jobs are kept for keep_seconds so clients can collect their results.
+
+    def __init__(self, workers: int = None, max_queue: int = 64, keep_seconds: float = 600,
+                 table_entries: int = 1 << 18, table_path: str = None):
+        """
+        :param workers: Number of worker processes (defaults to the number of CPUs)
+        :param max_queue: Maximum number of jobs queued or running
+        :param keep_seconds: How long finished jobs stay available
+        :param table_entries: Size of each worker's transposition table
+        :param table_path: Transposition table file for the workers to share instead (see transposition.py)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.keep_seconds = keep_seconds
+        self._cancel_flags = multiprocessing.Array('b', max_queue)
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self._cancel_flags, table_entries, table_path))
+        self._free_slots = list(range(max_queue))
+        self._jobs = {}     # job id -> Job
+        self._live = {}     # key -> job id of its unfinished job
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+
+    def submit(self, key, board: bitboard.Board, player: str, time_budget_ms: float, on_done=None,
+               history: tuple = (), quiet_plies: int = 0) -> Job:
+        """
+        Queue a search, or return the unfinished job already queued for key.
+
+        :param key: What the job is about; at most one unfinished job exists per key
+        :param board: Position to search
+        :param player: Side to move
+        :param time_budget_ms: Time budget of the search
+        :param on_done: Called with the search.SearchResult (including its stats) when the search finishes
+                        (not if cancelled); its return value becomes job.payload
+        :param history: Zobrist keys of the game's positions before this one (see search.Search)
+        :param quiet_plies: Plies without a capture or a man moving that led to this position
+        :return: The Job
+        :raises QueueFull: if max_queue jobs are already queued or running
+        """
+        with self._lock:
+            self._forget_old_jobs()
+            if key in self._live:
+                return self._jobs[self._live[key]]
+            if not self._free_slots:
+                raise QueueFull()
+            slot = self._free_slots.pop()
+            self._cancel_flags[slot] = 0
+            future = self._executor.submit(_run_search, slot, board.black, board.red, board.kings, player,
+                                           time_budget_ms, tuple(history), quiet_plies)
+            job = Job(uuid.uuid4().hex, key, slot, future)
+            self._jobs[job.job_id] = job
+            self._live[key] = job.job_id
+        future.add_done_callback(lambda _: self._finish(job, on_done))
+        return job
+
+    def add_done(self, key, result: search.SearchResult, on_done=None) -> Job:
+        """
+        Record a job for a result found without searching (such as an opening book move), so that clients
+        collect it like any other. If an unfinished job is already queued for key, that job is returned instead.
+
+        :param key: What the job is about
+        :param result: The search.SearchResult
+        :param on_done: Called with result right away; its return value becomes job.payload
+        :return: The finished Job
+        """
+        with self._lock:
+            self._forget_old_jobs()
+            if key in self._live:
+                return self._jobs[self._live[key]]
+        job = Job(uuid.uuid4().hex, key, None, None)
+        try:
+            job.payload = on_done(result) if on_done is not None else None
+        except Exception as e:
+            job.error = str(e)
+        with self._lock:
+            job.finished_at = time.time()
+            self._jobs[job.job_id] = job
+        job.finished.set()
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job: Job, timeout: float) -> Job:
+        """
+        Block until job finishes or timeout seconds pass (for long polling).
+        """
+        job.finished.wait(timeout)
+        return job
+
+    def cancel(self, job: Job) -> Job:
+        """
+        Cancel a job: a queued job never starts, and a running search stops at its next clock check.
+        """
+        with self._lock:
+            # Once finished, the job's slot may already belong to another job
+            if job.finished_at is not None:
+                return job
+            job.cancelled = True
+            self._cancel_flags[job.slot] = 1
+        # Outside the lock: cancelling a queued future runs its done callback right away
+        job.future.cancel()
+        return job
+
+    def pending(self) -> int:
+        with self._lock:
+            return self.max_queue - len(self._free_slots)
+
+    def _finish(self, job: Job, on_done):
+        try:
+            if job.future.cancelled():
+                job.cancelled = True
+            else:
+                result = job.future.result()
+                if result is None:
+                    job.cancelled = True
+                elif not job.cancelled and on_done is not None:
+                    job.payload = on_done(result)
+        except Exception as e:
+            job.error = str(e)
+        finally:
+            with self._lock:
+                self._free_slots.append(job.slot)
+                if self._live.get(job.key) == job.job_id:
+                    del self._live[job.key]
+                job.finished_at = time.time()
+            job.finished.set()
+
+    def _forget_old_jobs(self):
+        cutoff = time.time() - self.keep_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]:
+            del self._jobs[job_id]
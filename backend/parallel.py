@@ -0,0 +1,220 @@
+"""
+Root-parallel alpha-beta search: the moves at the root are split across a pool of worker processes,
+which share the best root value found so far so that later moves are still searched with a narrowed window.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import bitboard
+import checkers_ai
+import search
+import transposition
+
+# Set in each worker process by _init_worker
+_bound = None  # Best root value found so far, shared by all workers (from the root player's point of view)
+_table = None  # The worker's own transposition table
+
+
+def _init_worker(bound, table_entries: int, table_path: str):
+    global _bound, _table
+    _bound = bound
+    _table = transposition.TranspositionTable(table_entries, path=table_path)
+
+
+def _search_root_move(black: int, red: int, kings: int, player: str, move: bitboard.Move, max_depth: int,
+                      generation: int, deadline: float, history: tuple = (), quiet_plies: int = 0):
+    """
+    Worker task: search the position after one root move.
+
+    The window is opened just below the shared bound, so the result is exact whenever this move is at least
+    as good as the best one found so far, and merely known to be worse otherwise.
+
+    :param deadline: time.monotonic() value by which to give up (the clock processes share), or None. It is
+                     fixed when the search starts, so time spent waiting in the pool's queue counts against it.
+    :return: (value, nodes), or (None, nodes) if the time ran out
+    """
+    if deadline is not None:
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            return None, 0
+        deadline = time.perf_counter() + time_left
+    board = bitboard.Board(black, red, kings)
+    key = transposition.zobrist_hash(board, player)
+    child_key = transposition.update_hash(key, board, player, move)
+    quiet = quiet_plies + 1 if search.reversible(board, move) else 0
+    bitboard.make_move(board, player, move)
+    _table.generation = generation
+    searcher = search.Search(_table, max_depth, deadline, history=history + (key,), quiet_plies=quiet)
+    opponent = 'r' if player == 'b' else 'b'
+
+    with _bound.get_lock():
+        bound = _bound.value
+    try:
+        if player == 'b':
+            value = searcher.alphabeta(board, opponent, 1, bound - 1, float('inf'), child_key)[1]
+        else:
+            value = searcher.alphabeta(board, opponent, 1, -float('inf'), bound + 1, child_key)[1]
+    except search.SearchTimeout:
+        return None, searcher.nodes
+
+    with _bound.get_lock():
+        if (value > _bound.value) if player == 'b' else (value < _bound.value):
+            _bound.value = value
+    return value, searcher.nodes
+
+
+class ParallelSearch:
+    # This class owns a process pool for root-parallel searches. The pool (and each worker's
+    # transposition table) is kept between searches; call close() when done.
+    # Only one search may run on an instance at a time, since the workers share a single root bound.
+
+    def __init__(self, workers: int = None, table_entries: int = 1 << 18, table_path: str = None):
+        """
+        :param workers: Number of worker processes (defaults to the number of CPUs)
+        :param table_entries: Size of each worker's transposition table
+        :param table_path: Transposition table file for the workers to share instead (see transposition.py)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self._bound = multiprocessing.Value('d', 0.0)
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self._bound, table_entries, table_path))
+        self._searches = 0
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def search_depth(self, board: bitboard.Board, player: str, max_depth: int = search.MAX_DEPTH,
+                     deadline: float = None, first: bitboard.Move = None, history: tuple = (),
+                     quiet_plies: int = 0) -> search.SearchResult:
+        """
+        Fixed-depth search of board, splitting the root moves across the pool. Returns the same move and
+        value as a serial search.Search to the same depth.
+
+        The first (eldest) root move is searched on its own to establish a bound; the younger ones are then
+        searched in parallel, each starting from the best bound known when it is picked up.
+
+        :param board: The current position
+        :param player: The player to move ('b' or 'r')
+        :param max_depth: Depth of the search
+        :param deadline: time.perf_counter() value by which to give up, raising search.SearchTimeout
+        :param first: Root move to try first, e.g. the best move of a previous iteration
+        :param history: Zobrist keys of the game's positions before this one (see search.Search)
+        :param quiet_plies: Plies without a capture or a man moving that led to this position
+        :return: SearchResult
+        """
+        moves = search.order_moves(board, player, bitboard.generate_moves(board, player), first)
+        if not moves:
+            return search.SearchResult(None, -float('inf') if player == 'b' else float('inf'), max_depth, 1)
+
+        self._searches += 1
+        generation = self._searches & 0xFF
+        with self._bound.get_lock():
+            self._bound.value = -float('inf') if player == 'b' else float('inf')
+
+        # Workers get the deadline on the clock that all processes share
+        shared_deadline = None if deadline is None else time.monotonic() + (deadline - time.perf_counter())
+
+        def submit(move):
+            return self._executor.submit(_search_root_move, board.black, board.red, board.kings, player, move,
+                                         max_depth, generation, shared_deadline, tuple(history), quiet_plies)
+
+        values = [None] * len(moves)
+        nodes = 1
+        eldest = submit(moves[0])
+        values[0], eldest_nodes = eldest.result()
+        nodes += eldest_nodes
+        if values[0] is None:
+            raise search.SearchTimeout()
+
+        pending = {submit(move): index for index, move in enumerate(moves) if index > 0}
+        while pending:
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            done, _ = wait(pending, timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Out of time: moves still queued never start, and running ones stop at their next clock check
+                for other in pending:
+                    other.cancel()
+                raise search.SearchTimeout()
+            for future in done:
+                index = pending.pop(future)
+                values[index], task_nodes = future.result()
+                nodes += task_nodes
+                if values[index] is None:
+                    for other in pending:
+                        other.cancel()
+                    raise search.SearchTimeout()
+
+        # Moves that tie with the best value were all searched with an open enough window to be exact,
+        # so taking the first of them matches the serial search.
+        best_value = max(values) if player == 'b' else min(values)
+        best_index = values.index(best_value)
+        return search.SearchResult(moves[best_index], best_value, max_depth, nodes)
+
+    def iterative_deepening(self, board: bitboard.Board, player: str, time_budget_ms: float,
+                            max_depth: int = search.MAX_PLY, history: tuple = (),
+                            quiet_plies: int = 0) -> search.SearchResult:
+        """
+        Parallel counterpart of search.iterative_deepening.
+        """
+        deadline = time.perf_counter() + time_budget_ms / 1000
+        result = search.SearchResult(None, search.utility(board, 0), 0, 0)
+        nodes = 0
+        for depth in range(1, max_depth + 1):
+            try:
+                iteration = self.search_depth(board, player, depth, deadline if depth > 1 else None, result.move,
+                                              history, quiet_plies)
+            except search.SearchTimeout:
+                break
+            nodes += iteration.nodes
+            result = iteration
+            if len(bitboard.generate_moves(board, player)) <= 1 or abs(result.value) > transposition.WIN_THRESHOLD:
+                break
+            if time.perf_counter() >= deadline:
+                break
+        return result._replace(nodes=nodes)
+
+
+def benchmark(board: bitboard.Board, player: str, depth: int, worker_counts: list[int]) -> list[dict]:
+    """
+    Time a fixed-depth search of board with each number of workers, against the serial search.
+
+    :return: One row per worker count with its time, nodes, speedup and whether it matched the serial move
+    """
+    start = time.perf_counter()
+    serial = search.Search(transposition.TranspositionTable(1 << 18), depth)
+    serial_move, serial_value = serial.alphabeta(board.copy(), player, 0, -float('inf'), float('inf'),
+                                                 transposition.zobrist_hash(board, player))
+    serial_time = time.perf_counter() - start
+
+    rows = [{"workers": 0, "seconds": serial_time, "nodes": serial.nodes, "speedup": 1.0, "same_move": True}]
+    for workers in worker_counts:
+        with ParallelSearch(workers) as pool:
+            pool.search_depth(board, player, 1)  # Start the worker processes before timing
+            start = time.perf_counter()
+            result = pool.search_depth(board, player, depth)
+            elapsed = time.perf_counter() - start
+        rows.append({"workers": workers, "seconds": elapsed, "nodes": result.nodes,
+                     "speedup": serial_time / elapsed,
+                     "same_move": result.move == serial_move and result.value == serial_value})
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark root-parallel search against the serial search.")
+    parser.add_argument("--depth", type=int, default=8, help="search depth")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="worker counts to time")
+    args = parser.parse_args()
+
+    for row in benchmark(bitboard.from_rows(checkers_ai.INITIAL_BOARD), 'r', args.depth, args.workers):
+        label = "serial" if row["workers"] == 0 else f"{row['workers']} workers"
+        print(f"{label:>10}: {row['seconds']:.3f}s  {row['nodes']} nodes  "
+              f"x{row['speedup']:.2f}  same move: {row['same_move']}")
@@ -0,0 +1,127 @@
+"""
+Perft: count the positions a fixed number of plies ahead, as a correctness check and throughput measure
+for the move generators. "Divide" breaks the count down by root move, which narrows a wrong total down
+to the line that causes it.
+
+    python perft.py --depth 6                      # opening, checked against OPENING_COUNTS
+    python perft.py --depth 5 --divide --generator states
+    python perft.py --depth 4 --board board.txt --player b
+"""
+import argparse
+import sys
+import time
+
+import bitboard
+import checkers_ai
+
+# Published perft counts for the standard opening, side to move first (red here, as in the app)
+OPENING_COUNTS = {1: 7, 2: 49, 3: 302, 4: 1469, 5: 7361, 6: 36768, 7: 179740, 8: 845931, 9: 3963680,
+                  10: 18391564}
+
+GENERATORS = ('bitboard', 'states')
+
+
+def perft(state: checkers_ai.State, player: str, depth: int) -> int:
+    """
+    Count the positions depth plies below state, using checkers_ai.generate_successors.
+
+    :param state: The root position
+    :param player: The side to move
+    :param depth: Number of plies
+    :return: Number of leaf positions (lines ending early in a loss are not counted)
+    """
+    if depth == 0:
+        return 1
+    successors = checkers_ai.generate_successors(state, player)
+    if depth == 1:
+        return len(successors)
+    opponent = checkers_ai.get_opp_char(player)
+    return sum(perft(child, opponent, depth - 1) for child in successors)
+
+
+def perft_bitboard(board: bitboard.Board, player: str, depth: int) -> int:
+    """
+    Same as perft, using bitboard.generate_moves with make/unmake (board is left unchanged).
+    """
+    if depth == 0:
+        return 1
+    moves = bitboard.generate_moves(board, player)
+    if depth == 1:
+        return len(moves)
+    opponent = 'r' if player == 'b' else 'b'
+    total = 0
+    for move in moves:
+        undo = bitboard.make_move(board, player, move)
+        total += perft_bitboard(board, opponent, depth - 1)
+        bitboard.unmake_move(board, undo)
+    return total
+
+
+def divide(state: checkers_ai.State, player: str, depth: int, generator: str = 'bitboard') -> list[tuple]:
+    """
+    Perft of each root move separately.
+
+    Both generators list the moves in the same order. For multi-jumps, 'states' labels a move with the
+    start of its last hop (State.initial_coords) rather than the square the piece started on.
+
+    :param generator: 'bitboard' or 'states'
+    :return: [((from row, from col), (to row, to col), count)] in move generation order
+    """
+    opponent = checkers_ai.get_opp_char(player)
+    if generator == 'states':
+        return [(child.initial_coords, child.new_move_coords, perft(child, opponent, depth - 1))
+                for child in checkers_ai.generate_successors(state, player)]
+    board = state.position()
+    counts = []
+    for move in bitboard.generate_moves(board, player):
+        undo = bitboard.make_move(board, player, move)
+        counts.append((bitboard.square_to_coords(move[bitboard.SRC]), bitboard.square_to_coords(move[bitboard.DST]),
+                       perft_bitboard(board, opponent, depth - 1)))
+        bitboard.unmake_move(board, undo)
+    return counts
+
+
+def run(state: checkers_ai.State, player: str, depth: int, generator: str = 'bitboard') -> tuple[int, float]:
+    """
+    Time a perft.
+
+    :return: (count, seconds)
+    """
+    start = time.perf_counter()
+    if generator == 'states':
+        count = perft(state, player, depth)
+    else:
+        count = perft_bitboard(state.position(), player, depth)
+    return count, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Count positions a fixed number of plies ahead.")
+    parser.add_argument("--depth", type=int, default=6, help="number of plies")
+    parser.add_argument("--generator", choices=GENERATORS, default='bitboard', help="move generator to use")
+    parser.add_argument("--divide", action="store_true", help="break the count down by root move")
+    parser.add_argument("--board", help="file holding the root position, 8 lines of 8 squares (default: opening)")
+    parser.add_argument("--player", choices=('r', 'b'), default='r', help="side to move")
+    args = parser.parse_args()
+
+    rows = checkers_ai.read_from_file(args.board) if args.board else [row[:] for row in checkers_ai.INITIAL_BOARD]
+    root = checkers_ai.State(rows, *bitboard.from_rows(rows).counts())
+
+    start = time.perf_counter()
+    if args.divide:
+        moves = divide(root, args.player, args.depth, args.generator)
+        for src, dst, count in moves:
+            print(f"{src} -> {dst}: {count}")
+        total = sum(count for _, _, count in moves)
+        print(f"moves: {len(moves)}")
+    else:
+        total = run(root, args.player, args.depth, args.generator)[0]
+    elapsed = time.perf_counter() - start
+    print(f"perft({args.depth}) = {total}  {elapsed:.3f}s  {total / elapsed if elapsed else 0:,.0f} leaves/s")
+
+    if not args.board and args.player == 'r' and args.depth in OPENING_COUNTS:
+        expected = OPENING_COUNTS[args.depth]
+        if total != expected:
+            print(f"MISMATCH: expected {expected}")
+            sys.exit(1)
+        print("matches the known count")
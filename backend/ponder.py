@@ -0,0 +1,127 @@
+"""
+Pondering: while the user is thinking, search the AI's answer to each of the user's likely replies in the
+background, so that when the user's move arrives the AI's move is already found (or partly searched).
+
+Searches run as jobs on their own small JobManager, so the number of worker processes caps the CPU that
+pondering can take from everything else, however many games are being pondered.
+"""
+import threading
+from collections import OrderedDict
+
+import bitboard
+import jobs
+import search
+import transposition
+
+
+class Ponderer:
+    # This class ponders games on a dedicated job pool.
+    # For each game it remembers the position being pondered and one job per user reply, keyed by the
+    # position the reply leads to.
+
+    def __init__(self, workers: int = 1, max_replies: int = 8, time_budget_ms: float = 1000, max_games: int = 64,
+                 table_entries: int = 1 << 18, table_path: str = None):
+        """
+        :param workers: Worker processes for pondering; the CPU cap
+        :param max_replies: Most replies pondered per position, the likeliest first
+        :param time_budget_ms: Time budget of the search of each reply
+        :param max_games: Most games pondered at once; the least recently started are dropped
+        :param table_entries: Size of each worker's transposition table
+        :param table_path: Transposition table file for the workers to share instead (see transposition.py)
+        """
+        self.max_replies = max_replies
+        self.time_budget_ms = time_budget_ms
+        self.max_games = max_games
+        self.hits = 0
+        self.misses = 0
+        self._jobs = jobs.JobManager(workers, max_queue=max_games * max_replies, table_entries=table_entries,
+                                     table_path=table_path)
+        self._games = OrderedDict()  # game id -> (position pondered, {reply position: Job})
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._jobs.close()
+
+    def start(self, game_id, board: bitboard.Board, player: str = 'r', history: tuple = (), quiet_plies: int = 0):
+        """
+        Start pondering a game in which player (the user) is to move, unless that position is already being
+        pondered. Replies are searched likeliest first, by the same ordering the search uses.
+        history and quiet_plies describe the game before board, as for search.Search.
+        """
+        position = (board.black, board.red, board.kings)
+        with self._lock:
+            if game_id in self._games and self._games[game_id][0] == position:
+                return
+        self.stop(game_id)
+
+        opponent = 'r' if player == 'b' else 'b'
+        key = transposition.zobrist_hash(board, player)
+        moves = search.order_moves(board, player, bitboard.generate_moves(board, player))[:self.max_replies]
+        replies = {}
+        for move in moves:
+            reply = bitboard.apply_move(board, player, move)
+            reply_position = (reply.black, reply.red, reply.kings)
+            if reply_position in replies:
+                continue
+            quiet = quiet_plies + 1 if search.reversible(board, move) else 0
+            try:
+                replies[reply_position] = self._jobs.submit((game_id, reply_position), reply, opponent,
+                                                            self.time_budget_ms, on_done=lambda result: result,
+                                                            history=tuple(history) + (key,) if quiet else (),
+                                                            quiet_plies=quiet)
+            except jobs.QueueFull:
+                break
+
+        with self._lock:
+            self._games[game_id] = (position, replies)
+            self._games.move_to_end(game_id)
+            dropped = []
+            while len(self._games) > self.max_games:
+                dropped.append(self._games.popitem(last=False)[1][1])
+        for old_replies in dropped:
+            self._cancel(old_replies.values())
+
+    def stop(self, game_id):
+        """Stop pondering a game and forget its results."""
+        with self._lock:
+            entry = self._games.pop(game_id, None)
+        if entry is not None:
+            self._cancel(entry[1].values())
+
+    def take(self, game_id, board: bitboard.Board, timeout: float):
+        """
+        Collect the pondered search of board, the position after the user's move, and stop pondering the game.
+
+        A search already running is waited for, up to timeout seconds; one still queued behind other games'
+        searches counts as not pondered, since searching afresh is quicker.
+
+        :return: search.SearchResult for board, or None if it was not pondered (or did not finish in time)
+        """
+        with self._lock:
+            entry = self._games.pop(game_id, None)
+        if entry is None:
+            return None
+        replies = entry[1]
+        job = replies.pop((board.black, board.red, board.kings), None)
+        self._cancel(replies.values())
+
+        result = None
+        if job is not None and job.status in ("running", "done"):
+            self._jobs.wait(job, timeout)
+            if job.status == "done":
+                result = job.payload
+        if job is not None and result is None:
+            self._jobs.cancel(job)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def pending(self) -> int:
+        return self._jobs.pending()
+
+    def _cancel(self, replies):
+        for job in replies:
+            self._jobs.cancel(job)
@@ -0,0 +1,642 @@
+"""
+Alpha-beta search over bitboard positions, and an iterative-deepening driver with a time budget.
+"""
+import time
+from collections import namedtuple
+
+import bitboard
+import evaluation
+import tablebase
+import transposition
+
+MAX_DEPTH = 10  # Default depth of a fixed-depth search
+MAX_PLY = 64    # Deepest iteration iterative deepening will attempt
+KILLER_SLOTS = 2  # Killer moves remembered per ply
+ASPIRATION_WINDOW = 10  # Default margin around the previous iteration's value for iterative deepening's root window
+DRAW_PLIES = 80  # A game is drawn after this many plies in a row without a capture or a man moving (40 moves each)
+DRAW = 0  # Score of a drawn position
+# Move orderings below the root (see Search.order_moves): 'full' uses killer moves and the history heuristic,
+# 'static' only what the move itself captures, crowns and changes in the evaluation, and 'none' keeps
+# generation order. In each the transposition table's move (at the root, the previous iteration's) goes first.
+ORDERINGS = ('full', 'static', 'none')
+
+# Result of a root search: best move (a bitboard.Move, or None), its value, depth reached, nodes searched,
+# and the SearchStats of the search if they were asked for
+SearchResult = namedtuple('SearchResult', ['move', 'value', 'depth', 'nodes', 'stats'], defaults=(None,))
+
+
+class SearchTimeout(Exception):
+    # Raised from inside the search when the deadline passes; the interrupted iteration is discarded
+    pass
+
+
+def utility(board: bitboard.Board, depth: int, evaluator: evaluation.Evaluator = None):
+    """
+    Same as checkers_ai.utility, for a bitboard.Board.
+
+    :param board:
+    :param depth:
+    :param evaluator: Evaluation of positions with pieces on both sides (default: evaluation.DEFAULT)
+    :return:
+    """
+    if board.red == 0:
+        return 1000000 - depth  # Favor shorter wins
+    if board.black == 0:
+        return -1000000 + depth  # Delay losses
+    return (evaluator or evaluation.DEFAULT).evaluate(board)
+
+
+def reversible(board: bitboard.Board, move: bitboard.Move) -> bool:
+    """
+    Whether a move neither captures nor moves a man, so that positions from before it can occur again.
+    Reversible moves are the ones counted towards DRAW_PLIES.
+    """
+    return not move[bitboard.CAPTURED] and bool(board.kings >> move[bitboard.SRC] & 1)
+
+
+def order_moves(board: bitboard.Board, player: str, moves: list, first: bitboard.Move = None) -> list:
+    """
+    Sort moves best-first for the search (in place).
+
+    Moves are sorted on the utility of the successor. That is the parent's material plus what the move
+    captures or crowns, or a win if it captures every opposing piece, so it is computed from the move
+    itself without building the successor.
+
+    :param board: The position the moves are played from
+    :param player: The side to move
+    :param moves: Moves from bitboard.generate_moves
+    :param first: A move to try before all others (e.g. from the transposition table), or None
+    :return: moves
+    """
+    kings = board.kings
+    opp_pieces = board.red if player == 'b' else board.black
+    moves.sort(key=lambda m: 2000000 if m[2] == opp_pieces else
+               m[2].bit_count() + (m[2] & kings).bit_count() + m[3], reverse=True)
+    if first is not None and first in moves:
+        moves.remove(first)
+        moves.insert(0, first)
+    return moves
+
+
+class SearchStats:
+    # This class collects counters from one or more searches. Pass one to Search (or iterative_deepening)
+    # to have it filled in; without one the search skips all of the bookkeeping.
+    # nodes : positions visited; qnodes : those visited by the quiescence search
+    # leaves : positions evaluated instead of expanded
+    # cutoffs : beta cutoffs; first_move_cutoffs : those caused by the first move tried
+    # researches : null-window searches that had to be repeated with the full window
+    # fail_highs, fail_lows : aspiration windows the root value fell above or below
+    # tt_probes, tt_hits, tt_stores : transposition table traffic; tt_cutoffs : nodes answered by the table
+    # tb_hits : positions answered by the endgame tablebase
+    # draws : positions scored as drawn by repetition or by the no-progress rule
+    # max_ply : deepest position visited
+    # depth_seconds, depth_nodes : time and nodes spent on each iterative-deepening iteration, by depth
+    # searches : number of searches merged in
+
+    COUNTERS = ('searches', 'nodes', 'qnodes', 'leaves', 'cutoffs', 'first_move_cutoffs', 'researches',
+                'fail_highs', 'fail_lows', 'tt_probes', 'tt_hits', 'tt_stores', 'tt_cutoffs', 'tb_hits',
+                'draws')
+
+    def __init__(self):
+        self.searches = 0
+        self.nodes = 0
+        self.qnodes = 0
+        self.leaves = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.researches = 0
+        self.fail_highs = 0
+        self.fail_lows = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_stores = 0
+        self.tt_cutoffs = 0
+        self.tb_hits = 0
+        self.draws = 0
+        self.max_ply = 0
+        self.depth_seconds = {}
+        self.depth_nodes = {}
+        self._table_counts = None
+
+    def begin(self, table: transposition.TranspositionTable):
+        """Note the table's counters at the start of a search."""
+        self._table_counts = table.hits, table.misses, table.stores
+
+    def end(self, table: transposition.TranspositionTable, searcher: 'Search'):
+        """Count a finished search, and its table traffic since begin()."""
+        hits, misses, stores = self._table_counts
+        self.searches += 1
+        self.nodes += searcher.nodes
+        self.qnodes += searcher.qnodes
+        self.tt_hits += table.hits - hits
+        self.tt_probes += table.hits + table.misses - hits - misses
+        self.tt_stores += table.stores - stores
+
+    @property
+    def branching_factor(self) -> float:
+        """Average number of children searched per expanded node."""
+        interior = self.nodes - self.leaves - self.tt_cutoffs
+        return (self.nodes - self.searches) / interior if interior > 0 else 0.0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Share of cutoffs caused by the first move tried, a measure of move ordering quality."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def merge(self, other: 'SearchStats'):
+        """Add another search's counters to these."""
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_ply = max(self.max_ply, other.max_ply)
+        for depth, seconds in other.depth_seconds.items():
+            self.depth_seconds[depth] = self.depth_seconds.get(depth, 0) + seconds
+            self.depth_nodes[depth] = self.depth_nodes.get(depth, 0) + other.depth_nodes[depth]
+
+    def as_dict(self) -> dict:
+        data = {name: getattr(self, name) for name in self.COUNTERS}
+        data.update(max_ply=self.max_ply, branching_factor=self.branching_factor,
+                    first_move_cutoff_rate=self.first_move_cutoff_rate, tt_hit_rate=self.tt_hit_rate,
+                    depth_seconds=dict(self.depth_seconds), depth_nodes=dict(self.depth_nodes))
+        return data
+
+
+class Search:
+    # This class holds the settings and running state of one root search.
+    # table : transposition table shared with other searches
+    # max_depth : depth at which positions are evaluated instead of expanded
+    # deadline : time.perf_counter() value after which the search raises SearchTimeout, or None
+    # stop : optional callable; the search raises SearchTimeout once it returns True (e.g. to cancel a job)
+    # stats : optional SearchStats to fill in
+    # quiescence : whether to play out pending captures past max_depth before evaluating
+    # pvs : whether to search all but the first move with a null window first (principal variation search)
+    # tablebase : endgame tablebase.Tablebase that answers positions with few pieces below the root, or None
+    # evaluator : evaluation.Evaluator scoring the leaves
+    # draw_plies : plies without a capture or a man moving after which a position is drawn, or None for no limit
+    # game_history : Zobrist keys of the game's positions before the root, oldest first; a position that repeats
+    #                one of them, or one on the line being searched, is scored as a draw
+    # quiet_plies : plies without a capture or a man moving that led to the root
+    # path : keys of the positions from the start of game_history down to the current node's parent
+    # quiet : quiet_plies for the current node
+    # repeat_index : lowest index in path that a draw below the current node depends on. Such a value only holds
+    #                on this path, so it is not stored in the transposition table.
+    # score : evaluator's score of the position being searched, updated as each move is made and taken back
+    # root_move : move to try first at the root, e.g. the best move of the previous iteration
+    # ordering : one of ORDERINGS
+    # killers : per ply, the latest quiet moves that caused a cutoff there (with the 'full' ordering)
+    # history : per (side, from square, to square), how much quiet cutoffs that move has caused, by depth squared
+
+    # The clock is only read once every this many nodes
+    CLOCK_INTERVAL = 1024
+
+    def __init__(self, table: transposition.TranspositionTable, max_depth: int = MAX_DEPTH, deadline: float = None,
+                 stop=None, stats: SearchStats = None, quiescence: bool = True, pvs: bool = True,
+                 use_tablebase: bool = True, evaluator: evaluation.Evaluator = None, draw_plies: int = DRAW_PLIES,
+                 history: tuple = (), quiet_plies: int = 0, ordering: str = 'full'):
+        if ordering not in ORDERINGS:
+            raise ValueError(f"Unknown move ordering: {ordering!r}")
+        self.table = table
+        self.max_depth = max_depth
+        self.deadline = deadline
+        self.stop = stop
+        self.stats = stats
+        self.quiescence = quiescence
+        self.pvs = pvs
+        self.tablebase = tablebase.default() if use_tablebase else None
+        self.evaluator = evaluator or evaluation.DEFAULT
+        self.draw_plies = draw_plies if draw_plies is not None else float('inf')
+        self.game_history = tuple(history)
+        self.quiet_plies = quiet_plies
+        self.ordering = ordering
+        self.path = []
+        self.quiet = 0
+        self.repeat_index = 0
+        self.score = 0
+        self.root_move = None
+        self.nodes = 0
+        self.qnodes = 0
+        self.killers = [[] for _ in range(MAX_PLY)]
+        self.history = [0] * 2048
+
+    def should_stop(self) -> bool:
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            return True
+        return self.stop is not None and self.stop()
+
+    def order_moves(self, board: bitboard.Board, player: str, depth: int, moves: list, first: bitboard.Move) -> list:
+        """
+        Sort moves best-first below the root (in place): first, then captures by material won, then
+        promotions, then this ply's killer moves, then the other quiet moves by their history score and, among
+        equals, by how much they improve the evaluation for the side to move. The 'static' ordering leaves out
+        the killer moves and history scores, and 'none' only moves first to the front.
+
+        :param board: The position the moves are played from
+        :param player: The side to move
+        :param depth: Ply of the position
+        :param moves: Moves from bitboard.generate_moves
+        :param first: A move to try before all others (e.g. from the transposition table), or None
+        :return: moves
+        """
+        if len(moves) > 1 and self.ordering != 'none':
+            if moves[0][bitboard.CAPTURED]:
+                # Captures are forced, so either every move captures or none does
+                order_moves(board, player, moves)
+            else:
+                move_delta = self.evaluator.move_delta
+                sign = 1 if player == 'b' else -1
+                if self.ordering == 'full':
+                    killers = self.killers[depth] if depth < MAX_PLY else ()
+                    history = self.history
+                    side = 1024 if player == 'b' else 0
+                    moves.sort(key=lambda m: (m[3], m in killers, history[side | m[0] << 5 | m[1]],
+                                              sign * move_delta(board, player, m)), reverse=True)
+                else:
+                    moves.sort(key=lambda m: (m[3], sign * move_delta(board, player, m)), reverse=True)
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def record_cutoff(self, player: str, depth: int, move: bitboard.Move):
+        """
+        Remember a quiet move that caused a cutoff at depth, for ordering its siblings elsewhere in the tree.
+        """
+        if self.ordering != 'full':
+            return
+        if depth < MAX_PLY:
+            killers = self.killers[depth]
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[KILLER_SLOTS:]
+        remaining = self.max_depth - depth
+        self.history[(1024 if player == 'b' else 0) | move[0] << 5 | move[1]] += remaining * remaining
+
+    def utility(self, board: bitboard.Board, depth: int):
+        """Same as utility(), taking the evaluation from score instead of rescanning the board."""
+        if board.red == 0:
+            return 1000000 - depth
+        if board.black == 0:
+            return -1000000 + depth
+        return self.score
+
+    def quiesce(self, board: bitboard.Board, player: str, depth: int, alpha: float, beta: float) -> float:
+        """
+        Past the depth limit, play out forced captures until the position is quiet, then evaluate it.
+
+        Captures are compulsory, so the side to move may only "stand pat" (take the static evaluation)
+        once it has no capture left; until then every capture is searched, with the usual alpha-beta cutoffs.
+
+        :param board: The current position, changed in place like in alphabeta
+        :param player: The player to move
+        :param depth: Ply of the position (beyond max_depth)
+        :param alpha: The best value that the maximizer can guarantee
+        :param beta: The best value that the minimizer can guarantee
+        :return: The value of the position once the captures are resolved
+        """
+        self.nodes += 1
+        self.qnodes += 1
+        if self.nodes % self.CLOCK_INTERVAL == 0 and self.should_stop():
+            raise SearchTimeout()
+
+        stats = self.stats
+        if board.black == 0 or board.red == 0 or not bitboard.can_jump(board, player):
+            if stats is not None:
+                stats.leaves += 1
+                if depth > stats.max_ply:
+                    stats.max_ply = depth
+            return self.utility(board, depth)  # Stand pat
+
+        opponent = 'r' if player == 'b' else 'b'
+        moves = order_moves(board, player, bitboard.generate_moves(board, player))
+        make_move = bitboard.make_move
+        unmake_move = bitboard.unmake_move
+        move_delta = self.evaluator.move_delta
+        if player == 'b':
+            value = -float('inf')
+            for move in moves:
+                delta = move_delta(board, player, move)
+                undo = make_move(board, player, move)
+                self.score += delta
+                value = max(value, self.quiesce(board, opponent, depth + 1, alpha, beta))
+                unmake_move(board, undo)
+                self.score -= delta
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    if stats is not None:
+                        stats.cutoffs += 1
+                        stats.first_move_cutoffs += move is moves[0]
+                    break
+        else:
+            value = float('inf')
+            for move in moves:
+                delta = move_delta(board, player, move)
+                undo = make_move(board, player, move)
+                self.score += delta
+                value = min(value, self.quiesce(board, opponent, depth + 1, alpha, beta))
+                unmake_move(board, undo)
+                self.score -= delta
+                beta = min(beta, value)
+                if alpha >= beta:
+                    if stats is not None:
+                        stats.cutoffs += 1
+                        stats.first_move_cutoffs += move is moves[0]
+                    break
+        return value
+
+    def alphabeta(self, board: bitboard.Board, player: str, depth: int, alpha: float, beta: float,
+                  key: int) -> tuple:
+        """
+        Depth-limited minimax with alpha-beta pruning, caching, and node ordering.
+
+        :param board: The current position. Moves are made and unmade on it in place, so it is only left
+                      unchanged if the search completes (it may be mid-line after SearchTimeout).
+        :param player: The player whose turn it is ('r' or 'b').
+        :param depth: The current depth in the search tree.
+        :param alpha: The best value that the maximizer can guarantee.
+        :param beta: The best value that the minimizer can guarantee.
+        :param key: Zobrist hash of board with player to move
+        :return: The best bitboard.Move (None at terminal nodes) and its associated utility value.
+        """
+        self.score = self.evaluator.evaluate(board)
+        self.path = list(self.game_history)
+        self.quiet = self.quiet_plies
+        self.repeat_index = len(self.path)
+        return self._alphabeta(board, player, depth, alpha, beta, key)
+
+    def draw_index(self, key: int) -> int:
+        """
+        Whether the current node is drawn by the no-progress rule or by repeating an earlier position.
+
+        :param key: Zobrist hash of the current node
+        :return: The lowest index in path that the draw depends on, or None if the node is not drawn
+        """
+        quiet = self.quiet
+        path = self.path
+        if quiet >= self.draw_plies:
+            return max(len(path) - quiet, 0)
+        # Only positions since the last capture or man move, with the same side to move, can repeat
+        for index in range(len(path) - 4, max(len(path) - quiet, 0) - 1, -2):
+            if path[index] == key:
+                return index
+        return None
+
+    def _alphabeta(self, board: bitboard.Board, player: str, depth: int, alpha: float, beta: float,
+                   key: int) -> tuple:
+        """alphabeta, once score is set for board."""
+        if depth > 0 and self.quiet >= 4:
+            index = self.draw_index(key)
+            if index is not None:
+                self.nodes += 1
+                if index < self.repeat_index:
+                    self.repeat_index = index
+                if self.stats is not None:
+                    self.stats.leaves += 1
+                    self.stats.draws += 1
+                return None, DRAW
+
+        # Endgames in the tablebase are known exactly, however deep. The root is still searched, for its move.
+        endgames = self.tablebase
+        if endgames is not None and depth > 0 and board.black and board.red \
+                and (board.black | board.red).bit_count() <= endgames.pieces:
+            value = endgames.score(board, player, depth)
+            if value is not None:
+                self.nodes += 1
+                if self.stats is not None:
+                    self.stats.leaves += 1
+                    self.stats.tb_hits += 1
+                return None, value
+
+        if depth >= self.max_depth and self.quiescence and board.black and board.red \
+                and bitboard.can_jump(board, player):
+            return None, self.quiesce(board, player, depth, alpha, beta)
+
+        self.nodes += 1
+        if self.nodes % self.CLOCK_INTERVAL == 0 and self.should_stop():
+            raise SearchTimeout()
+
+        stats = self.stats
+        if board.black == 0 or board.red == 0 or depth >= self.max_depth:
+            if stats is not None:
+                stats.leaves += 1
+                if depth > stats.max_ply:
+                    stats.max_ply = depth
+            return None, self.utility(board, depth)
+
+        # Check if the state has already been searched at least as deep as we need
+        table = self.table
+        remaining = self.max_depth - depth
+        tt_move = None
+        entry = table.probe(key, depth)
+        if entry is not None:
+            entry_depth, flag, entry_value, tt_move = entry
+            if depth > 0 and entry_depth >= remaining and self.quiet + entry_depth < self.draw_plies:
+                if flag == transposition.EXACT:
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
+                    return tt_move, entry_value
+                if flag == transposition.LOWER:
+                    alpha = max(alpha, entry_value)
+                else:
+                    beta = min(beta, entry_value)
+                if alpha >= beta:
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
+                    return tt_move, entry_value
+        alpha_orig, beta_orig = alpha, beta
+        path = self.path
+        index = len(path)
+        path.append(key)
+        repeat_index = self.repeat_index
+        self.repeat_index = index
+        quiet = self.quiet
+        kings = board.kings
+
+        best_move = None
+        opponent = 'r' if player == 'b' else 'b'
+        # The best move from an earlier search (or iteration) of this position goes first. The root is
+        # ordered without killers and history, so that it is ordered the same way as in parallel.py.
+        if depth == 0:
+            first = self.root_move if self.root_move is not None else tt_move
+            moves = bitboard.generate_moves(board, player)
+            if self.ordering == 'none':
+                moves = self.order_moves(board, player, depth, moves, first)
+            else:
+                moves = order_moves(board, player, moves, first)
+        else:
+            moves = self.order_moves(board, player, depth, bitboard.generate_moves(board, player), tt_move)
+
+        # Successors are visited by playing each move on board in place and taking it back afterwards
+        make_move = bitboard.make_move
+        unmake_move = bitboard.unmake_move
+        update_hash = transposition.update_hash
+        move_delta = self.evaluator.move_delta
+        # Principal variation search: once a first move has set a finite bound, the others are only tested
+        # against it with a null window, and searched again with the full window if they turn out better
+        pvs = self.pvs
+        if player == 'b':
+            value = -float('inf')  # Maximizer's goal
+            for move in moves:
+                child_key = update_hash(key, board, player, move)
+                delta = move_delta(board, player, move)
+                undo = make_move(board, player, move)
+                self.score += delta
+                self.quiet = quiet + 1 if not move[bitboard.CAPTURED] and kings >> move[0] & 1 else 0
+                if pvs and move is not moves[0] and alpha != -float('inf'):
+                    next_value = self._alphabeta(board, opponent, depth + 1, alpha, alpha + 1, child_key)[1]
+                    if alpha < next_value < beta:
+                        if stats is not None:
+                            stats.researches += 1
+                        next_value = self._alphabeta(board, opponent, depth + 1, alpha, beta, child_key)[1]
+                else:
+                    next_value = self._alphabeta(board, opponent, depth + 1, alpha, beta, child_key)[1]
+                unmake_move(board, undo)
+                self.score -= delta
+                if next_value > value:
+                    value = next_value
+                    best_move = move
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    if not move[bitboard.CAPTURED]:
+                        self.record_cutoff(player, depth, move)
+                    if stats is not None:
+                        stats.cutoffs += 1
+                        stats.first_move_cutoffs += move is moves[0]
+                    break  # Prune!
+        else:
+            value = float('inf')  # Minimizer's goal
+            for move in moves:
+                child_key = update_hash(key, board, player, move)
+                delta = move_delta(board, player, move)
+                undo = make_move(board, player, move)
+                self.score += delta
+                self.quiet = quiet + 1 if not move[bitboard.CAPTURED] and kings >> move[0] & 1 else 0
+                if pvs and move is not moves[0] and beta != float('inf'):
+                    next_value = self._alphabeta(board, opponent, depth + 1, beta - 1, beta, child_key)[1]
+                    if alpha < next_value < beta:
+                        if stats is not None:
+                            stats.researches += 1
+                        next_value = self._alphabeta(board, opponent, depth + 1, alpha, beta, child_key)[1]
+                else:
+                    next_value = self._alphabeta(board, opponent, depth + 1, alpha, beta, child_key)[1]
+                unmake_move(board, undo)
+                self.score -= delta
+                if next_value < value:
+                    value = next_value
+                    best_move = move
+                beta = min(beta, value)
+                if alpha >= beta:
+                    if not move[bitboard.CAPTURED]:
+                        self.record_cutoff(player, depth, move)
+                    if stats is not None:
+                        stats.cutoffs += 1
+                        stats.first_move_cutoffs += move is moves[0]
+                    break  # Prune!
+
+        self.quiet = quiet
+        path.pop()
+        path_dependent = self.repeat_index < index
+        if repeat_index < self.repeat_index:
+            self.repeat_index = repeat_index
+
+        # Handle edge case of only one possible move
+        if moves and not best_move:
+            best_move = moves[-1]
+
+        # Cache the result, flagged as a bound when alpha-beta cut the search short. A side with no legal
+        # moves scores +/-inf, which the table cannot hold; those positions are cheap to recompute anyway.
+        # Neither can a value that rests on a draw by repeating a position above this one, or on how many quiet
+        # plies led here, since it only holds on this path.
+        if value != float('inf') and value != -float('inf') and not path_dependent:
+            if value <= alpha_orig:
+                flag = transposition.UPPER
+            elif value >= beta_orig:
+                flag = transposition.LOWER
+            else:
+                flag = transposition.EXACT
+            table.store(key, depth, remaining, flag, value, best_move)
+
+        return best_move, value
+
+
+def iterative_deepening(board: bitboard.Board, player: str, time_budget_ms: float,
+                        table: transposition.TranspositionTable, max_depth: int = MAX_PLY, stop=None,
+                        stats: SearchStats = None, quiescence: bool = True,
+                        aspiration: int = ASPIRATION_WINDOW, evaluator: evaluation.Evaluator = None,
+                        pvs: bool = True, use_tablebase: bool = True, draw_plies: int = DRAW_PLIES,
+                        history: tuple = (), quiet_plies: int = 0, ordering: str = 'full') -> SearchResult:
+    """
+    Search to depth 1, 2, 3, ... until the time budget runs out, and return the deepest completed result.
+    Each iteration tries the previous iteration's best move first. Depth 1 always completes, so a move is
+    returned whenever one exists.
+
+    :param board: The current position
+    :param player: The player to move ('b' or 'r')
+    :param time_budget_ms: Wall-clock budget in milliseconds
+    :param table: Transposition table to use
+    :param max_depth: Deepest iteration to attempt
+    :param stop: Optional callable that ends the search early when it returns True (checked with the clock)
+    :param stats: Optional SearchStats to fill in (including the interrupted iteration's work)
+    :param quiescence: Whether to resolve pending captures past each iteration's depth limit
+    :param aspiration: Search each iteration after the first with a root window this far either side of the
+                       previous value, widening it on the side the value falls outside; None for a full window
+    :param evaluator: Evaluation to search with (default: evaluation.DEFAULT)
+    :param pvs: Whether to use principal variation search (see Search)
+    :param use_tablebase: Whether to answer endgame positions from the tablebase, if there is one
+    :param draw_plies: Plies without a capture or a man moving after which the game is drawn, or None
+    :param history: Zobrist keys of the game's positions before this one, oldest first (see Search)
+    :param quiet_plies: Plies without a capture or a man moving that led to this position
+    :param ordering: Move ordering, one of ORDERINGS
+    :return: SearchResult of the deepest completed iteration, with nodes counting every iteration
+    """
+    deadline = time.perf_counter() + time_budget_ms / 1000
+    searcher = Search(table, stop=stop, stats=stats, quiescence=quiescence, pvs=pvs, use_tablebase=use_tablebase,
+                      evaluator=evaluator, draw_plies=draw_plies, history=history, quiet_plies=quiet_plies,
+                      ordering=ordering)
+    table.new_search()
+    key = transposition.zobrist_hash(board, player)
+    root_moves = bitboard.generate_moves(board, player)
+    result = SearchResult(None, utility(board, 0, searcher.evaluator), 0, 0)
+    if stats is not None:
+        stats.begin(table)
+
+    for depth in range(1, max_depth + 1):
+        searcher.max_depth = depth
+        searcher.deadline = deadline if depth > 1 else None
+        if stats is not None:
+            started, nodes_before = time.perf_counter(), searcher.nodes
+        alpha, beta = -float('inf'), float('inf')
+        if aspiration is not None and depth > 1 and abs(result.value) < transposition.WIN_THRESHOLD:
+            alpha, beta = result.value - aspiration, result.value + aspiration
+        try:
+            while True:
+                move, value = searcher.alphabeta(board.copy(), player, 0, alpha, beta, key)
+                if value <= alpha != -float('inf'):
+                    alpha = -float('inf')
+                    if stats is not None:
+                        stats.fail_lows += 1
+                elif value >= beta != float('inf'):
+                    beta = float('inf')
+                    if stats is not None:
+                        stats.fail_highs += 1
+                else:
+                    break
+        except SearchTimeout:
+            break
+        finally:
+            if stats is not None:
+                stats.depth_seconds[depth] = stats.depth_seconds.get(depth, 0) + time.perf_counter() - started
+                stats.depth_nodes[depth] = stats.depth_nodes.get(depth, 0) + searcher.nodes - nodes_before
+        result = SearchResult(move, value, depth, searcher.nodes)
+        searcher.root_move = move
+        # Nothing to gain from searching deeper: a forced move, or a proven win or loss
+        if len(root_moves) <= 1 or abs(value) > transposition.WIN_THRESHOLD:
+            break
+        if time.perf_counter() >= deadline:
+            break
+
+    if stats is not None:
+        stats.end(table, searcher)
+    return result._replace(nodes=searcher.nodes, stats=stats)
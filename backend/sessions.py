@@ -0,0 +1,171 @@
+"""
+Per-game session storage for the Flask app: an in-memory LRU/TTL store of game states, optionally
+backed by a persistent backend (SQLite here) so that games evicted from memory can be reloaded.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from checkers_ai import State
+
+
+def state_to_dict(state: State) -> dict:
+    return {"board": state.board, "num_r": state.num_r, "num_b": state.num_b,
+            "num_r_kings": state.num_r_kings, "num_b_kings": state.num_b_kings, "move_num": state.move_num,
+            "history": list(state.history), "quiet_plies": state.quiet_plies}
+
+
+def state_from_dict(data: dict) -> State:
+    state = State([row[:] for row in data["board"]], data["num_r"], data["num_b"],
+                  data["num_r_kings"], data["num_b_kings"])
+    state.move_num = data["move_num"]
+    state.history = tuple(data.get("history", ()))
+    state.quiet_plies = data.get("quiet_plies", 0)
+    return state
+
+
+class SQLiteBackend:
+    # Persistent game backend in a local SQLite file. Any object with the same load/save/delete/purge
+    # methods can be used as a GameStore backend.
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS games "
+                               "(game_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)")
+
+    def load(self, game_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT state, updated FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        if row is None:
+            return None
+        return state_from_dict(json.loads(row[0])), row[1]
+
+    def save(self, game_id: str, state: State, updated: float):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO games (game_id, state, updated) VALUES (?, ?, ?)",
+                               (game_id, json.dumps(state_to_dict(state)), updated))
+
+    def delete(self, game_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+
+    def purge(self, older_than: float):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM games WHERE updated < ?", (older_than,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class GameStore:
+    # Thread-safe store of game states keyed by game id.
+    # At most max_games are held in memory; the least recently used is evicted beyond that (it stays in
+    # the backend, if there is one). Games untouched for ttl_seconds are expired everywhere: when they are
+    # looked up, and by a sweep of the whole store (expire) that create runs every expire_seconds.
+
+    def __init__(self, max_games: int = 1000, ttl_seconds: float = 3600, backend=None, expire_seconds: float = 60):
+        """
+        :param max_games: Maximum number of games held in memory
+        :param ttl_seconds: Idle time after which a game is discarded
+        :param backend: Optional persistent backend (e.g. SQLiteBackend)
+        :param expire_seconds: Least time between two sweeps for idle games
+        """
+        self.max_games = max_games
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.expire_seconds = expire_seconds
+        self._last_expired = time.time()
+        self._games = OrderedDict()  # game_id -> (state, last used)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._games)
+
+    def __contains__(self, game_id: str):
+        return self.get(game_id) is not None
+
+    def create(self, state: State) -> str:
+        """
+        Store a new game and return its id, first sweeping out idle games if expire_seconds have passed since
+        the last sweep.
+        """
+        if time.time() - self._last_expired >= self.expire_seconds:
+            self.expire()
+        game_id = uuid.uuid4().hex
+        self.put(game_id, state)
+        return game_id
+
+    def get(self, game_id: str):
+        """
+        Return the current state of a game, or None if it does not exist or has expired.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._games.get(game_id)
+            if entry is not None:
+                state, last_used = entry
+                if now - last_used > self.ttl_seconds:
+                    self._delete(game_id)
+                    return None
+                self._games[game_id] = (state, now)
+                self._games.move_to_end(game_id)
+                return state
+
+        if self.backend is None:
+            return None
+        loaded = self.backend.load(game_id)
+        if loaded is None:
+            return None
+        state, last_used = loaded
+        if now - last_used > self.ttl_seconds:
+            self.backend.delete(game_id)
+            return None
+        with self._lock:
+            self._insert(game_id, state, now)
+        return state
+
+    def put(self, game_id: str, state: State):
+        """
+        Set the current state of a game.
+        """
+        now = time.time()
+        with self._lock:
+            self._insert(game_id, state, now)
+        if self.backend is not None:
+            self.backend.save(game_id, state, now)
+
+    def delete(self, game_id: str):
+        with self._lock:
+            self._delete(game_id)
+
+    def expire(self):
+        """
+        Drop every game that has been idle for longer than the TTL.
+        """
+        now = time.time()
+        cutoff = now - self.ttl_seconds
+        with self._lock:
+            self._last_expired = now
+            expired = [game_id for game_id, (_, last_used) in self._games.items() if last_used < cutoff]
+            for game_id in expired:
+                del self._games[game_id]
+        if self.backend is not None:
+            self.backend.purge(cutoff)
+
+    def _insert(self, game_id: str, state: State, now: float):
+        self._games[game_id] = (state, now)
+        self._games.move_to_end(game_id)
+        while len(self._games) > self.max_games:
+            self._games.popitem(last=False)
+
+    def _delete(self, game_id: str):
+        self._games.pop(game_id, None)
+        if self.backend is not None:
+            self.backend.delete(game_id)
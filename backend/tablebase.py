@@ -0,0 +1,392 @@
+"""
+Endgame tablebase: the exact outcome (win, loss or draw) and distance to the end of every position with
+only a few pieces left, computed offline by retrograde analysis and probed by the search.
+
+    python tablebase.py build --pieces 4             # writes tablebase.bin next to this file
+    python tablebase.py probe --board board.txt --player b
+
+Positions are grouped into slices by material: (black men, black kings, red men, red kings). A capture
+leads to a slice with fewer pieces and a promotion to one with fewer men, so slices are solved in that
+order and every move that leaves a slice lands in one already solved. Within a slice, positions are
+resolved in order of distance, walking back from decided positions along the moves that stay in the
+slice (simple, non-crowning moves). Positions never decided are draws: neither side can force a win.
+
+Distances are in plies, with perfect play: the winner ends the game as fast as possible and the loser
+postpones it as long as possible. A side loses when it has no pieces or no legal move, so a position
+is a win for the side to move exactly when its distance is odd.
+
+The file is a header, a slice table and one array of 16-bit codes per slice, indexed by position:
+
+    header: magic b'CKTB', version (u16), most pieces (u16), slice count (u32)
+    slice:  black men, black kings, red men, red kings (u8 each), offset of its codes in the file (u64)
+    code:   0 for a draw, otherwise distance + 1
+
+A position's index combines the colex ranks of the square sets of each kind of piece with the side to
+move. Sets that overlap are never looked up, which wastes part of each array but keeps indexing cheap.
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from itertools import combinations
+from math import comb
+
+import bitboard
+
+MAGIC = b'CKTB'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+SLICE = struct.Struct('<BBBBQ')
+CODE = struct.Struct('<H')
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tablebase.bin')
+
+WIN, LOSS, DRAW = 1, -1, 0
+
+MAX_PIECES = 5  # Piece counts above this are not indexed (see COMBINATIONS)
+
+# COMBINATIONS[n][k] is n choose k, for ranking square sets
+COMBINATIONS = [[comb(n, k) for k in range(MAX_PIECES + 1)] for n in range(33)]
+
+# Squares a man may stand on: black men are crowned on row 7 and red men on row 0
+BLACK_MAN_SQUARES = range(28)
+RED_MAN_SQUARES = range(4, 32)
+
+
+def _rank(mask: int) -> int:
+    # Colex rank of a set of squares among the sets of the same size
+    rank = 0
+    i = 1
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        rank += COMBINATIONS[bit.bit_length() - 1][i]
+        i += 1
+    return rank
+
+
+def signature(board: bitboard.Board) -> tuple[int, int, int, int]:
+    """:return: (black men, black kings, red men, red kings) of board"""
+    black_kings = (board.black & board.kings).bit_count()
+    red_kings = (board.red & board.kings).bit_count()
+    return board.black.bit_count() - black_kings, black_kings, board.red.bit_count() - red_kings, red_kings
+
+
+def slice_size(material: tuple) -> int:
+    """Number of indices of a slice: both sides to move for every combination of square sets."""
+    size = 2
+    for count in material:
+        size *= COMBINATIONS[32][count]
+    return size
+
+
+def index(board: bitboard.Board, player: str, material: tuple) -> int:
+    """Index of a position within its slice."""
+    kings = board.kings
+    result = _rank(board.red & kings)
+    result = result * COMBINATIONS[32][material[2]] + _rank(board.red & ~kings)
+    result = result * COMBINATIONS[32][material[1]] + _rank(board.black & kings)
+    result = result * COMBINATIONS[32][material[0]] + _rank(board.black & ~kings)
+    return result * 2 + (player == 'b')
+
+
+def decode(code: int) -> tuple[int, int]:
+    """:return: (WIN, LOSS or DRAW for the side to move, distance in plies, or 0 for a draw)"""
+    if code == 0:
+        return DRAW, 0
+    distance = code - 1
+    return (WIN if distance % 2 else LOSS), distance
+
+
+class Tablebase:
+    # This class answers probes from a tablebase file, memory-mapped read-only.
+    # pieces : positions with at most this many pieces (and at least one per side) are covered
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        """
+        :param path: Tablebase file written by build()
+        :raises ValueError: if the file is not a tablebase this version can read
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            self._map.close()
+            raise ValueError(f"{path} is too short to be a tablebase")
+        magic, version, self.pieces, slices = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} tablebase")
+        self._offsets = {}
+        for i in range(slices):
+            *material, offset = SLICE.unpack_from(self._map, HEADER.size + i * SLICE.size)
+            self._offsets[tuple(material)] = offset
+        end = max((offset + 2 * slice_size(material) for material, offset in self._offsets.items()), default=0)
+        if len(self._map) < end:
+            self._map.close()
+            raise ValueError(f"{path} is truncated")
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def probe(self, board: bitboard.Board, player: str):
+        """
+        Look a position up.
+
+        :param board: The position
+        :param player: The side to move
+        :return: (WIN, LOSS or DRAW for player, distance in plies), or None if the position is not covered
+        """
+        material = signature(board)
+        offset = self._offsets.get(material)
+        if offset is None:
+            return None
+        return decode(CODE.unpack_from(self._map, offset + 2 * index(board, player, material))[0])
+
+    def score(self, board: bitboard.Board, player: str, ply: int):
+        """
+        Search score of a position, from black's point of view like search.utility: a win at ply + distance
+        scores like capturing the last piece there, and a draw scores 0.
+
+        :param ply: Depth of the position in the search tree
+        :return: The score, or None if the position is not covered
+        """
+        entry = self.probe(board, player)
+        if entry is None:
+            return None
+        outcome, distance = entry
+        if outcome == DRAW:
+            return 0
+        value = 1000000 - ply - distance
+        return value if (outcome == WIN) == (player == 'b') else -value
+
+
+_default = {}
+
+
+def default():
+    """
+    Return the tablebase at DEFAULT_PATH, opened once per process, or None if there is none.
+    """
+    if 'tablebase' not in _default:
+        _default['tablebase'] = Tablebase(DEFAULT_PATH) if os.path.exists(DEFAULT_PATH) else None
+    return _default['tablebase']
+
+
+def _square_sets(count: int, squares) -> list[int]:
+    # Every set of count squares drawn from squares, as masks
+    return [sum(1 << square for square in chosen) for chosen in combinations(squares, count)]
+
+
+def _positions(material: tuple):
+    # Every legal placement of a slice's pieces, as Boards
+    black_men, black_kings, red_men, red_kings = [
+        _square_sets(count, squares)
+        for count, squares in zip(material, (BLACK_MAN_SQUARES, range(32), RED_MAN_SQUARES, range(32)))]
+    for black_men_mask in black_men:
+        for black_kings_mask in black_kings:
+            if black_kings_mask & black_men_mask:
+                continue
+            black = black_men_mask | black_kings_mask
+            for red_men_mask in red_men:
+                if red_men_mask & black:
+                    continue
+                for red_kings_mask in red_kings:
+                    if red_kings_mask & (black | red_men_mask):
+                        continue
+                    yield bitboard.Board(black, red_men_mask | red_kings_mask, black_kings_mask | red_kings_mask)
+
+
+def _predecessors(board: bitboard.Board, player: str):
+    # Positions, with the other side to move, from which that side's simple non-crowning move leads to board.
+    # These are the only moves that stay within a slice.
+    mover = 'r' if player == 'b' else 'b'
+    own = board.pieces(mover)
+    empty = ~(board.black | board.red) & bitboard.FULL
+    pieces = own
+    while pieces:
+        bit = pieces & -pieces
+        pieces ^= bit
+        square = bit.bit_length() - 1
+        king = board.kings & bit
+        for d in (bitboard.KING_DIRECTIONS if king else bitboard.MAN_DIRECTIONS[mover]):
+            origin = bitboard.ORIGIN[d][square]
+            if origin < 0 or not empty >> origin & 1:
+                continue
+            moved = bit | 1 << origin
+            before = bitboard.Board(board.black ^ moved if mover == 'b' else board.black,
+                                    board.red ^ moved if mover == 'r' else board.red,
+                                    board.kings ^ moved if king else board.kings)
+            if not bitboard.can_jump(before, mover):  # Otherwise the move was not legal: captures are forced
+                yield before
+
+
+def _solve(material: tuple, solved: dict) -> array:
+    # Retrograde analysis of one slice, given the codes of every slice its moves can leave to
+    size = slice_size(material)
+    codes = array('H', bytes(2 * size))
+    pending = array('H', bytes(2 * size))  # Children in the slice not yet known to be wins for the opponent
+    longest = array('H', bytes(2 * size))  # Longest known win among the children
+    escapes = bytearray(size)  # Whether a child outside the slice is not a win for the opponent
+    queue = {}  # distance -> [(index, whether the side to move wins)]
+
+    for board in _positions(material):
+        for player in ('b', 'r'):
+            i = index(board, player, material)
+            moves = bitboard.generate_moves(board, player)
+            if not moves:
+                queue.setdefault(0, []).append((i, False))
+                continue
+            opponent = 'r' if player == 'b' else 'b'
+            for move in moves:
+                if not move[bitboard.CAPTURED] and not move[bitboard.PROMOTE]:
+                    pending[i] += 1
+                    continue
+                child = bitboard.apply_move(board, player, move)
+                if not child.pieces(opponent):
+                    outcome, distance = LOSS, 0
+                else:
+                    child_material = signature(child)
+                    outcome, distance = decode(solved[child_material][index(child, opponent, child_material)])
+                if outcome == WIN:
+                    longest[i] = max(longest[i], distance)
+                else:
+                    escapes[i] = 1
+                    if outcome == LOSS:
+                        queue.setdefault(distance + 1, []).append((i, True))
+            if not pending[i] and not escapes[i]:
+                queue.setdefault(longest[i] + 1, []).append((i, False))
+
+    # Decide positions in order of distance. A loss makes each predecessor a win one ply further; a win
+    # makes a predecessor a loss once all of its moves are known to lose.
+    distance = 0
+    while queue:
+        for i, wins in queue.pop(distance, ()):
+            if codes[i]:
+                continue
+            codes[i] = distance + 1
+            board, player = _unindex(i, material)
+            for before in _predecessors(board, player):
+                j = index(before, 'r' if player == 'b' else 'b', material)
+                if codes[j]:
+                    continue
+                if not wins:
+                    queue.setdefault(distance + 1, []).append((j, True))
+                else:
+                    pending[j] -= 1
+                    longest[j] = max(longest[j], distance)
+                    if not pending[j] and not escapes[j]:
+                        queue.setdefault(longest[j] + 1, []).append((j, False))
+        distance += 1
+    return codes
+
+
+def _unrank(rank: int, count: int) -> int:
+    # Set of count squares with the given colex rank, as a mask
+    mask = 0
+    for i in range(count, 0, -1):
+        square = i - 1
+        while COMBINATIONS[square + 1][i] <= rank:
+            square += 1
+        rank -= COMBINATIONS[square][i]
+        mask |= 1 << square
+    return mask
+
+
+def _unindex(i: int, material: tuple) -> tuple[bitboard.Board, str]:
+    player = 'b' if i & 1 else 'r'
+    i >>= 1
+    masks = []
+    for count in material:
+        i, rank = divmod(i, COMBINATIONS[32][count])
+        masks.append(_unrank(rank, count))
+    black_men, black_kings, red_men, red_kings = masks
+    return bitboard.Board(black_men | black_kings, red_men | red_kings, black_kings | red_kings), player
+
+
+def slices(pieces: int) -> list[tuple]:
+    """
+    Every material signature with at most pieces pieces and at least one piece per side, in the order
+    they must be solved: fewer pieces first, then fewer men.
+    """
+    materials = []
+    for total in range(2, pieces + 1):
+        for black in range(1, total):
+            red = total - black
+            for black_kings in range(black + 1):
+                for red_kings in range(red + 1):
+                    materials.append((black - black_kings, black_kings, red - red_kings, red_kings))
+    return sorted(materials, key=lambda material: (sum(material), material[0] + material[2]))
+
+
+def build(path: str = DEFAULT_PATH, pieces: int = 4, progress=None) -> int:
+    """
+    Solve every position with up to pieces pieces and write the tablebase file.
+
+    :param path: File to write
+    :param pieces: Most pieces on the board (at most MAX_PIECES)
+    :param progress: Optional callable(material, seconds), called after each slice
+    :return: Number of slices written
+    """
+    if not 2 <= pieces <= MAX_PIECES:
+        raise ValueError(f"pieces must be between 2 and {MAX_PIECES}")
+    order = slices(pieces)
+    solved = {}
+    for material in order:
+        start = time.perf_counter()
+        solved[material] = _solve(material, solved)
+        if progress is not None:
+            progress(material, time.perf_counter() - start)
+
+    # Write to a temporary file first, so a server reading the old tablebase never sees a partial one
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, pieces, len(order)))
+        offset = HEADER.size + SLICE.size * len(order)
+        for material in order:
+            f.write(SLICE.pack(*material, offset))
+            offset += 2 * slice_size(material)
+        for material in order:
+            codes = solved[material]
+            if sys.byteorder != 'little':
+                codes.byteswap()
+            codes.tofile(f)
+    os.replace(temporary, path)
+    return len(order)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or query the endgame tablebase.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="solve the endgames and write the tablebase")
+    build_parser.add_argument("--out", default=DEFAULT_PATH, help="tablebase file to write")
+    build_parser.add_argument("--pieces", type=int, default=4, help="most pieces on the board")
+    probe_parser = commands.add_parser("probe", help="look a position up")
+    probe_parser.add_argument("--tablebase", default=DEFAULT_PATH, help="tablebase file to read")
+    probe_parser.add_argument("--board", required=True, help="file holding the position, 8 lines of 8 squares")
+    probe_parser.add_argument("--player", choices=('r', 'b'), default='b', help="side to move")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build(args.out, args.pieces,
+                      progress=lambda material, seconds: print(f"{material}: {seconds:.1f}s", flush=True))
+        print(f"wrote {count} slices to {args.out} in {time.perf_counter() - start:.1f}s")
+    else:
+        import checkers_ai  # Not at the top: checkers_ai imports search, which imports this module
+        with Tablebase(args.tablebase) as tablebase:
+            entry = tablebase.probe(bitboard.from_rows(checkers_ai.read_from_file(args.board)), args.player)
+        if entry is None:
+            print("not covered")
+        else:
+            outcome, distance = entry
+            print({WIN: f"win in {distance} plies", LOSS: f"loss in {distance} plies", DRAW: "draw"}[outcome])
@@ -1,6 +1,45 @@
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
 import unittest
-from checkers import State, get_possible_moves, get_directions, is_within_bounds, get_chain_jumps
 
+import analysis
+import benchmark
+import bitboard
+import book
+import checkers_ai
+import evaluation
+import parallel
+import perft
+import search
+import sessions
+import tablebase
+import tournament
+import transposition
+from checkers_ai import State, get_possible_moves, get_directions, is_within_bounds, get_chain_jumps, \
+    generate_successors, get_opp_char, iterative_deepening, limited_minimax_alphabeta, DIAGONALS, PLAYABLE_SQUARES, \
+    TARGETS, INITIAL_BOARD, legal_move_index, record_move, is_draw
+
+# Two red kings against a black king, far enough apart for the kings to shuffle back and forth
+KINGS_BOARD = [
+    ['.', 'B', '.', '.', '.', '.', '.', '.'],
+    ['.', '.', '.', '.', '.', '.', '.', '.'],
+    ['.', '.', '.', '.', '.', '.', '.', '.'],
+    ['.', '.', '.', '.', '.', '.', '.', '.'],
+    ['.', '.', '.', '.', '.', '.', '.', '.'],
+    ['R', '.', '.', '.', '.', '.', '.', '.'],
+    ['.', '.', '.', '.', '.', '.', '.', '.'],
+    ['R', '.', '.', '.', '.', '.', '.', '.']
+]
+# Red's king steps out and back while black's does the same: four plies that return to the start
+SHUFFLE = [('r', (7, 0), (6, 1)), ('b', (0, 1), (1, 0)), ('r', (6, 1), (7, 0)), ('b', (1, 0), (0, 1))]
 
 class TestCheckersFunctions(unittest.TestCase):
     def setUp(self):
@@ -50,6 +89,21 @@ class TestCheckersFunctions(unittest.TestCase):
         self.assertFalse(is_within_bounds(state, 8, 8))
         self.assertFalse(is_within_bounds(state, -1, 0))
 
+    def test_targets_table(self):
+        state = State(self.empty_board, 0, 0, 0, 0)
+        for row in range(8):
+            for col in range(8):
+                for d_row, d_col in DIAGONALS:
+                    target = TARGETS[row * 8 + col].get((d_row, d_col))
+                    if not is_within_bounds(state, row + d_row, col + d_col):
+                        self.assertIsNone(target)
+                        continue
+                    jump = (row + 2 * d_row, col + 2 * d_col)
+                    if not is_within_bounds(state, *jump):
+                        jump = None
+                    self.assertEqual(target, (row + d_row, col + d_col, jump))
+        self.assertEqual(len(PLAYABLE_SQUARES), 32)
+
     def test_get_directions(self):
         black_directions = get_directions('b')
         red_directions = get_directions('r')
@@ -142,5 +196,898 @@ class TestCheckersFunctions(unittest.TestCase):
         self.assertEqual(len(possible_moves), 2)
 
 
+class TestDraws(unittest.TestCase):
+    def test_draw_by_repetition(self):
+        state = State([row[:] for row in KINGS_BOARD], 0, 0, 2, 1)
+        for shuffle in range(2):
+            self.assertFalse(is_draw(state, 'r'))
+            for player, old, new in SHUFFLE:
+                state = record_move(state, legal_move_index(state, player)[(old, new)], player)
+        # The starting position, red to move, has now occurred three times
+        self.assertEqual(state.quiet_plies, 8)
+        self.assertTrue(is_draw(state, 'r'))
+        self.assertFalse(is_draw(state, 'b'))
+        self.assertTrue(is_draw(state, 'r', draw_plies=8))
+
+        # A man moving starts the count again
+        board = [row[:] for row in KINGS_BOARD]
+        board[3][2] = 'r'
+        with_man = State(board, 1, 0, 2, 1)
+        with_man.history, with_man.quiet_plies = state.history, state.quiet_plies
+        state = record_move(with_man, legal_move_index(with_man, 'r')[((3, 2), (2, 1))], 'r')
+        self.assertEqual((state.history, state.quiet_plies), ((), 0))
+
+
+class TestState(unittest.TestCase):
+    def test_state_hash(self):
+        state = State([row[:] for row in INITIAL_BOARD], 12, 12, 0, 0)
+        board = bitboard.from_rows(INITIAL_BOARD)
+        self.assertEqual(state.packed, (board.black, board.red, board.kings))
+        self.assertFalse(hasattr(state, '__dict__'))
+
+        # Equal boards are equal states, whatever else differs, and a set keeps one of them
+        successors = generate_successors(state, 'b')
+        same = successors[0].copy()
+        same.move_num = 5
+        self.assertEqual(same, successors[0])
+        self.assertEqual(hash(same), hash(successors[0]))
+        self.assertNotEqual(successors[0], successors[1])
+        self.assertEqual(len(set(successors + [same])), len(successors))
+        self.assertEqual(same.get_key('b', 3), successors[0].get_key('b', 3))
+        self.assertNotEqual(same.get_key('b', 3), same.get_key('r', 3))
+        self.assertIsInstance(same.get_key('b', 3), str)
+
+    def test_board_is_read_only(self):
+        rows = [row[:] for row in INITIAL_BOARD]
+        state = State(rows, 12, 12, 0, 0)
+        key = hash(state)
+        states = {state}
+
+        # The state keeps its own copy of the rows it was given, and its board cannot be changed in place
+        rows[5][0] = '.'
+        with self.assertRaises(TypeError):
+            state.board[5][0] = '.'
+        with self.assertRaises(TypeError):
+            state.board[5] = ['.'] * 8
+        with self.assertRaises(AttributeError):
+            state.board = rows
+        self.assertEqual(state.board, INITIAL_BOARD)
+        self.assertEqual(hash(state), key)
+        self.assertIn(State([row[:] for row in INITIAL_BOARD], 12, 12, 0, 0), states)
+        self.assertNotEqual(state, State(rows, 11, 12, 0, 0))
+
+        # Changing a copy of the board makes a different state
+        changed = [row[:] for row in state.board]
+        changed[5][0] = '.'
+        self.assertEqual(State(changed, 11, 12, 0, 0), State(rows, 11, 12, 0, 0))
+        self.assertEqual(json.loads(json.dumps(state.board)), INITIAL_BOARD)
+
+
+class TestBitboard(unittest.TestCase):
+    def test_round_trip(self):
+        board = bitboard.from_rows(INITIAL_BOARD)
+        self.assertEqual(bitboard.to_rows(board), INITIAL_BOARD)
+        self.assertEqual(board.counts(), (12, 12, 0, 0))
+        for square in range(32):
+            self.assertEqual(bitboard.coords_to_square(*bitboard.square_to_coords(square)), square)
+
+    def test_chain_jumps(self):
+        chain_jump_board = [
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', 'b', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', 'r', '.', '.', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', 'R', '.', 'r', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.']
+        ]
+        board = bitboard.from_rows(chain_jump_board)
+
+        # Black at (1, 2) must jump to (3, 4), then continue over either (4, 3) or (4, 5)
+        moves = bitboard.generate_moves(board, 'b')
+        self.assertEqual(len(moves), 2)
+        self.assertEqual([bitboard.square_to_coords(move[bitboard.DST]) for move in moves], [(5, 2), (5, 6)])
+        for move in moves:
+            self.assertEqual(move[bitboard.CAPTURED].bit_count(), 2)
+        self.assertEqual(bitboard.apply_move(board, 'b', moves[0]).counts(), (1, 1, 0, 0))
+
+    def test_make_unmake_move(self):
+        # A red king that can jump around four black pieces and land back on its own square
+        loop_board = [
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', 'b', '.', 'b', '.', '.'],
+            ['.', '.', 'R', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', 'b', '.', 'b', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.']
+        ]
+        board = bitboard.from_rows(loop_board)
+        moves = bitboard.generate_moves(board, 'r')
+        self.assertIn(bitboard.coords_to_square(3, 2), [move[bitboard.DST] for move in moves])
+        for move in moves:
+            expected = bitboard.apply_move(board, 'r', move)
+            working = board.copy()
+            undo = bitboard.make_move(working, 'r', move)
+            self.assertEqual(working, expected)
+            self.assertEqual(working.counts(), (0, 0, 1, 0))
+            bitboard.unmake_move(working, undo)
+            self.assertEqual(working, board)
+
+    def test_matches_generate_successors(self):
+        # Differential test: random games, comparing both generators at every position
+        rng = random.Random(2024)
+        for _ in range(100):
+            state = State([row[:] for row in INITIAL_BOARD], 12, 12, 0, 0)
+            player = 'r'
+            for _ in range(150):
+                successors = generate_successors(state, player)
+                expected = [(s.board, s.new_move_coords, (s.num_r, s.num_b, s.num_r_kings, s.num_b_kings))
+                            for s in successors]
+                board = bitboard.from_rows(state.board)
+                actual = []
+                for move in bitboard.generate_moves(board, player):
+                    new_board = bitboard.apply_move(board, player, move)
+                    actual.append((bitboard.to_rows(new_board), bitboard.square_to_coords(move[bitboard.DST]),
+                                   new_board.counts()))
+                self.assertEqual(actual, expected)
+                if not successors:
+                    break
+                state = rng.choice(successors)
+                player = get_opp_char(player)
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_incremental_hash(self):
+        rng = random.Random(7)
+        board = bitboard.from_rows(INITIAL_BOARD)
+        player = 'r'
+        key = transposition.zobrist_hash(board, player)
+        for _ in range(120):
+            moves = bitboard.generate_moves(board, player)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            key = transposition.update_hash(key, board, player, move)
+            board = bitboard.apply_move(board, player, move)
+            player = get_opp_char(player)
+            self.assertEqual(key, transposition.zobrist_hash(board, player))
+
+    def test_store_and_probe(self):
+        table = transposition.TranspositionTable(entries=1000)
+        self.assertEqual(table.size, 512)
+        move = (9, 13, 0, False)
+        table.store(12345, 2, 6, transposition.LOWER, 3, move)
+        self.assertEqual(table.probe(12345, 2), (6, transposition.LOWER, 3, move))
+        self.assertIsNone(table.probe(12345 + 512, 2))
+        self.assertEqual((table.hits, table.misses, table.collisions, table.stores), (1, 1, 1, 1))
+
+    def test_win_scores_are_rebased_on_ply(self):
+        table = transposition.TranspositionTable(entries=64)
+        table.store(7, 3, 4, transposition.EXACT, 1000000 - 5, None)
+        # A win 2 plies below a node at ply 3 is a win 2 plies below the same node at ply 1
+        self.assertEqual(table.probe(7, 1)[2], 1000000 - 3)
+
+    def test_depth_preferred_replacement(self):
+        table = transposition.TranspositionTable(entries=64)
+        table.store(1, 0, 8, transposition.EXACT, 1, None)
+        table.store(1 + 64, 0, 2, transposition.EXACT, 2, None)
+        self.assertIsNotNone(table.probe(1, 0))
+        table.new_search()
+        table.store(1 + 64, 0, 2, transposition.EXACT, 2, None)
+        self.assertIsNone(table.probe(1, 0))
+
+        always = transposition.TranspositionTable(entries=64, policy='always')
+        always.store(1, 0, 8, transposition.EXACT, 1, None)
+        always.store(1 + 64, 0, 2, transposition.EXACT, 2, None)
+        self.assertIsNone(always.probe(1, 0))
+
+    def test_file_backed_table(self):
+        move = (9, 13, 0, False)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.bin")
+            table = transposition.TranspositionTable(entries=64, path=path)
+            shared = transposition.TranspositionTable(entries=1024, path=path)  # Keeps the file's size
+            self.assertEqual(shared.size, 64)
+            table.store(12345, 0, 6, transposition.EXACT, -7, move)
+            self.assertEqual(shared.probe(12345, 0), (6, transposition.EXACT, -7, move))
+
+            # An entry torn by two writers is a miss, not another position's result
+            shared.scores[12345 & shared.mask] = 8
+            self.assertIsNone(table.probe(12345, 0))
+            table.store(12345, 0, 6, transposition.EXACT, -7, move)
+            table.close()
+            shared.close()
+
+            reopened = transposition.TranspositionTable(path=path)
+            self.assertEqual(reopened.probe(12345, 0), (6, transposition.EXACT, -7, move))
+            self.assertEqual(reopened.filled(), 1)
+            reopened.clear()
+            self.assertEqual(reopened.filled(), 0)
+            reopened.close()
+
+            with open(path, 'wb') as f:
+                f.write(b'not a table')
+            with self.assertRaises(ValueError):
+                transposition.TranspositionTable(path=path)
+
+    def test_shared_table_is_created_on_first_use(self):
+        saved = checkers_ai.cache
+        try:
+            checkers_ai.cache = None
+            table = checkers_ai.get_cache()
+            self.assertIsInstance(table, transposition.TranspositionTable)
+            self.assertIs(checkers_ai.get_cache(), table)
+        finally:
+            checkers_ai.cache = saved
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.state = State([row[:] for row in INITIAL_BOARD], 12, 12, 0, 0)
+        self.state = generate_successors(self.state, 'r')[0]
+
+    def test_iterative_deepening_within_budget(self):
+        start = time.perf_counter()
+        result = iterative_deepening(self.state, 'b', 100)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.assertLess(elapsed_ms, 500)
+        self.assertGreaterEqual(result.depth, 1)
+        self.assertGreater(result.nodes, 0)
+        self.assertIn(str(result.move), [str(s) for s in generate_successors(self.state, 'b')])
+
+    def test_iterative_deepening_matches_fixed_depth(self):
+        result = iterative_deepening(self.state, 'b', 60000, max_depth=4)
+        self.assertEqual(result.depth, 4)
+        self.assertEqual(result.value, limited_minimax_alphabeta(self.state, 'b', 0, -1000000, 1000000, 4)[1])
+
+    def test_stats(self):
+        board = bitboard.from_rows(self.state.board)
+        stats = search.SearchStats()
+        result = search.iterative_deepening(board, 'b', 60000, transposition.TranspositionTable(entries=1 << 12),
+                                            max_depth=5, stats=stats)
+        self.assertIs(result.stats, stats)
+        self.assertEqual((stats.searches, stats.nodes), (1, result.nodes))
+        self.assertGreaterEqual(stats.max_ply, 5)
+        self.assertEqual(sorted(stats.depth_nodes), [1, 2, 3, 4, 5])
+        self.assertEqual(sum(stats.depth_nodes.values()), stats.nodes)
+        self.assertGreater(stats.leaves, 0)
+        self.assertLessEqual(stats.first_move_cutoffs, stats.cutoffs)
+        self.assertLessEqual(stats.tt_hits, stats.tt_probes)
+
+        # Searching without stats gives the same result
+        plain = search.iterative_deepening(board, 'b', 60000, transposition.TranspositionTable(entries=1 << 12),
+                                           max_depth=5)
+        self.assertEqual((plain.move, plain.value, plain.nodes, plain.stats), (result.move, result.value,
+                                                                              result.nodes, None))
+
+    def test_quiescence(self):
+        # Moving to (3, 2) loses the last black man to the red man on (4, 1), one ply past the horizon
+        rows = [['.'] * 8 for _ in range(8)]
+        rows[2][3], rows[4][1] = 'b', 'r'
+        board = bitboard.from_rows(rows)
+        for quiescence, expected in [(False, (3, 2)), (True, (3, 4))]:
+            searcher = search.Search(transposition.TranspositionTable(entries=1024), 1, quiescence=quiescence)
+            move, value = searcher.alphabeta(board.copy(), 'b', 0, -float('inf'), float('inf'),
+                                             transposition.zobrist_hash(board, 'b'))
+            self.assertEqual(bitboard.square_to_coords(move[bitboard.DST]), expected)
+            self.assertEqual(searcher.qnodes > 0, quiescence)
+
+    def test_pvs_and_aspiration_keep_the_result(self):
+        for rows, player, _, depth in benchmark.POSITIONS.values():
+            board = bitboard.from_rows([list(row) for row in rows])
+            key = transposition.zobrist_hash(board, player)
+            results = []
+            for pvs in (False, True):
+                searcher = search.Search(transposition.TranspositionTable(entries=1 << 14), depth - 3, pvs=pvs)
+                results.append(searcher.alphabeta(board.copy(), player, 0, -float('inf'), float('inf'), key))
+            for aspiration in (None, 1):
+                result = search.iterative_deepening(board, player, 60000, transposition.TranspositionTable(1 << 14),
+                                                    max_depth=depth - 3, aspiration=aspiration)
+                results.append((result.move, result.value))
+            self.assertEqual(results[1:], results[:1] * 3)
+
+    def test_killer_and_history_ordering(self):
+        board = bitboard.from_rows(INITIAL_BOARD)
+        searcher = search.Search(transposition.TranspositionTable(entries=1 << 12), 6)
+        moves = bitboard.generate_moves(board, 'r')
+        killer, favourite = moves[3], moves[5]
+        searcher.record_cutoff('r', 2, killer)
+        for _ in range(3):
+            searcher.record_cutoff('r', 3, favourite)
+
+        self.assertEqual(searcher.order_moves(board, 'r', 2, list(moves), None)[:2], [killer, favourite])
+        self.assertEqual(searcher.order_moves(board, 'r', 3, list(moves), None)[0], favourite)
+        self.assertEqual(searcher.order_moves(board, 'r', 2, list(moves), moves[0])[:2], [moves[0], killer])
+
+    def test_orderings(self):
+        # Every ordering finds the same value; without any, the search visits more nodes
+        nodes = dict.fromkeys(search.ORDERINGS, 0)
+        for rows, player, _, _ in benchmark.POSITIONS.values():
+            board = bitboard.from_rows([list(row) for row in rows])
+            values = set()
+            for ordering in search.ORDERINGS:
+                searcher = search.Search(transposition.TranspositionTable(entries=1 << 14), 5, ordering=ordering)
+                values.add(searcher.alphabeta(board.copy(), player, 0, -float('inf'), float('inf'),
+                                              transposition.zobrist_hash(board, player))[1])
+                nodes[ordering] += searcher.nodes
+            self.assertEqual(len(values), 1)
+        self.assertLess(nodes['full'], nodes['none'])
+
+        # Without killers and history, cutoffs leave the ordering alone
+        board = bitboard.from_rows(INITIAL_BOARD)
+        searcher = search.Search(transposition.TranspositionTable(entries=1 << 12), 6, ordering='none')
+        moves = bitboard.generate_moves(board, 'r')
+        searcher.record_cutoff('r', 2, moves[3])
+        self.assertEqual(searcher.order_moves(board, 'r', 2, list(moves), moves[5]), [moves[5]] + moves[:5] + moves[6:])
+        with self.assertRaises(ValueError):
+            search.Search(transposition.TranspositionTable(entries=1 << 12), ordering='random')
+
+    def test_draws(self):
+        def play(board, player, old, new):
+            move = next(m for m in bitboard.generate_moves(board, player)
+                        if (m[0], m[1]) == (bitboard.coords_to_square(*old), bitboard.coords_to_square(*new)))
+            return bitboard.apply_move(board, player, move)
+
+        # Black, a king down, can draw by repeating the position from three plies ago
+        board = bitboard.from_rows(KINGS_BOARD)
+        history = []
+        for player, old, new in SHUFFLE[:3]:
+            history.append(transposition.zobrist_hash(board, player))
+            board = play(board, player, old, new)
+        stats = search.SearchStats()
+        searcher = search.Search(transposition.TranspositionTable(1 << 10), 3, stats=stats, use_tablebase=False,
+                                 history=history, quiet_plies=3)
+        move, value = searcher.alphabeta(board.copy(), 'b', 0, -float('inf'), float('inf'),
+                                         transposition.zobrist_hash(board, 'b'))
+        self.assertEqual((move[0], move[1], value), (bitboard.coords_to_square(1, 0),
+                                                     bitboard.coords_to_square(0, 1), search.DRAW))
+        self.assertGreater(stats.draws, 0)
+        # Without the game's history that move is just a king move
+        searcher = search.Search(transposition.TranspositionTable(1 << 10), 3, use_tablebase=False)
+        self.assertLess(searcher.alphabeta(board.copy(), 'b', 0, -float('inf'), float('inf'),
+                                           transposition.zobrist_hash(board, 'b'))[1], search.DRAW)
+
+        # One ply from the no-progress limit, every king move draws
+        board = bitboard.from_rows(KINGS_BOARD)
+        searcher = search.Search(transposition.TranspositionTable(1 << 10), 3, use_tablebase=False, draw_plies=10,
+                                 quiet_plies=9)
+        self.assertEqual(searcher.alphabeta(board.copy(), 'b', 0, -float('inf'), float('inf'),
+                                            transposition.zobrist_hash(board, 'b'))[1], search.DRAW)
+
+    def test_incremental_evaluation(self):
+        # Updating the score move by move must agree with scoring each position from scratch
+        rng = random.Random(7)
+        evaluator = evaluation.DEFAULT
+        for rows, player, _, _ in benchmark.POSITIONS.values():
+            board = bitboard.from_rows([list(row) for row in rows])
+            score = evaluator.evaluate(board)
+            for _ in range(30):
+                moves = bitboard.generate_moves(board, player)
+                if not moves or not board.black or not board.red:
+                    break
+                move = rng.choice(moves)
+                score += evaluator.move_delta(board, player, move)
+                bitboard.make_move(board, player, move)
+                self.assertEqual(score, evaluator.evaluate(board))
+                player = 'r' if player == 'b' else 'b'
+
+        # The material weights score like the original material count, men 1 and kings 2
+        board = bitboard.from_rows([list(row) for row in benchmark.POSITIONS["middlegame"][0]])
+        red_men, black_men, red_kings, black_kings = board.counts()
+        self.assertEqual(evaluation.Evaluator(evaluation.MATERIAL).evaluate(board),
+                         black_men + 2 * black_kings - red_men - 2 * red_kings)
+        # Advanced men are worth more than men at home
+        self.assertGreater(evaluator.tables[0][bitboard.coords_to_square(6, 1)],
+                           evaluator.tables[0][bitboard.coords_to_square(2, 1)])
+
+    def test_forced_move_is_not_searched_deeper(self):
+        board = bitboard.from_rows([
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', 'b', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', 'r', '.', '.', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['.', '.', '.', '.', '.', '.', '.', '.'],
+            ['r', '.', '.', '.', '.', '.', '.', '.']
+        ])
+        result = search.iterative_deepening(board, 'b', 60000, transposition.TranspositionTable(entries=1024))
+        self.assertEqual(result.depth, 1)
+        self.assertEqual(bitboard.square_to_coords(result.move[bitboard.DST]), (3, 4))
+
+
+class TestParallelSearch(unittest.TestCase):
+    def test_same_move_as_serial_search(self):
+        rng = random.Random(11)
+        positions = []
+        board, player = bitboard.from_rows(INITIAL_BOARD), 'r'
+        for ply in range(30):
+            moves = bitboard.generate_moves(board, player)
+            if not moves:
+                break
+            board = bitboard.apply_move(board, player, rng.choice(moves))
+            player = get_opp_char(player)
+            if ply % 6 == 0:
+                positions.append((board, player))
+
+        with parallel.ParallelSearch(workers=2, table_entries=1 << 12) as pool:
+            for board, player in positions:
+                serial = search.Search(transposition.TranspositionTable(entries=1 << 12), 5)
+                expected = serial.alphabeta(board.copy(), player, 0, -float('inf'), float('inf'),
+                                            transposition.zobrist_hash(board, player))
+                result = pool.search_depth(board, player, 5)
+                self.assertEqual((result.move, result.value), expected)
+
+    def test_time_budget(self):
+        # A root move still queued when the deadline passes does not get a fresh budget when it starts
+        board = bitboard.from_rows(INITIAL_BOARD)
+        move = bitboard.generate_moves(board, 'r')[0]
+        parallel._init_worker(multiprocessing.Value('d', -float('inf')), 1 << 10, None)
+        self.assertEqual(parallel._search_root_move(board.black, board.red, board.kings, 'r', move, 20, 0,
+                                                    time.monotonic() - 0.001), (None, 0))
+
+        with parallel.ParallelSearch(workers=1, table_entries=1 << 12) as pool:
+            pool.search_depth(board, 'r', 1)  # Start the worker before timing
+            start = time.perf_counter()
+            result = pool.iterative_deepening(board, 'r', 300)
+            self.assertLess(time.perf_counter() - start, 0.45)
+            self.assertIsNotNone(result.move)
+
+
+class TestAnalysis(unittest.TestCase):
+    def test_parse_position(self):
+        rows = [''.join(row) for row in INITIAL_BOARD]
+        position = analysis.parse_position('/'.join(rows) + ' r', 3)
+        self.assertEqual((position["id"], position["rows"], position["player"]), (3, INITIAL_BOARD, 'r'))
+        self.assertEqual(analysis.parse_position(''.join(rows), 0)["player"], 'b')
+        self.assertEqual(analysis.parse_position(json.dumps({"id": "x", "board": rows, "depth": 2}), 0)["depth"], 2)
+
+        for line in ['b' * 64, 'x' + ''.join(rows)[1:], ''.join(rows) + ' w', '{"board": []}', '{oops',
+                     json.dumps({"board": rows, "frontier": 0}), json.dumps({"board": list(range(8))}),
+                     json.dumps({"board": rows[:7] + [[{}] * 8]}), json.dumps({"board": rows, "depth": True}),
+                     json.dumps({"board": rows, "time_ms": True}), json.dumps({"board": rows, "frontier": True})]:
+            with self.assertRaises(analysis.PositionError):
+                analysis.parse_position(line, 0)
+
+    def test_batch_matches_search(self):
+        rows = [''.join(row) for row in INITIAL_BOARD]
+        lines = [json.dumps({"id": "start", "board": rows, "player": 'r'}), '', 'not a board',
+                 json.dumps({"board": [1, 2, 3, 4, 5, 6, 7, 8], "player": 'b'})]
+        with analysis.Analyzer(workers=2, table_entries=1 << 12) as analyzer:
+            reports = list(analyzer.analyze(lines, depth=4))
+
+        # Malformed lines get an error record each and do not end the stream
+        self.assertEqual([report["id"] for report in reports], ["start", 2, 3])
+        self.assertIn("error", reports[1])
+        self.assertIn("error", reports[2])
+        board = bitboard.from_rows(INITIAL_BOARD)
+        move, value = search.Search(transposition.TranspositionTable(1 << 12), 4).alphabeta(
+            board.copy(), 'r', 0, -float('inf'), float('inf'), transposition.zobrist_hash(board, 'r'))
+        self.assertEqual(reports[0]["best_move"], [list(bitboard.square_to_coords(move[bitboard.SRC])),
+                                                   list(bitboard.square_to_coords(move[bitboard.DST]))])
+        self.assertEqual((reports[0]["score"], reports[0]["depth"]), (value, 4))
+
+    def test_score_frontier(self):
+        # Batch scores match one-at-a-time scores
+        boards = [bitboard.from_rows([list(row) for row in rows]) for rows, _, _, _ in benchmark.POSITIONS.values()]
+        self.assertEqual([int(score) for score in evaluation.DEFAULT.evaluate_batch(
+            [(board.black, board.red, board.kings) for board in boards])],
+            [evaluation.DEFAULT.evaluate(board) for board in boards])
+
+        # Every move's frontier score is its full-width minimax value
+        for board, (_, player, _, _) in zip(boards, benchmark.POSITIONS.values()):
+            opponent = 'r' if player == 'b' else 'b'
+            scores = analysis.score_frontier(board, player, 3)
+            self.assertEqual([move for move, _ in scores], bitboard.generate_moves(board, player))
+            for move, score in scores:
+                child = bitboard.apply_move(board, player, move)
+                searcher = search.Search(transposition.TranspositionTable(1 << 12), 3, quiescence=False,
+                                         use_tablebase=False)
+                value = searcher.alphabeta(child, opponent, 1, -float('inf'), float('inf'),
+                                           transposition.zobrist_hash(child, opponent))[1]
+                if abs(value) != float('inf'):  # The search scores a side with no move as +/-inf
+                    self.assertEqual(score, value)
+
+
+class TestOpeningBook(unittest.TestCase):
+    def test_build_and_probe(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'book.bin')
+            self.assertEqual(book.build(path, plies=2, depth=3, workers=1, table_entries=1 << 12), 7)
+            with book.OpeningBook(path) as opening_book:
+                self.assertEqual((len(opening_book), opening_book.depth), (7, 3))
+                board = bitboard.from_rows(INITIAL_BOARD)
+                reply = bitboard.apply_move(board, 'r', bitboard.generate_moves(board, 'r')[0])
+                result = opening_book.probe(reply, 'b')
+                move, value = search.Search(transposition.TranspositionTable(1 << 12), 3).alphabeta(
+                    reply.copy(), 'b', 0, -float('inf'), float('inf'), transposition.zobrist_hash(reply, 'b'))
+                self.assertEqual((result.move, result.value, result.depth, result.nodes), (move, value, 3, 0))
+                # Only the book side's turns are in the book
+                self.assertIsNone(opening_book.probe(board, 'r'))
+                self.assertEqual((opening_book.hits, opening_book.misses), (1, 1))
+
+            with open(path, 'r+b') as f:
+                f.truncate(os.path.getsize(path) - 1)
+            with self.assertRaises(book.BookError):
+                book.OpeningBook(path)
+
+
+class TestTablebase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'tablebase.bin')
+        tablebase.build(cls.path, pieces=2)
+        cls.tablebase = tablebase.Tablebase(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tablebase.close()
+        cls.directory.cleanup()
+
+    def test_outcomes_agree_with_moves(self):
+        # Each position's outcome must follow from its children's: a win reaches the quickest losing child,
+        # a loss holds out as long as its best child, and a draw has no losing child but a drawn one
+        for material in tablebase.slices(2):
+            for board in tablebase._positions(material):
+                for player in 'br':
+                    opponent = 'r' if player == 'b' else 'b'
+                    children = []
+                    for move in bitboard.generate_moves(board, player):
+                        child = bitboard.apply_move(board, player, move)
+                        children.append(self.tablebase.probe(child, opponent) if child.pieces(opponent)
+                                        else (tablebase.LOSS, 0))
+                    losses = [distance for outcome, distance in children if outcome == tablebase.LOSS]
+                    if losses:
+                        expected = (tablebase.WIN, min(losses) + 1)
+                    elif any(outcome == tablebase.DRAW for outcome, _ in children):
+                        expected = (tablebase.DRAW, 0)
+                    else:
+                        expected = (tablebase.LOSS, max((distance for _, distance in children), default=-1) + 1)
+                    self.assertEqual(self.tablebase.probe(board, player), expected)
+
+    def test_search_uses_tablebase(self):
+        # A black king in the far corner still runs down a red man before it is crowned, in 11 plies
+        board = bitboard.from_rows([".......B", "........", "........", "........",
+                                    "........", "........", "........", "r......."])
+        self.assertIsNone(self.tablebase.probe(bitboard.from_rows(INITIAL_BOARD), 'b'))
+        self.assertEqual(self.tablebase.probe(board, 'b'), (tablebase.WIN, 11))
+
+        stats = search.SearchStats()
+        searcher = search.Search(transposition.TranspositionTable(1 << 12), 4, stats=stats, use_tablebase=False)
+        searcher.tablebase = self.tablebase
+        move, value = searcher.alphabeta(board.copy(), 'b', 0, -float('inf'), float('inf'),
+                                         transposition.zobrist_hash(board, 'b'))
+        self.assertEqual(value, self.tablebase.score(board, 'b', 0))
+        self.assertEqual(value, 1000000 - 11)
+        self.assertGreater(stats.tb_hits, 0)
+        # The move played keeps to the quickest win
+        self.assertEqual(self.tablebase.probe(bitboard.apply_move(board, 'b', move), 'r'), (tablebase.LOSS, 10))
+
+
+class TestPerft(unittest.TestCase):
+    def test_opening_counts(self):
+        state = State([row[:] for row in INITIAL_BOARD], 12, 12, 0, 0)
+        for depth in range(1, 5):
+            self.assertEqual(perft.perft(state, 'r', depth), perft.OPENING_COUNTS[depth])
+        self.assertEqual(perft.perft_bitboard(bitboard.from_rows(INITIAL_BOARD), 'r', 6), perft.OPENING_COUNTS[6])
+
+    def test_generators_agree(self):
+        for rows, player, _, _ in benchmark.POSITIONS.values():
+            state = benchmark.make_state(rows)
+            by_states = [count for _, _, count in perft.divide(state, player, 3, 'states')]
+            self.assertEqual(by_states, [count for _, _, count in perft.divide(state, player, 3, 'bitboard')])
+            self.assertEqual(sum(by_states), perft.run(state, player, 3)[0])
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_compare(self):
+        old = {"movegen": {"opening": {"bitboard": {"depth": 6, "leaves": 36768, "seconds": 0.10}}},
+               "search": {"opening": {"depths": {"9": {"seconds": 0.50, "nodes": 7330}}}}}
+        new = json.loads(json.dumps(old))
+        new["search"]["opening"]["depths"]["9"].update(seconds=0.51, nodes=7000)
+        rows, regressed = benchmark.compare(old, new)
+        self.assertFalse(regressed)
+        self.assertTrue(rows[1]["count_changed"])
+
+        new["movegen"]["opening"]["bitboard"]["leaves"] = 36767
+        self.assertTrue(benchmark.compare(old, new)[1])
+        new["movegen"]["opening"]["bitboard"]["leaves"] = 36768
+        new["search"]["opening"]["depths"]["9"]["seconds"] = 0.60
+        self.assertTrue(benchmark.compare(old, new)[1])
+
+
+class TestTournament(unittest.TestCase):
+    def test_parse_engine(self):
+        engine = tournament.parse_engine("depth=4, eval=material, advancement=5, pvs=off, aspiration=off, "
+                                         "ordering=static")
+        self.assertEqual((engine.depth, engine.time_ms, engine.pvs, engine.quiescence, engine.aspiration,
+                          engine.ordering), (4, None, False, True, None, 'static'))
+        self.assertEqual(tournament.parse_engine("depth=4").ordering, 'full')
+        self.assertEqual(engine.weights, evaluation.MATERIAL._replace(advancement=5))
+        for spec in ("time_ms=50,depth=x", "depth=3,speed=9", "depth=3,pvs=maybe", "eval=material",
+                     "depth=3,ordering=random"):
+            with self.assertRaises(ValueError):
+                tournament.parse_engine(spec)
+
+    def test_run(self):
+        engine = tournament.parse_engine("depth=1")
+        report = tournament.run(engine, engine._replace(depth=2, ordering='none'), games=4, workers=1, max_plies=30)
+        self.assertEqual(report["wins"] + report["draws"] + report["losses"], 4)
+        self.assertGreater(report["engines"]["b"]["average_depth"], report["engines"]["a"]["average_depth"])
+        low, high = report["score_interval"]
+        self.assertLessEqual(low, report["score"])
+        self.assertLessEqual(report["score"], high)
+
+        # The engine's ordering reaches its search
+        board = bitboard.from_rows(INITIAL_BOARD)
+        nodes = {ordering: tournament.play_game(0, engine, engine._replace(depth=5, ordering=ordering), 'b', board, 'r',
+                                                1).nodes['b'] for ordering in ('full', 'none')}
+        self.assertLess(nodes['full'], nodes['none'])
+
+        # Openings come in pairs with the sides swapped
+        first = tournament._play_game(0, engine, engine, 0, 4, 0)
+        second = tournament._play_game(1, engine, engine, 0, 4, 0)
+        self.assertNotEqual(first.a_side, second.a_side)
+
+    def test_score_interval(self):
+        self.assertEqual(tournament.score_interval(5, 0, 5)[0], 0.5)
+        score, low, high = tournament.score_interval(30, 40, 30)
+        self.assertAlmostEqual(score - low, 1.96 * math.sqrt(0.15 / 100))
+        self.assertEqual(tournament.elo(0.5), 0)
+        self.assertAlmostEqual(tournament.elo(10 / 11), 400)
+
+        # A score of 0 or 1 has no finite Elo difference, which the report gives as null to stay valid JSON
+        self.assertEqual(tournament.elo(1.0), math.inf)
+        report = tournament.run(tournament.parse_engine("depth=1"), tournament.parse_engine("depth=1"), games=0)
+        self.assertEqual(report["elo_interval"], [None, None])
+        self.assertEqual(json.loads(json.dumps(report, allow_nan=False))["elo_interval"], [None, None])
+
+
+class TestGameStore(unittest.TestCase):
+    def new_state(self):
+        return State([row[:] for row in INITIAL_BOARD], 12, 12, 0, 0)
+
+    def test_lru_eviction(self):
+        store = sessions.GameStore(max_games=2)
+        first, second = store.create(self.new_state()), store.create(self.new_state())
+        store.get(first)
+        third = store.create(self.new_state())
+        self.assertIsNotNone(store.get(first))
+        self.assertIsNone(store.get(second))
+        self.assertIsNotNone(store.get(third))
+        self.assertEqual(len(store), 2)
+
+    def test_ttl_expiry(self):
+        store = sessions.GameStore(ttl_seconds=0.01)
+        game_id = store.create(self.new_state())
+        time.sleep(0.02)
+        self.assertIsNone(store.get(game_id))
+
+    def test_sqlite_backend_reloads_evicted_games(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = sessions.SQLiteBackend(os.path.join(directory, "games.db"))
+            store = sessions.GameStore(max_games=1, backend=backend)
+            state = generate_successors(self.new_state(), 'r')[0]
+            game_id = store.create(state)
+            store.create(self.new_state())
+            reloaded = store.get(game_id)
+            self.assertEqual(str(reloaded), str(state))
+            self.assertEqual(reloaded.move_num, 1)
+            backend.close()
+
+    def test_idle_games_are_purged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = sessions.SQLiteBackend(os.path.join(directory, "games.db"))
+            store = sessions.GameStore(max_games=1, ttl_seconds=0.05, backend=backend, expire_seconds=0.05)
+            idle = store.create(self.new_state())
+            store.create(self.new_state())  # Evicts idle from memory; it is still in the backend
+            self.assertIsNotNone(backend.load(idle))
+            time.sleep(0.1)
+
+            # Creating a game sweeps out the idle ones, from the backend too
+            active = store.create(self.new_state())
+            self.assertIsNone(backend.load(idle))
+            self.assertIsNotNone(backend.load(active))
+            time.sleep(0.1)
+            store.expire()
+            self.assertIsNone(backend.load(active))
+            self.assertEqual(len(store), 0)
+            backend.close()
+
+
+class TestGameEndpoints(unittest.TestCase):
+    def setUp(self):
+        import app
+        self.app = app.app
+        self.app.config['AI_TIME_BUDGET_MS'] = 50
+        self.app.config['OPENING_BOOK_PATH'] = None
+        self.client = self.app.test_client()
+
+    def post(self, url, body=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.client.post(url, json=body)
+
+    def test_games_are_independent(self):
+        first = self.post('/games').json['game_id']
+        second = self.post('/games').json['game_id']
+        self.assertNotEqual(first, second)
+
+        response = self.post('/apply_user_move', {"game_id": first, "old_coords": [5, 2], "new_coords": [4, 3],
+                                                  "piece": 'r'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.post('/ai_move', {"game_id": first}).status_code, 200)
+
+        # The second game is untouched and still waiting for the user's first move
+        self.assertEqual(self.post('/ai_move', {"game_id": second}).status_code, 700)
+        self.assertEqual(self.post('/user_move', {"game_id": second}).json['user_moves']['5,2'], [[4, 1], [4, 3]])
+
+    def test_user_move_forced_jump(self):
+        import checkers_ai
+        board = [['.'] * 8 for _ in range(8)]
+        board[5][2] = 'r'
+        board[4][3] = 'b'
+        board[7][6] = 'r'
+        board[0][1] = 'b'
+        state = checkers_ai.State(board, 2, 2, 0, 0)
+        game_id = self.app.config['games'].create(state)
+
+        self.assertEqual(self.post('/user_move', {"game_id": game_id}).json['user_moves'], {"5,2": [[3, 4]]})
+        # The index built for /user_move is the one /apply_user_move checks against
+        self.assertEqual(list(state.legal_moves['r']), [((5, 2), (3, 4))])
+
+        # A quiet move is illegal while a jump is available
+        response = self.post('/apply_user_move', {"game_id": game_id, "old_coords": [7, 6], "new_coords": [6, 5],
+                                                  "piece": 'r'})
+        self.assertEqual(response.status_code, 400)
+        response = self.post('/apply_user_move', {"game_id": game_id, "old_coords": [5, 2], "new_coords": [3, 4]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['num_black'], 1)
+
+    def test_drawn_game(self):
+        import checkers_ai
+        state = checkers_ai.State([row[:] for row in KINGS_BOARD], 0, 0, 2, 1)
+        state.quiet_plies = search.DRAW_PLIES
+        game_id = self.app.config['games'].create(state)
+        self.assertEqual(self.post('/user_move', {"game_id": game_id}).json, {"user_moves": {}, "draw": True})
+        response = self.post('/apply_user_move', {"game_id": game_id, "old_coords": [7, 0], "new_coords": [6, 1]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_missing_or_unknown_game(self):
+        self.assertEqual(self.post('/user_move', {}).status_code, 400)
+        self.assertEqual(self.post('/user_move', {"game_id": "nope"}).status_code, 404)
+
+    def test_analyze(self):
+        rows = [''.join(row) for row in INITIAL_BOARD]
+        body = '\n'.join([json.dumps({"id": "start", "board": rows, "player": 'r'}), '/'.join(rows) + ' b'])
+        response = self.client.post('/analyze?depth=3', data=body)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        reports = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual([(report["id"], report["depth"]) for report in reports], [("start", 3), (1, 3)])
+
+    def test_metrics(self):
+        game_id = self.post('/games').json['game_id']
+        self.post('/apply_user_move', {"game_id": game_id, "old_coords": [5, 2], "new_coords": [4, 3], "piece": 'r'})
+        searches = self.app.config['search_stats'].searches
+        self.post('/ai_move', {"game_id": game_id})
+
+        text = self.client.get('/metrics').data.decode()
+        self.assertIn(f"checkers_search_searches_total {searches + 1}\n", text)
+        self.assertIn('checkers_search_depth_nodes_total{depth="1"}', text)
+
+    def test_pondering(self):
+        self.app.config['PONDER_WORKERS'] = 1
+        try:
+            game_id = self.post('/games').json['game_id']
+            self.post('/user_move', {"game_id": game_id})
+            ponderer = self.app.config['ponderer']
+            deadline = time.time() + 10
+            while ponderer.pending() and time.time() < deadline:
+                time.sleep(0.05)
+
+            self.post('/apply_user_move', {"game_id": game_id, "old_coords": [5, 2], "new_coords": [4, 3],
+                                           "piece": 'r'})
+            response = self.post('/ai_move', {"game_id": game_id})
+            self.assertTrue(response.json['pondered'])
+            self.assertEqual(self.app.config['games'].get(game_id).board, response.json['board_state'])
+            self.assertEqual(ponderer.hits, 1)
+        finally:
+            self.app.config['PONDER_WORKERS'] = 0
+            if self.app.config['ponderer'] is not None:
+                self.app.config['ponderer'].close()
+                self.app.config['ponderer'] = None
+
+    def test_opening_book(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'book.bin')
+            book.build(path, plies=2, depth=3, workers=1, table_entries=1 << 12)
+            self.app.config['OPENING_BOOK_PATH'] = path
+            try:
+                game_id = self.post('/games').json['game_id']
+                self.post('/apply_user_move', {"game_id": game_id, "old_coords": [5, 2], "new_coords": [4, 3],
+                                               "piece": 'r'})
+                response = self.post('/ai_move', {"game_id": game_id})
+                self.assertTrue(response.json['book'])
+                self.assertEqual(response.json['nodes'], 0)
+                self.assertEqual(self.app.config['games'].get(game_id).board, response.json['board_state'])
+
+                # An asynchronous request in book gets a finished job without searching
+                other_id = self.post('/games').json['game_id']
+                self.post('/apply_user_move', {"game_id": other_id, "old_coords": [5, 2], "new_coords": [4, 3]})
+                response = self.post('/ai_move', {"game_id": other_id, "async": True})
+                self.assertEqual((response.status_code, response.json['status']), (200, 'done'))
+                self.assertTrue(response.json['book'])
+                self.assertEqual(response.json['nodes'], 0)
+                self.assertEqual(self.app.config['games'].get(other_id).board, response.json['board_state'])
+                self.assertEqual(self.client.get(f"/ai_move/{response.json['job_id']}").json['status'], 'done')
+
+                # Out of book, the AI searches (the book's reply offers a jump, which the user has to take)
+                self.post('/apply_user_move', {"game_id": game_id, "old_coords": [4, 3], "new_coords": [2, 1],
+                                               "piece": 'r'})
+                self.assertFalse(self.post('/ai_move', {"game_id": game_id}).json['book'])
+                metrics = self.client.get('/metrics').get_data(as_text=True)
+                self.assertIn("checkers_book_hits_total 2\n", metrics)
+                self.assertIn("checkers_book_misses_total 1\n", metrics)
+            finally:
+                self.app.config['opening_book'].close()
+                self.app.config['opening_book'] = None
+
+    def test_async_ai_move(self):
+        game_id = self.post('/games').json['game_id']
+        self.post('/apply_user_move', {"game_id": game_id, "old_coords": [5, 2], "new_coords": [4, 3], "piece": 'r'})
+
+        response = self.post('/ai_move', {"game_id": game_id, "async": True})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json['job_id']
+        # Asking again while the job is live returns the same job
+        self.assertEqual(self.post('/ai_move', {"game_id": game_id, "async": True}).json['job_id'], job_id)
+
+        response = self.client.get(f'/ai_move/{job_id}?wait=10')
+        self.assertEqual(response.json['status'], 'done')
+        self.assertEqual(self.app.config['games'].get(game_id).board, response.json['board_state'])
+        self.assertEqual(self.client.get('/ai_move/nope').status_code, 404)
+
+    def test_game_changed_during_ai_move(self):
+        game_id = self.post('/games').json['game_id']
+        self.post('/apply_user_move', {"game_id": game_id, "old_coords": [5, 2], "new_coords": [4, 3]})
+        moved_on = State([row[:] for row in INITIAL_BOARD], 12, 12, 0, 0)
+        moved_on.move_num = 1
+        self.app.config['AI_TIME_BUDGET_MS'] = 600
+
+        # The synchronous call answers 409
+        responses = []
+        request = threading.Thread(target=lambda: responses.append(self.post('/ai_move', {"game_id": game_id})))
+        request.start()
+        time.sleep(0.2)
+        searched = self.app.config['games'].get(game_id)
+        self.app.config['games'].put(game_id, moved_on)
+        request.join()
+        self.assertEqual(responses[0].status_code, 409)
+        self.assertIn("Game changed", responses[0].json['error'])
+        self.assertEqual(self.app.config['games'].get(game_id), moved_on)
+
+        # A background job fails with the same message
+        self.app.config['games'].put(game_id, searched)
+        job_id = self.post('/ai_move', {"game_id": game_id, "async": True}).json['job_id']
+        self.app.config['games'].put(game_id, moved_on)
+        response = self.client.get(f'/ai_move/{job_id}?wait=10')
+        self.assertEqual(response.json['status'], 'failed')
+        self.assertIn("Game changed", response.json['error'])
+
+    def test_cancel_ai_move(self):
+        game_id = self.post('/games').json['game_id']
+        self.post('/apply_user_move', {"game_id": game_id, "old_coords": [5, 2], "new_coords": [4, 3], "piece": 'r'})
+        before = self.app.config['games'].get(game_id).board
+
+        self.app.config['AI_TIME_BUDGET_MS'] = 10000
+        job_id = self.post('/ai_move', {"game_id": game_id, "async": True}).json['job_id']
+        self.assertIn(self.client.delete(f'/ai_move/{job_id}').json['status'], ('cancelling', 'cancelled'))
+        self.assertEqual(self.client.get(f'/ai_move/{job_id}?wait=10').json['status'], 'cancelled')
+        self.assertEqual(self.app.config['games'].get(game_id).board, before)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,294 @@
+"""
+Headless self-play: two engine configurations play each other from randomized openings, with the games spread
+across worker processes, to check that a change to the search kept (or gained) playing strength.
+
+    python tournament.py --games 100 --a depth=6 --b depth=6,eval=material
+    python tournament.py --games 40 --a time_ms=100 --b time_ms=100,pvs=off,table=4096 --workers 4
+
+An engine is a comma-separated list of settings:
+
+    depth       deepest iteration (default: no limit, so give time_ms)
+    time_ms     time budget per move (default: none, so give depth)
+    eval        'default' or 'material', the evaluation.Weights to start from
+    <weight>    any evaluation.Weights field, e.g. advancement=6, overriding eval's value
+    quiescence, pvs, tablebase
+                on or off (default: on)
+    aspiration  root window either side of the previous iteration's value, or off for a full window
+    ordering    move ordering: full (killer moves and history heuristic), static or none (see search.ORDERINGS)
+    table       transposition table slots of each engine, per game (default: 65536)
+
+Every opening (a few random plies from the start position) is played twice, once with each engine moving first,
+so that neither gets the better half of a lopsided opening. A game is drawn when a position occurs for the third
+time, after search.DRAW_PLIES plies without a capture or a man moving, or when it reaches --max-plies.
+The report gives A's wins, draws and losses with a 95% confidence interval on its score and the Elo difference
+it implies, and for each engine its average time per move, nodes per second and depth reached.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import bitboard
+import checkers_ai
+import evaluation
+import search
+import transposition
+
+Engine = namedtuple('Engine', ['depth', 'time_ms', 'weights', 'quiescence', 'pvs', 'tablebase', 'aspiration',
+                               'table_entries', 'ordering'],
+                    defaults=(None, None, evaluation.Weights(), True, True, True, search.ASPIRATION_WINDOW, 1 << 16,
+                              'full'))
+
+# One game's outcome. winner : 'a', 'b' or None for a draw; a_side : the side A played
+# moves, seconds, nodes, depths : per engine ('a' and 'b'), totals over its moves
+GameResult = namedtuple('GameResult', ['index', 'winner', 'a_side', 'plies', 'moves', 'seconds', 'nodes', 'depths'])
+
+EVALUATIONS = {'default': evaluation.Weights(), 'material': evaluation.MATERIAL}
+SWITCHES = {'on': True, 'off': False}
+ORDERINGS = {name: name for name in search.ORDERINGS}
+
+# Engine setting -> (Engine field, how to read its value)
+SETTINGS = {'depth': ('depth', int), 'time_ms': ('time_ms', float), 'eval': ('weights', EVALUATIONS.__getitem__),
+            'quiescence': ('quiescence', SWITCHES.__getitem__), 'pvs': ('pvs', SWITCHES.__getitem__),
+            'tablebase': ('tablebase', SWITCHES.__getitem__),
+            'aspiration': ('aspiration', lambda value: None if value == 'off' else int(value)),
+            'table': ('table_entries', int),
+            'ordering': ('ordering', ORDERINGS.__getitem__)}
+
+# z for a two-sided 95% confidence interval
+Z_95 = 1.96
+
+
+def parse_engine(spec: str) -> Engine:
+    """
+    Read an engine configuration such as "depth=6,eval=material,pvs=off" (see the module docstring).
+
+    :raise ValueError: For an unknown setting or a bad value
+    """
+    settings = {}
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.partition('=')
+        if name not in SETTINGS and name not in evaluation.Weights._fields:
+            raise ValueError(f"Unknown engine setting: {name}")
+        try:
+            if name in SETTINGS:
+                field, read = SETTINGS[name]
+                settings[field] = read(value)
+            else:
+                overrides[name] = int(value)
+        except (KeyError, ValueError):
+            raise ValueError(f"Bad value for {name}: {value!r}") from None
+    engine = Engine(**settings)
+    if overrides:
+        engine = engine._replace(weights=engine.weights._replace(**overrides))
+    if engine.depth is None and engine.time_ms is None:
+        raise ValueError(f"Engine {spec!r} needs a depth or a time_ms")
+    return engine
+
+
+def random_opening(rng: random.Random, plies: int) -> tuple[bitboard.Board, str]:
+    """
+    Play random legal moves from the start position.
+
+    :return: (position, side to move); the game is never over in it
+    """
+    while True:
+        board = bitboard.from_rows(checkers_ai.INITIAL_BOARD)
+        player = 'r'
+        for _ in range(plies):
+            moves = bitboard.generate_moves(board, player)
+            if not moves:
+                break
+            board = bitboard.apply_move(board, player, rng.choice(moves))
+            player = 'r' if player == 'b' else 'b'
+        if bitboard.generate_moves(board, player):
+            return board, player
+
+
+def play_game(index: int, a: Engine, b: Engine, a_side: str, board: bitboard.Board, player: str,
+              max_plies: int) -> GameResult:
+    """
+    Play one game between two engines to the end: a win, a draw by repetition or by the no-progress rule, or
+    max_plies.
+
+    :param index: The game's number, passed through to the result
+    :param a: Engine A
+    :param b: Engine B
+    :param a_side: The side A plays ('r' or 'b')
+    :param board: Starting position
+    :param player: Side to move
+    :param max_plies: Plies after which the game is a draw
+    """
+    engines = {'a': a, 'b': b}
+    evaluators = {name: evaluation.Evaluator(engine.weights) for name, engine in engines.items()}
+    tables = {name: transposition.TranspositionTable(engine.table_entries) for name, engine in engines.items()}
+    moves, seconds, nodes, depths = dict.fromkeys('ab', 0), dict.fromkeys('ab', 0.0), dict.fromkeys('ab', 0), \
+        dict.fromkeys('ab', 0)
+    winner = None
+    history = []  # Positions since the last capture or man move
+    for ply in range(max_plies):
+        name = 'a' if player == a_side else 'b'
+        if not bitboard.generate_moves(board, player):
+            winner = 'b' if name == 'a' else 'a'
+            break
+        key = transposition.zobrist_hash(board, player)
+        if len(history) >= search.DRAW_PLIES or history.count(key) >= 2:
+            break
+        engine = engines[name]
+        started = time.perf_counter()
+        result = search.iterative_deepening(board, player, engine.time_ms if engine.time_ms is not None else math.inf,
+                                            tables[name], engine.depth or search.MAX_PLY,
+                                            quiescence=engine.quiescence, aspiration=engine.aspiration,
+                                            evaluator=evaluators[name], pvs=engine.pvs,
+                                            use_tablebase=engine.tablebase, history=history,
+                                            quiet_plies=len(history), ordering=engine.ordering)
+        seconds[name] += time.perf_counter() - started
+        moves[name] += 1
+        nodes[name] += result.nodes
+        depths[name] += result.depth
+        if search.reversible(board, result.move):
+            history.append(key)
+        else:
+            history = []
+        board = bitboard.apply_move(board, player, result.move)
+        player = 'r' if player == 'b' else 'b'
+    else:
+        ply = max_plies
+    return GameResult(index, winner, a_side, ply, moves, seconds, nodes, depths)
+
+
+def _play_game(index: int, a: Engine, b: Engine, seed: int, opening_plies: int, max_plies: int) -> GameResult:
+    # Games 2k and 2k + 1 share an opening, with the engines' sides swapped
+    board, player = random_opening(random.Random(seed * 1000003 + index // 2), opening_plies)
+    a_side = player if index % 2 == 0 else ('r' if player == 'b' else 'b')
+    return play_game(index, a, b, a_side, board, player, max_plies)
+
+
+def describe(result: GameResult) -> str:
+    """One line about a finished game, for progress output."""
+    if result.winner is None:
+        return f"game {result.index + 1}: draw in {result.plies} plies"
+    side = result.a_side if result.winner == 'a' else ('r' if result.a_side == 'b' else 'b')
+    return f"game {result.index + 1}: {result.winner.upper()} won as {'red' if side == 'r' else 'black'} " \
+           f"in {result.plies} plies"
+
+
+def score_interval(wins: int, draws: int, losses: int, z: float = Z_95) -> tuple[float, float, float]:
+    """
+    A's score (a win counts 1, a draw 1/2) with a normal-approximation confidence interval.
+
+    :return: (score, low, high) as fractions of the games played
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.5, 0.0, 1.0
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = z * math.sqrt(variance / games)
+    return score, max(score - margin, 0.0), min(score + margin, 1.0)
+
+
+def elo(score: float) -> float:
+    """Elo difference that gives an expected score of score (infinite at 0 and 1)."""
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return 400 * math.log10(score / (1 - score))
+
+
+def _finite(value: float):
+    # JSON has no infinity: an infinite Elo difference is reported as null
+    return value if math.isfinite(value) else None
+
+
+def run(a: Engine, b: Engine, games: int = 100, workers: int = None, seed: int = 0, opening_plies: int = 4,
+        max_plies: int = 200, progress=None) -> dict:
+    """
+    Play a match between two engines.
+
+    :param a: Engine A
+    :param b: Engine B
+    :param games: Number of games
+    :param workers: Worker processes (defaults to the number of CPUs; 1 plays in this process)
+    :param seed: Seed of the random openings; the same seed gives the same openings
+    :param opening_plies: Random plies played from the start position before the engines take over
+    :param max_plies: Plies after which a game is a draw
+    :param progress: Optional callable(GameResult), called as each game ends
+    :return: Report with A's wins, draws and losses, its score and Elo difference with their 95% confidence
+             intervals (an infinite Elo difference, from a score of 0 or 1, is None), and per engine its moves,
+             average time per move, nodes per second and average depth
+    """
+    workers = min(workers or os.cpu_count() or 1, max(games, 1))
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    results = []
+    started = time.perf_counter()
+    try:
+        if executor is None:
+            finished = (_play_game(index, a, b, seed, opening_plies, max_plies) for index in range(games))
+        else:
+            finished = (future.result() for future in as_completed(
+                [executor.submit(_play_game, index, a, b, seed, opening_plies, max_plies) for index in range(games)]))
+        for result in finished:
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    wins = sum(result.winner == 'a' for result in results)
+    losses = sum(result.winner == 'b' for result in results)
+    draws = len(results) - wins - losses
+    score, low, high = score_interval(wins, draws, losses)
+    engines = {}
+    for name in 'ab':
+        moves = sum(result.moves[name] for result in results)
+        seconds = sum(result.seconds[name] for result in results)
+        nodes = sum(result.nodes[name] for result in results)
+        engines[name] = {"moves": moves, "ms_per_move": 1000 * seconds / moves if moves else 0.0,
+                         "nodes_per_second": nodes / seconds if seconds else 0.0,
+                         "average_depth": sum(result.depths[name] for result in results) / moves if moves else 0.0}
+    return {"games": len(results), "wins": wins, "draws": draws, "losses": losses,
+            "score": score, "score_interval": [low, high], "elo": _finite(elo(score)),
+            "elo_interval": [_finite(elo(low)), _finite(elo(high))],
+            "average_plies": sum(result.plies for result in results) / len(results) if results else 0.0,
+            "seconds": time.perf_counter() - started, "engines": engines}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Play two engine configurations against each other.")
+    parser.add_argument("--a", default="depth=6", help="engine A, e.g. depth=6,eval=material (default: depth=6)")
+    parser.add_argument("--b", default="depth=6", help="engine B (default: depth=6)")
+    parser.add_argument("--games", type=int, default=100, help="number of games (default: 100)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random openings")
+    parser.add_argument("--opening-plies", type=int, default=4, help="random plies before the engines play")
+    parser.add_argument("--max-plies", type=int, default=200, help="plies after which a game is drawn")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    try:
+        engine_a, engine_b = parse_engine(args.a), parse_engine(args.b)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = run(engine_a, engine_b, args.games, args.workers, args.seed, args.opening_plies, args.max_plies,
+                 progress=None if args.json else lambda result: print(describe(result), flush=True))
+    if args.json:
+        print(json.dumps(report, indent=2, allow_nan=False))
+    else:
+        low, high = report["score_interval"]
+        print(f"\nA: {args.a}\nB: {args.b}")
+        print(f"{report['games']} games: A won {report['wins']}, drew {report['draws']}, lost {report['losses']}")
+        print(f"A's score {report['score']:.3f} (95% {low:.3f} to {high:.3f}), "
+              f"Elo {elo(report['score']):+.0f} ({elo(low):+.0f} to {elo(high):+.0f})")
+        for name in 'ab':
+            engine = report["engines"][name]
+            print(f"{name.upper()}: {engine['moves']} moves, {engine['ms_per_move']:.1f} ms/move, "
+                  f"{engine['nodes_per_second']:.0f} nodes/s, depth {engine['average_depth']:.1f}")
+        print(f"{report['average_plies']:.0f} plies per game, {report['seconds']:.1f}s")
@@ -0,0 +1,262 @@
+"""
+Zobrist hashing and a fixed-size transposition table for the bitboard search.
+
+A table can live in a memory-mapped file instead of process memory. Every process that opens the same file
+then shares one table, and what it holds survives restarts: worker pools stop searching each other's positions
+again, and a freshly deployed app starts with the table its predecessor left behind. The file is only a cache
+of search results, so it can be deleted at any time (and should be when the evaluation changes).
+"""
+import mmap
+import os
+import random
+import struct
+from array import array
+
+import bitboard
+
+# Zobrist keys, one per (piece kind, square), plus one for black to move. The generator is seeded so
+# that hashes are identical across processes and restarts.
+_rng = random.Random(0x5EED)
+BLACK_MAN = tuple(_rng.getrandbits(64) for _ in range(32))
+BLACK_KING = tuple(_rng.getrandbits(64) for _ in range(32))
+RED_MAN = tuple(_rng.getrandbits(64) for _ in range(32))
+RED_KING = tuple(_rng.getrandbits(64) for _ in range(32))
+BLACK_TO_MOVE = _rng.getrandbits(64)
+del _rng
+
+# Bound flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Table files: header (magic, version, number of slots), then the keys, data and scores arrays
+FILE_MAGIC = b'CKTT'
+FILE_VERSION = 1
+_FILE_HEADER = struct.Struct('<4sHxxQ')
+
+_MASK64 = (1 << 64) - 1
+
+# Scores within this distance of +/-WIN are wins, whose value depends on the ply they are found at
+WIN = 1000000
+WIN_THRESHOLD = WIN - 1000
+
+
+def zobrist_hash(board: bitboard.Board, player: str) -> int:
+    """
+    Compute the Zobrist hash of a position from scratch.
+
+    :param board: The position
+    :param player: The side to move ('b' or 'r')
+    :return: 64-bit hash
+    """
+    key = BLACK_TO_MOVE if player == 'b' else 0
+    for square in range(32):
+        bit = 1 << square
+        if board.black & bit:
+            key ^= BLACK_KING[square] if board.kings & bit else BLACK_MAN[square]
+        elif board.red & bit:
+            key ^= RED_KING[square] if board.kings & bit else RED_MAN[square]
+    return key
+
+
+def update_hash(key: int, board: bitboard.Board, player: str, move: bitboard.Move) -> int:
+    """
+    Return the hash of the position reached by playing move, given the hash of board.
+
+    :param key: Hash of board with player to move
+    :param board: The position before the move
+    :param player: The side making the move
+    :param move: The move being played
+    :return: 64-bit hash of the successor, with the other side to move
+    """
+    src, dst, captured, promote = move
+    if player == 'b':
+        own_man, own_king, opp_man, opp_king = BLACK_MAN, BLACK_KING, RED_MAN, RED_KING
+    else:
+        own_man, own_king, opp_man, opp_king = RED_MAN, RED_KING, BLACK_MAN, BLACK_KING
+    kings = board.kings
+    if kings >> src & 1:
+        key ^= own_king[src] ^ own_king[dst]
+    else:
+        key ^= own_man[src] ^ (own_king[dst] if promote else own_man[dst])
+    while captured:
+        bit = captured & -captured
+        captured ^= bit
+        square = bit.bit_length() - 1
+        key ^= opp_king[square] if kings & bit else opp_man[square]
+    return key ^ BLACK_TO_MOVE
+
+
+def pack_move(move: bitboard.Move) -> int:
+    if move is None:
+        return 0
+    src, dst, captured, promote = move
+    return src | dst << 5 | promote << 10 | captured << 11
+
+
+def unpack_move(packed: int):
+    if packed == 0:
+        return None
+    return packed & 31, packed >> 5 & 31, packed >> 11, bool(packed >> 10 & 1)
+
+
+class TranspositionTable:
+    # A fixed-size, direct-mapped hash table of search results. Entries live in three parallel
+    # arrays (checked key, packed data, score), 24 bytes per slot, so memory never grows after creation.
+    # Packed data layout: flag (2 bits) | depth (8 bits) | generation (8 bits) | move (43 bits)
+    # The key is stored xor-ed with the data and score, so that an entry torn by two processes writing the
+    # same slot of a shared file at once fails the key check instead of pairing one position with another's score.
+
+    POLICIES = ('depth', 'always')
+
+    def __init__(self, entries: int = 1 << 20, policy: str = 'depth', path: str = None):
+        """
+        :param entries: Number of slots, rounded down to a power of two
+        :param policy: 'depth' keeps the deeper of two results for a slot (results from earlier
+                       searches are always replaced); 'always' replaces unconditionally
+        :param path: File to keep the table in, shared with every other table opened on it. It is created
+                     with entries slots if it does not exist; an existing file keeps the number it was made with.
+                     Raises ValueError if it is not a table file.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown replacement policy: {policy}")
+        self.size = 1 << (max(entries, 1).bit_length() - 1)
+        self.mask = self.size - 1
+        self.policy = policy
+        self.path = path
+        self.generation = 0
+        self._mmap = None
+        if path is None:
+            self._allocate()
+        else:
+            self._map(path)
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def _allocate(self):
+        self.keys = array('Q', bytes(8 * self.size))
+        self.data = array('Q', bytes(8 * self.size))
+        self.scores = array('q', bytes(8 * self.size))
+
+    def _map(self, path: str):
+        # An existing file keeps its own number of slots: other processes may have it mapped, so it is never
+        # shrunk or started over here.
+        with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                f.write(_FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, self.size))
+                f.flush()
+            f.seek(0)
+            header = f.read(_FILE_HEADER.size)
+            if len(header) < _FILE_HEADER.size:
+                raise ValueError(f"{path} is not a transposition table file")
+            magic, version, size = _FILE_HEADER.unpack(header)
+            if magic != FILE_MAGIC or version != FILE_VERSION or size & (size - 1):
+                raise ValueError(f"{path} is not a version {FILE_VERSION} transposition table file")
+            length = _FILE_HEADER.size + 24 * size
+            if os.fstat(f.fileno()).st_size < length:
+                f.truncate(length)
+            self._mmap = mmap.mmap(f.fileno(), length)
+        self.size = size
+        self.mask = size - 1
+        view = memoryview(self._mmap)[_FILE_HEADER.size:]
+        self.keys = view[:8 * size].cast('Q')
+        self.data = view[8 * size:16 * size].cast('Q')
+        self.scores = view[16 * size:].cast('q')
+
+    def clear(self):
+        if self._mmap is None:
+            self._allocate()
+        else:
+            self._mmap[_FILE_HEADER.size:] = bytes(24 * self.size)
+        self.generation = 0
+        self.reset_stats()
+
+    def flush(self):
+        """
+        Write a file-backed table's changes out to its file (they are already visible to other processes).
+        """
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def close(self):
+        """
+        Flush and unmap a file-backed table; it cannot be used afterwards.
+        """
+        if self._mmap is not None:
+            self._mmap.flush()
+            self.keys.release()
+            self.data.release()
+            self.scores.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def reset_stats(self):
+        self.hits = self.misses = self.collisions = self.stores = 0
+
+    def new_search(self):
+        """
+        Mark the start of a new root search so older results become replaceable.
+        """
+        self.generation = (self.generation + 1) & 0xFF
+
+    def filled(self) -> int:
+        """
+        Number of occupied slots (a full scan, so not for use inside the search).
+        """
+        return self.size - array('Q', self.keys).count(0)
+
+    def probe(self, key: int, ply: int):
+        """
+        Look up a position.
+
+        :param key: Zobrist hash of the position
+        :param ply: Distance of the position from the search root, used to re-base win scores
+        :return: (depth, flag, score, best move) or None
+        """
+        index = key & self.mask
+        stored = self.keys[index]
+        data = self.data[index]
+        score = self.scores[index]
+        if stored ^ data ^ (score & _MASK64) != key:
+            if stored:
+                self.collisions += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        if score > WIN_THRESHOLD:
+            score -= ply
+        elif score < -WIN_THRESHOLD:
+            score += ply
+        return data >> 2 & 0xFF, data & 3, score, unpack_move(data >> 18)
+
+    def store(self, key: int, ply: int, depth: int, flag: int, score: int, move):
+        """
+        Record a search result for a position.
+
+        :param key: Zobrist hash of the position
+        :param ply: Distance of the position from the search root
+        :param depth: Remaining depth the position was searched to
+        :param flag: EXACT, LOWER or UPPER
+        :param score: The score, from black's point of view
+        :param move: The best move found, or None
+        """
+        index = key & self.mask
+        stored = self.keys[index]
+        if self.policy == 'depth' and stored:
+            data = self.data[index]
+            if stored ^ data ^ (self.scores[index] & _MASK64) != key and data >> 10 & 0xFF == self.generation \
+                    and data >> 2 & 0xFF > depth:
+                return
+        if score > WIN_THRESHOLD:
+            score += ply
+        elif score < -WIN_THRESHOLD:
+            score -= ply
+        data = flag | depth << 2 | self.generation << 10 | pack_move(move) << 18
+        self.keys[index] = key ^ data ^ (score & _MASK64)
+        self.data[index] = data
+        self.scores[index] = score
+        self.stores += 1
+
+    def stats(self) -> dict:
+        return {"entries": self.size, "hits": self.hits, "misses": self.misses,
+                "collisions": self.collisions, "stores": self.stores}
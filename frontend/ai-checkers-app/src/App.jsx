@@ -28,13 +28,28 @@ const App = () => {
   // const [moveApplied, setMoveApplied] = useState(false);
   const [numRed, setNumRed] = useState(12);
   const [numBlack, setNumBlack] = useState(12);
+  const [gameId, setGameId] = useState(null);
+
+  // Start a new game on the server; every later request refers to it by id
+  useEffect(() => {
+    const startGame = async () => {
+      try {
+        const response = await axios.post('http://localhost:5000/games');
+        setGameId(response.data.game_id);
+      } catch (error) {
+        console.error("Error starting game:", error);
+      }
+    };
+
+    startGame();
+  }, []);
 
 
 
   // Fetch available moves for the selected piece
   const fetchAvailableMoves = async () => {
     try {
-      const response = await axios.post('http://localhost:5000/user_move');
+      const response = await axios.post('http://localhost:5000/user_move', { game_id: gameId });
       setAvailableMoves(response.data.user_moves);
       console.log(availableMoves);
     } catch (error) {
@@ -45,7 +60,7 @@ const App = () => {
   // Fetch AI's move from Flask and apply it
   const fetchAIMove = async () => {
     try {
-      const response = await axios.post('http://localhost:5000/ai_move');
+      const response = await axios.post('http://localhost:5000/ai_move', { game_id: gameId });
       // setAIMove(response.data.ai_move);
       setBoard(response.data.board_state);
       setNumRed(response.data.num_red);
@@ -61,6 +76,7 @@ const App = () => {
     if (!isUserTurn) return;
     try {
       const response = await axios.post('http://localhost:5000/apply_user_move', {
+        game_id: gameId,
         old_coords: oldCoords,
         new_coords: newCoords,
         piece: board[oldCoords[0]][oldCoords[1]],
@@ -149,7 +165,7 @@ const App = () => {
   useEffect(() => {
     const playGame = async () => {
       // Main game loop
-      if (availableMoves.length !== 0 && numRed > 0 && numBlack > 0) {
+      if (gameId && availableMoves.length !== 0 && numRed > 0 && numBlack > 0) {
         if (isUserTurn) {
           await handleUserTurn();
           setIsUserTurn(false);
@@ -165,7 +181,7 @@ const App = () => {
     playGame();
     console.log("USE_EFFECT triggered. Current board:", board, "Available moves:", availableMoves);
     console.log(`Current listener count: ${listenerCount}`);
-  }, [board, isUserTurn, selectedPiece, availableMoves, numBlack, numRed]);
+  }, [gameId, board, isUserTurn, selectedPiece, availableMoves, numBlack, numRed]);
 
 
   // Render each tile with optional highlighting